@@ -0,0 +1,240 @@
+"""
+Benchmarks for beastwords.
+
+    python benchmarks/bench.py run -o results.json            # full sweeps
+    python benchmarks/bench.py run --quick -o results.json    # small sizes, for a quick check
+    python benchmarks/bench.py compare baseline.json results.json --tolerance 0.25
+
+`run` times each stage of `Converter.convert` (plus parsing and writing),
+`repartition_by_size`, `repartition_by_groupsize` and `sitedistr` on synthetic
+inputs built from the test fixtures, sweeping the number of taxa, sites and
+partitions one at a time. `compare` exits with 1 if anything got slower than
+the baseline by more than `tolerance`.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+
+HERE = Path(__file__).parent
+sys.path.insert(0, str(HERE.parent / 'src'))
+
+from beastwords import __version__  # noqa: E402
+from beastwords.main import Converter  # noqa: E402
+from beastwords.sitedistr import sitedistr  # noqa: E402
+from beastwords.utils import repartition_by_size, repartition_by_groupsize  # noqa: E402
+
+MODELS = {
+    'covarion': HERE.parent / 'tests' / 'overall-covarion.xml',
+    'ctmc': HERE.parent / 'tests' / 'overall-ctmc.xml',
+}
+
+STAGES = ['sequences', 'taxa', 'state', 'prior', 'treelikelihood', 'operators', 'log']
+
+# each sweep varies one thing, keeping the others at `BASE`
+BASE = {'taxa': 50, 'sites': 2000, 'partitions': None}
+SWEEPS = {
+    'taxa': [10, 100, 500, 2000],
+    'sites': [10, 1000, 10000, 100000],
+    'partitions': [1, 10, 100, 1000, 5000],
+}
+QUICK = {
+    'taxa': [10, 100],
+    'sites': [10, 1000],
+    'partitions': [1, 10, 100],
+}
+
+
+def make_input(model, ntaxa, nsites, nwords=None, seed=0):
+    """
+    Returns the serialised single partition XML for `model` with `ntaxa` taxa and
+    `nsites` sites (plus the ascertainment site) split into `nwords` words.
+    """
+    rng = random.Random(f"{model}:{ntaxa}:{nsites}:{nwords}:{seed}")
+    nwords = nwords or max(1, nsites // 5)
+    # every word gets at least one site, the rest are spread at random
+    sizes = [1] * nwords
+    for _ in range(nsites - nwords):
+        sizes[rng.randrange(nwords)] += 1
+    labels = ['_ascertainment_0']
+    for w, size in enumerate(sizes):
+        labels.extend(f"w{w}_{i}" for i in range(1, size + 1))
+    
+    sequences = {}
+    for t in range(ntaxa):
+        sites = [rng.choice('0001?') for _ in range(nsites)]
+        sequences[f"Taxon{t + 1}"] = "0" + "".join(sites)
+    
+    xml = Converter.from_file(MODELS[model])
+    xml.set_alignment(labels, sequences)
+    return xml.to_bytes()
+
+
+def timed(func, *args, repeat=1):
+    """Returns the fastest wall time (in seconds) of `repeat` calls of `func(*args)`"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_convert(data, partitions=None, repeat=1):
+    """Times parsing, each conversion stage and writing. Returns {stage: seconds}"""
+    times = {}
+    for _ in range(repeat):
+        run = {}
+        start = time.perf_counter()
+        xml = Converter.from_bytes(data)
+        xml.tree
+        run['parse'] = time.perf_counter() - start
+        if partitions:
+            run['repartition'] = timed(xml.set_partitions, partitions)
+        for stage in STAGES:
+            run[stage] = timed(getattr(xml, f"_convert_{stage}"))
+        run['write'] = timed(xml.to_bytes)
+        for k, v in run.items():
+            times[k] = min(times.get(k, v), v)
+    times['total'] = sum(times.values())
+    return times
+
+
+def bench_utils(data, partitions, repeat=1):
+    """Times repartition_by_size, repartition_by_groupsize and sitedistr. Returns {name: seconds}"""
+    xml = Converter.from_bytes(data)
+    words = dict(xml.partitions)
+    sizes = sorted({len(s) for s in words.values()})
+    groups = ",".join(str(s) for s in sizes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            'repartition_by_size': timed(repartition_by_size, min(partitions or 1, len(words)), words, repeat=repeat),
+            'repartition_by_groupsize': timed(
+                repartition_by_groupsize, groups, words, xml.ascertainment, repeat=repeat
+            ),
+            'sitedistr': timed(sitedistr, xml, repeat=repeat),
+        }
+
+
+def get_cases(quick=False):
+    sweeps = QUICK if quick else SWEEPS
+    for model in MODELS:
+        for variable, values in sweeps.items():
+            for value in values:
+                case = dict(BASE, model=model, sweep=variable)
+                case[variable] = value
+                if variable == 'partitions':  # need at least as many words as partitions
+                    case['sites'] = max(case['sites'], value * 4)
+                    case['words'] = max(value, case['sites'] // 5)
+                yield case
+
+
+def get_name(case):
+    return f"{case['model']}/{case['sweep']}={case[case['sweep']]}"
+
+
+def run(quick=False, repeat=3, only=None, verbose=True):
+    results = {}
+    for case in get_cases(quick):
+        name = get_name(case)
+        if only and only not in name:
+            continue
+        with warnings.catch_warnings():  # e.g. empty partitions, we only care about the time
+            warnings.simplefilter('ignore')
+            data = make_input(case['model'], case['taxa'], case['sites'], case.get('words'))
+            times = bench_convert(data, case['partitions'], repeat=repeat)
+            times.update(bench_utils(data, case['partitions'], repeat=repeat))
+        results[name] = {'case': case, 'times': times}
+        if verbose:
+            print(f"{name}\t{times['total']:.4f}s", file=sys.stderr, flush=True)
+    return {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(baseline, current, tolerance=0.25, floor=0.001):
+    """
+    Returns a list of (case, timing, baseline, current) for everything in `current`
+    that is more than `tolerance` (a fraction) slower than in `baseline`.
+    
+    Timings under `floor` seconds in both are too noisy to compare and are skipped.
+    """
+    slower = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['times']
+        for timing, seconds in result['times'].items():
+            if timing not in before or max(before[timing], seconds) < floor:
+                continue
+            if seconds > before[timing] * (1 + tolerance):
+                slower.append((name, timing, before[timing], seconds))
+    return slower
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks beastwords')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    p = commands.add_parser('run', help='run the benchmarks')
+    p.add_argument(
+        '-o', "--output", dest='output', default=None, type=Path,
+        help="write results (JSON) here, otherwise to stdout", action='store'
+    )
+    p.add_argument(
+        "--quick", dest='quick', default=False,
+        help="only run the smaller sizes", action='store_true'
+    )
+    p.add_argument(
+        "--repeat", dest='repeat', default=3, type=int,
+        help="number of repeats (the fastest is kept)", action='store'
+    )
+    p.add_argument(
+        '-k', dest='only', default=None, type=str,
+        help="only run cases with this in their name (e.g. ctmc/taxa)", action='store'
+    )
+    
+    p = commands.add_parser('compare', help='compare results against a baseline')
+    p.add_argument("baseline", help='baseline results (JSON)', type=Path)
+    p.add_argument("current", help='new results (JSON)', type=Path)
+    p.add_argument(
+        "--tolerance", dest='tolerance', default=0.25, type=float,
+        help="allowed slowdown as a fraction of the baseline (default 0.25 = 25%%)", action='store'
+    )
+    p.add_argument(
+        "--floor", dest='floor', default=0.001, type=float,
+        help="ignore timings shorter than this many seconds", action='store'
+    )
+    args = parser.parse_args(args)
+    
+    if args.command == 'run':
+        results = json.dumps(run(quick=args.quick, repeat=args.repeat, only=args.only), indent=2)
+        if args.output:
+            args.output.write_text(results + "\n")
+        else:
+            print(results)
+        return 0
+    
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    slower = compare(baseline, current, tolerance=args.tolerance, floor=args.floor)
+    for name, timing, before, after in slower:
+        print(f"{name}\t{timing}\t{before:.4f}s -> {after:.4f}s\t({after / before - 1:+.0%})")
+    if not slower:
+        print(f"No slowdowns beyond {args.tolerance:.0%}")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Start-up benchmarks for the beastwords commands.
+
+    python benchmarks/startup.py run -o startup.json
+    python benchmarks/startup.py compare baseline.json startup.json --tolerance 0.25
+
+`run` starts a fresh interpreter with `-X importtime` for each case (importing
+the package, `beastwords --help`, a usage error, ...) and records the wall time,
+the total import time and the import time of beastwords' own modules, keeping
+the fastest of `--repeat` runs. It exits with 1 if one of the `LIGHT` cases loads
+any of the `HEAVY` modules, as those should only be loaded once there's work to
+do. `compare` is the same as in bench.py.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).parent
+SRC = HERE.parent / 'src'
+sys.path.insert(0, str(SRC))
+
+from bench import compare  # noqa: E402
+from beastwords import __version__  # noqa: E402
+
+CASES = {
+    'import': "import beastwords",
+    'help': "from beastwords.cli import main; main(['--help'])",
+    'usage-error': "from beastwords.cli import main; main(['a.xml', 'b.xml', '--taxa', 'a', '--exclude-taxa', 'b'])",
+    'sitedistr-help': "from beastwords.sitedistr import main; main(['--help'])",
+    'batch-help': "from beastwords.cli import main; main(['batch', '--help'])",
+    'library': "from beastwords import Converter",
+}
+
+# cases that shouldn't need any of HEAVY
+LIGHT = ['import', 'help', 'usage-error', 'sitedistr-help', 'batch-help']
+HEAVY = ['lxml.etree', 'asyncio', 'beastwords.main']
+
+
+def parse_importtime(stderr):
+    """Returns {module: (self µs, cumulative µs, depth)} from `-X importtime` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(own), int(cumulative), depth)
+    return modules
+
+
+def measure(code):
+    """Runs `code` in a new interpreter, returning (seconds, {module: (self, cumulative, depth)})"""
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    env.pop('BEASTWORDS_SERVER', None)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], env=env, capture_output=True, text=True
+    )
+    return time.perf_counter() - start, parse_importtime(result.stderr)
+
+
+def run(repeat=5, verbose=True):
+    results, problems = {}, []
+    for name, code in CASES.items():
+        best = None
+        for _ in range(repeat):
+            seconds, modules = measure(code)
+            if best is None or seconds < best[0]:
+                best = (seconds, modules)
+        seconds, modules = best
+        times = {
+            'wall': round(seconds, 4),
+            'imports': round(sum(own for own, _, _ in modules.values()) / 1e6, 4),
+            'beastwords': round(sum(
+                cumulative for module, (_, cumulative, depth) in modules.items()
+                if module.split('.')[0] == 'beastwords' and depth == 0
+            ) / 1e6, 4),
+        }
+        heavy = [m for m in HEAVY if m in modules]
+        results[name] = {'case': code, 'times': times, 'heavy': heavy}
+        if name in LIGHT and heavy:
+            problems.append(f"{name} loads {', '.join(heavy)}")
+        if verbose:
+            print(f"{name}\t{times['wall']:.4f}s\t(imports {times['imports']:.4f}s)\t{' '.join(heavy)}",
+                  file=sys.stderr, flush=True)
+    return {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }, problems
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmarks beastwords start-up')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('run', help='run the benchmarks')
+    p.add_argument(
+        '-o', "--output", dest='output', default=None, type=Path,
+        help="write results (JSON) here, otherwise to stdout", action='store'
+    )
+    p.add_argument(
+        "--repeat", dest='repeat', default=5, type=int,
+        help="number of repeats (the fastest is kept)", action='store'
+    )
+
+    p = commands.add_parser('compare', help='compare results against a baseline')
+    p.add_argument("baseline", help='baseline results (JSON)', type=Path)
+    p.add_argument("current", help='new results (JSON)', type=Path)
+    p.add_argument(
+        "--tolerance", dest='tolerance', default=0.25, type=float,
+        help="allowed slowdown as a fraction of the baseline (default 0.25 = 25%%)", action='store'
+    )
+    p.add_argument(
+        "--floor", dest='floor', default=0.005, type=float,
+        help="ignore timings shorter than this many seconds", action='store'
+    )
+    args = parser.parse_args(args)
+
+    if args.command == 'run':
+        results, problems = run(repeat=args.repeat)
+        results = json.dumps(results, indent=2)
+        if args.output:
+            args.output.write_text(results + "\n")
+        else:
+            print(results)
+        for problem in problems:
+            print(f"Too slow to start: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    slower = compare(baseline, current, tolerance=args.tolerance, floor=args.floor)
+    for name, timing, before, after in slower:
+        print(f"{name}\t{timing}\t{before:.4f}s -> {after:.4f}s\t({after / before - 1:+.0%})")
+    if not slower:
+        print(f"No slowdowns beyond {args.tolerance:.0%}")
+    return 1 if slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,24 @@
-from .main import Converter
\ No newline at end of file
+__version__ = "0.1.0"
+
+# these are imported on first use so that `import beastwords` (which every
+# command line call does) doesn't load lxml, asyncio and the conversion code
+_LAZY = {
+    'Converter': 'beastwords.main',
+    'aconvert': 'beastwords.aio',
+    'aconvert_many': 'beastwords.aio',
+}
+
+__all__ = ['Converter', 'aconvert', 'aconvert_many']
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = value  # only look it up once
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,125 @@
+"""
+asyncio API.
+
+    await beastwords.aconvert("in.xml", "out.xml", partitions=5)
+
+Parsing, conversion and serialisation run in an executor (the default thread
+pool unless a `concurrent.futures` executor is given) so the event loop is
+never blocked. Files are read and written with aiofiles if it's installed,
+otherwise in a thread. The output is only written once conversion has
+finished, so a cancelled or timed-out conversion never leaves a partial file.
+Conversions in threads are also stopped (with `Cancelled`) at their next
+progress report; ones in another process run to the end, but aren't written.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import aiofiles
+except ImportError:  # pragma: no cover
+    aiofiles = None
+
+
+async def read_bytes(filename):
+    if aiofiles is not None:
+        async with aiofiles.open(filename, 'rb') as handle:
+            return await handle.read()
+    return await asyncio.to_thread(Path(filename).read_bytes)
+
+
+async def write_bytes(filename, data):
+    """Writes `data` to `filename` atomically (via a temporary file and rename)"""
+    filename = Path(filename)
+    fd, tmp = tempfile.mkstemp(dir=filename.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        if aiofiles is not None:
+            async with aiofiles.open(tmp, 'wb') as handle:
+                await handle.write(data)
+        else:
+            await asyncio.to_thread(Path(tmp).write_bytes, data)
+        os.replace(tmp, filename)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def convert_bytes(data, partitions=None, plan=None, taxa=None, exclude_taxa=None, drop_constant=False,
+                  cancelled=None):
+    """
+    Converts the XML document in `data`, returning the converted document as bytes.
+    
+    `plan` is a PartitionPlan as a dictionary (see `PartitionPlan.to_dict`) so
+    everything here can be sent to another process. If `cancelled` (a
+    `threading.Event`) is set the conversion stops with `Cancelled`.
+    """
+    from beastwords.main import Converter
+    from beastwords.plan import PartitionPlan
+    
+    xml = Converter.from_bytes(data)
+    if cancelled is not None:
+        xml.progress = lambda stage, done, total: not cancelled.is_set()
+    if taxa is not None or exclude_taxa is not None or drop_constant:
+        xml.set_taxa(keep=taxa, exclude=exclude_taxa, drop_constant=drop_constant)
+    if partitions:
+        xml.set_partitions(partitions)
+    xml.convert(PartitionPlan.from_dict(plan) if plan is not None else None)
+    return xml.to_bytes()
+
+
+async def aconvert(src, dst, partitions=None, plan=None, taxa=None, exclude_taxa=None,
+                   drop_constant=False, executor=None, timeout=None, semaphore=None):
+    """
+    Converts `src` into `dst` without blocking the event loop.
+    
+    `executor` is a concurrent.futures executor to run the conversion in (e.g. a
+    ProcessPoolExecutor for CPU-bound workloads), `timeout` is in seconds, and
+    `semaphore` an asyncio.Semaphore to limit how many conversions run at once.
+    Returns `dst`.
+    """
+    loop = asyncio.get_running_loop()
+    plan = plan.to_dict() if plan is not None else None
+    # an Event can only stop conversions in this process, i.e. in threads
+    cancelled = threading.Event() if executor is None or isinstance(executor, ThreadPoolExecutor) else None
+    
+    async def run():
+        data = await read_bytes(src)
+        data = await loop.run_in_executor(
+            executor, convert_bytes, data, partitions, plan, taxa, exclude_taxa, drop_constant, cancelled
+        )
+        await write_bytes(dst, data)
+        return dst
+    
+    async with semaphore or _NullSemaphore():
+        try:
+            async with asyncio.timeout(timeout):
+                return await run()
+        except BaseException:  # timed out or cancelled, so stop the conversion too
+            if cancelled is not None:
+                cancelled.set()
+            raise
+
+
+async def aconvert_many(jobs, limit=4, executor=None, timeout=None):
+    """
+    Runs many conversions concurrently, at most `limit` at a time.
+    
+    `jobs` is a list of dictionaries of `aconvert` arguments (`src`, `dst`, ...). Returns
+    a list of results in the same order: `dst` or the exception raised.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    return await asyncio.gather(*[
+        aconvert(executor=executor, timeout=timeout, semaphore=semaphore, **job) for job in jobs
+    ], return_exceptions=True)
+
+
+class _NullSemaphore(object):
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
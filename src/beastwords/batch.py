@@ -0,0 +1,242 @@
+"""
+Batch conversion.
+
+Converts many files over a process pool. Each finished job is appended to a
+JSON-lines journal, so an interrupted batch can be re-run and will skip
+outputs that were already made from unchanged inputs with the same options.
+
+Jobs come from either a manifest (a TSV file with `input` and `output`
+columns and optionally `partitions`, `template`, `taxa`, `exclude_taxa`
+and `drop_constant`) or from filenames/globs.
+"""
+import csv
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from beastwords.cache import MetadataCache, ResultCache, hash_file
+from beastwords.profiling import profiled
+
+OPTIONS = ['partitions', 'template', 'taxa', 'exclude_taxa', 'drop_constant']
+
+
+def read_manifest(filename):
+    """Returns a list of jobs from the TSV manifest `filename`"""
+    filename = Path(filename)
+    jobs = []
+    with open(filename, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle, delimiter="\t"):
+            job = {k: (v.strip() if v and v.strip() else None) for k, v in row.items() if k}
+            for key in ['input', 'output', 'template', 'taxa', 'exclude_taxa']:
+                if job.get(key):  # paths are relative to the manifest
+                    job[key] = str(filename.parent / job[key])
+            job['drop_constant'] = (job.get('drop_constant') or '').lower() in ('1', 'true', 'yes')
+            jobs.append(job)
+    return jobs
+
+
+def expand_inputs(patterns, outdir=None, suffix='.partitioned'):
+    """
+    Returns a list of jobs for every file matching `patterns`.
+    
+    Files that globs match are skipped if they look like our outputs (i.e. their
+    name ends in `suffix`), so re-running without `outdir` doesn't convert those
+    again, as is any input that's the output of another job.
+    """
+    jobs = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if glob.has_magic(pattern):
+            matches = [m for m in matches if not Path(m).stem.endswith(suffix)]
+        for input in matches or [pattern]:
+            input = Path(input)
+            out = Path(outdir) if outdir else input.parent
+            jobs.append({'input': str(input), 'output': str(out / f"{input.stem}{suffix}.xml")})
+    outputs = {os.path.abspath(j['output']) for j in jobs}
+    return [j for j in jobs if os.path.abspath(j['input']) not in outputs]
+
+
+def get_options(job, defaults):
+    options = {k: job.get(k) if job.get(k) not in (None, False) else defaults.get(k) for k in OPTIONS}
+    options['drop_constant'] = bool(options['drop_constant'])
+    return options
+
+
+def read_journal(filename):
+    """Returns a dictionary of {output: record} for the successful jobs in `filename`"""
+    done = {}
+    if not Path(filename).exists():
+        return done
+    with open(filename, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:  # e.g. a partial line from an interrupted run
+                continue
+            if record.get('status') == 'ok':
+                done[record['output']] = record
+            else:
+                done.pop(record.get('output'), None)
+    return done
+
+
+def is_done(job, options, journal):
+    record = journal.get(job['output'])
+    if record is None or not Path(job['output']).exists():
+        return False
+    return record['options'] == options and record['input_hash'] == hash_file(job['input'])
+
+
+def run_job(job, options, cache=None, results=None, profile=None, profile_memory=None, verify=True):
+    """
+    Runs a single conversion, returning a journal record (never raises).
+    
+    If `profile` is given the conversion is profiled into it (see `profiled`). Unless
+    `verify` is False the converted sequences are checked against the input.
+    """
+    from beastwords.main import convert_file, read_taxa
+    
+    record = {'input': job['input'], 'output': job['output'], 'options': options}
+    start = time.perf_counter()
+    try:
+        with profiled(profile, profile_memory) if profile else nullcontext():
+            record['input_hash'] = hash_file(job['input'])
+            Path(job['output']).parent.mkdir(parents=True, exist_ok=True)
+            record['cached'] = convert_file(
+                job['input'], job['output'],
+                partitions=options['partitions'],
+                cache=MetadataCache(cache) if cache else None,
+                results=ResultCache(results) if results else None,
+                template=options['template'],
+                taxa=read_taxa(options['taxa']) if options['taxa'] else None,
+                exclude_taxa=read_taxa(options['exclude_taxa']) if options['exclude_taxa'] else None,
+                drop_constant=options['drop_constant'],
+                verify=verify,
+            )
+        record['status'] = 'ok'
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{e.__class__.__name__}: {e}"
+        record['traceback'] = traceback.format_exc()
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    record['finished'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return record
+
+
+def batch(jobs, journal, defaults=None, workers=1, cache=None, results=None, resume=True, profile=None,
+          profile_memory=None, verify=True):
+    """
+    Runs `jobs`, appending a record for each to the JSON-lines file `journal`.
+    
+    With more than one worker and a `profile`, each job is profiled separately into
+    `<profile>.<n>` (n counting from 1) as a profile of this process would only show waiting.
+    Unless `verify` is False every output is checked against its input (see `beastwords.verify`).
+    
+    Returns a list of the records for the jobs that were run.
+    """
+    defaults = defaults or {}
+    done = read_journal(journal) if resume else {}
+    
+    todo = []
+    for job in jobs:
+        options = get_options(job, defaults)
+        if resume and is_done(job, options, done):
+            continue
+        todo.append((job, options))
+    
+    records = []
+    with open(journal, 'a', encoding='utf-8') as handle:
+        def log(record):
+            records.append(record)
+            handle.write(json.dumps(record) + "\n")
+            handle.flush()  # so an interrupted batch keeps what it's done
+            status = 'ok' if record['status'] == 'ok' else f"FAILED: {record['error']}"
+            print(f"{record['input']} -> {record['output']}\t{record['seconds']}s\t{status}", file=sys.stderr)
+        
+        if workers > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [
+                    pool.submit(
+                        run_job, job, options, cache, results, f"{profile}.{i}" if profile else None, profile_memory,
+                        verify
+                    )
+                    for i, (job, options) in enumerate(todo, 1)
+                ]
+                for f in as_completed(futures):
+                    log(f.result())
+        else:
+            with profiled(profile, profile_memory) if profile else nullcontext():
+                for job, options in todo:
+                    log(run_job(job, options, cache, results, verify=verify))
+    return records
+
+
+def main(args=None):
+    import argparse
+    from beastwords.cli import add_profile_arguments
+    parser = argparse.ArgumentParser(
+        prog='beastwords batch', description='Converts many XML files, resuming where it left off'
+    )
+    parser.add_argument("inputs", nargs='+', help='a manifest (.tsv) or input files/globs')
+    parser.add_argument(
+        '-j', "--jobs", dest='jobs', default=1, type=int,
+        help="number of processes to use", action='store'
+    )
+    parser.add_argument(
+        '-p', "--partitions", dest='partitions', default=None, type=str,
+        help="default partition number/groups for jobs that don't set one", action='store'
+    )
+    parser.add_argument(
+        '-o', "--outdir", dest='outdir', default=None, type=Path,
+        help="where to write outputs for globbed inputs (default: next to the input)", action='store'
+    )
+    parser.add_argument(
+        "--suffix", dest='suffix', default='.partitioned',
+        help="suffix added to the names of globbed inputs", action='store'
+    )
+    parser.add_argument(
+        "--journal", dest='journal', default=Path('beastwords-batch.jsonl'), type=Path,
+        help="JSON-lines file recording finished jobs", action='store'
+    )
+    parser.add_argument(
+        "--no-resume", dest='resume', default=True,
+        help="re-run every job even if the journal says it's done", action='store_false'
+    )
+    parser.add_argument(
+        "--cache", dest='cache', default=None, type=Path,
+        help="directory to cache word/partition metadata in between runs", action='store'
+    )
+    parser.add_argument(
+        "--result-cache", dest='results', default=None, type=Path,
+        help="directory to cache converted outputs in", action='store'
+    )
+    parser.add_argument(
+        "--no-verify", dest='verify', default=True,
+        help="don't check the converted sequences against the inputs", action='store_false'
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args(args)
+    
+    jobs = []
+    for i in args.inputs:
+        if i.endswith('.tsv'):
+            jobs.extend(read_manifest(i))
+        else:
+            jobs.extend(expand_inputs([i], outdir=args.outdir, suffix=args.suffix))
+    
+    records = batch(
+        jobs, args.journal, defaults={'partitions': args.partitions}, workers=args.jobs,
+        cache=args.cache, results=args.results, resume=args.resume,
+        profile=args.profile or os.environ.get('BEASTWORDS_PROFILE'), profile_memory=args.profile_memory or None,
+        verify=args.verify
+    )
+    failed = [r for r in records if r['status'] != 'ok']
+    print(f"{len(records) - len(failed)} converted, {len(failed)} failed, {len(jobs) - len(records)} skipped",
+          file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,152 @@
+"""
+On-disk caches.
+
+Both caches are plain directories of files, evicted least-recently-used
+first once they grow beyond `max_size` bytes. Reads touch the entry's
+mtime, so the mtime doubles as the last-used time.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import defaultdict
+from functools import cache
+from pathlib import Path
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024  # 512Mb
+
+
+def hash_file(filename, chunksize=1024 * 1024):
+    """Returns the sha256 hexdigest of the contents of `filename`"""
+    h = hashlib.sha256()
+    with open(filename, 'rb') as handle:
+        while chunk := handle.read(chunksize):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stat_key(filename):
+    """Returns a key for `filename` based on its (path, size, mtime)"""
+    filename = Path(filename).resolve()
+    st = filename.stat()
+    return hashlib.sha256(f"{filename}\t{st.st_size}\t{st.st_mtime_ns}".encode('utf-8')).hexdigest()
+
+
+@cache
+def code_hash():
+    """
+    Returns a sha256 hexdigest of the beastwords sources, so that results cached by
+    one version of the code are never served by another (`__version__` isn't bumped
+    for every change to the output).
+    """
+    h = hashlib.sha256()
+    for filename in sorted(Path(__file__).parent.glob('*.py')):
+        h.update(filename.name.encode('utf-8'))
+        h.update(filename.read_bytes())
+    return h.hexdigest()
+
+
+class DirectoryCache(object):
+    
+    suffix = ''
+    
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+    def path(self, key):
+        return self.directory / f"{key}{self.suffix}"
+    
+    def get(self, key):
+        """Returns the path to the entry for `key`, or None if it's not cached"""
+        path = self.path(key)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+    
+    def put(self, key, data):
+        """Stores `data` (bytes) under `key`, returning the path to the entry"""
+        # write to a temporary file and rename so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp, self.path(key))
+        self.evict()
+        return self.path(key)
+    
+    def entries(self):
+        return [p for p in self.directory.glob(f"*{self.suffix}") if not p.name.endswith('.tmp')]
+    
+    def evict(self):
+        """Removes least recently used entries until the cache fits in `max_size`"""
+        entries = []
+        for p in self.entries():
+            try:
+                st = p.stat()
+            except FileNotFoundError:  # removed by someone else
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, p))
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, p) in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_size:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+
+class MetadataCache(DirectoryCache):
+    """
+    Caches the words, partitions, ascertainment sites and model of input files
+    (and optionally the alignment).
+    
+    Entries are keyed by (path, size, mtime) or, if `content` is True, by the
+    hash of the file contents.
+    """
+    suffix = '.json'
+    
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, content=False, alignment=False):
+        super().__init__(directory, max_size=max_size)
+        self.content = content
+        self.alignment = alignment
+    
+    def key(self, xmlfile):
+        return hash_file(xmlfile) if self.content else stat_key(xmlfile)
+    
+    def load(self, xmlfile):
+        """Returns the cached entry for `xmlfile` or None"""
+        path = self.get(self.key(xmlfile))
+        if path is None:
+            return None
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):  # unreadable - treat as a miss
+            return None
+        entry['words'] = [tuple(w) for w in entry['words']]
+        entry['partitions'] = defaultdict(list, entry['partitions'])
+        return entry
+    
+    def store(self, xmlfile, converter):
+        entry = {
+            'model': converter.model,
+            'words': converter.words,
+            'partitions': converter.partitions,
+            'ascertainment': converter.ascertainment,
+        }
+        if self.alignment:
+            entry['alignment'] = converter.alignment
+        return self.put(self.key(xmlfile), json.dumps(entry).encode('utf-8'))
+
+
+class ResultCache(DirectoryCache):
+    """
+    Caches converted outputs, keyed on the input contents, the beastwords sources
+    (see `code_hash`) and the conversion options.
+    """
+    suffix = '.xml'
+    
+    def key(self, xmlfile, options):
+        options = json.dumps(options, sort_keys=True)
+        return hashlib.sha256(f"{hash_file(xmlfile)}\t{code_hash()}\t{options}".encode('utf-8')).hexdigest()
@@ -0,0 +1,122 @@
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+from lxml import etree
+
+# filter parts we can check: "5" or "1-10" (1-based, inclusive). The rest of
+# BEAST's syntax (steps, "::") is left alone
+RANGE = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d+))?\s*$")
+
+
+class CheckError(ValueError):
+    """Raised when a converted document fails `check`"""
+    def __init__(self, problems, filename=None):
+        self.problems = problems
+        where = f" {filename}" if filename else ""
+        super().__init__(f"Converted{where} won't load in BEAST:\n  " + "\n  ".join(problems))
+
+
+def get_references(element):
+    """Yields the ids `element` points to via `idref` or "@id" attributes"""
+    for attr, value in element.attrib.items():
+        if attr == 'idref':
+            yield value
+        elif value.startswith('@'):
+            yield value[1:]
+
+
+def get_width(element):
+    """Returns the number of sites in an alignment element, or None if it has no sequences"""
+    for sequence in element.iterchildren('sequence'):
+        return len(''.join(sequence.get('value', '').split()))
+    return None
+
+
+def check_ranges(filter, width):
+    """Returns the parts of a FilteredAlignment `filter` that don't fit in `width` sites"""
+    if filter.strip() == '-':
+        return []
+    bad = []
+    for part in filter.split(','):
+        if m := RANGE.match(part):
+            start = int(m.group(1))
+            end = int(m.group(2) or start)
+            if start < 1 or end > width or start > end:
+                bad.append(part.strip())
+    return bad
+
+
+def check(root):
+    """
+    Checks a converted tree will load in BEAST, returning a list of problems:
+    references that don't resolve, duplicate ids, and FilteredAlignment
+    filters that run past the end of their alignment.
+
+    Makes a single pass over the document.
+    """
+    ids, widths = Counter(), {}
+    references, filtered = [], []
+    for element in root.iter(etree.Element):
+        if (id := element.get('id')) is not None:
+            ids[id] += 1
+            if element.tag == 'data' and (width := get_width(element)) is not None:
+                widths[id] = width
+        references.extend((element, ref) for ref in get_references(element))
+        if element.get('spec', '').endswith('FilteredAlignment') and element.get('filter'):
+            filtered.append(element)
+
+    problems = [f"Duplicate id '{id}' ({n} elements)" for id, n in ids.items() if n > 1]
+    for element, ref in references:
+        if ref not in ids:
+            problems.append(f"<{element.tag} id='{element.get('id', '')}'> refers to missing id '{ref}'")
+    for element in filtered:
+        data = element.get('data', '')
+        width = widths.get(data[1:]) if data.startswith('@') else None
+        if width is None:
+            continue  # nested/filtered data, we can't tell its width cheaply
+        for part in check_ranges(element.get('filter'), width):
+            problems.append(
+                f"FilteredAlignment '{element.get('id', '')}' filter {part} is outside "
+                f"alignment '{data[1:]}' (1-{width})"
+            )
+    return problems
+
+
+def check_file(filename):
+    """Parses and checks `filename`. See `check`"""
+    return check(etree.parse(str(filename)).getroot())
+
+
+def main(args=None):
+    import argparse
+    args = sys.argv[1:] if args is None else args
+    parser = argparse.ArgumentParser(
+        prog='beastwords check', description='Checks converted XMLs for broken references and filters'
+    )
+    parser.add_argument("inputs", help='filenames', type=Path, nargs='+')
+    parser.add_argument(
+        '-q', "--quiet", dest='quiet', default=False,
+        help="only print files with problems", action='store_true'
+    )
+    args = parser.parse_args(args)
+
+    failed = 0
+    for filename in args.inputs:
+        try:
+            problems = check_file(filename)
+        except (OSError, etree.XMLSyntaxError) as e:
+            problems = [str(e)]
+        if problems:
+            failed += 1
+            print(f"{filename}: {len(problems)} problem(s)")
+            for problem in problems:
+                print(f"  {problem}")
+        elif not args.quiet:
+            print(f"{filename}: ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Command line entry points.
+
+Kept light: nothing here imports lxml or the conversion code until the
+arguments have been parsed, so `--help`, usage errors and hand-offs to a
+server don't pay for loading it.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+
+def forward(command, args):
+    """Hands `command` over to the server in BEASTWORDS_SERVER, see `beastwords.serve.forward`"""
+    if not os.environ.get('BEASTWORDS_SERVER'):
+        return None
+    from beastwords.serve import forward
+    return forward(command, args)
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    if args and args[0] == 'serve':
+        from beastwords.serve import main as serve_main
+        sys.exit(serve_main(args[1:]))
+    if args and args[0] == 'check':
+        from beastwords.check import main as check_main
+        sys.exit(check_main(args[1:]))
+    
+    if args and args[0] == 'batch':
+        from beastwords.batch import main as batch_main
+        sys.exit(batch_main(args[1:]))
+    
+    parser = argparse.ArgumentParser(
+        description='Converts a one partition XML to a partitioned one',
+        epilog="Use `beastwords batch ...` to convert many files at once, "
+               "`beastwords check ...` to check converted files, "
+               "or `beastwords serve` to run a conversion server"
+    )
+    parser.add_argument("input", help='filename', type=Path)
+    parser.add_argument("output", help='filename (or directory with --sweep/--replicates)', type=Path)
+    parser.add_argument(
+        '-p', "--partitions", dest='partitions', default=None, type=str,
+        help="set partition number. If this is None use words", action='store'
+    )
+    parser.add_argument(
+        "--cache", dest='cache', default=None, type=Path,
+        help="directory to cache word/partition metadata in between runs", action='store'
+    )
+    parser.add_argument(
+        "--result-cache", dest='results', default=None, type=Path,
+        help="directory to cache converted outputs in", action='store'
+    )
+    parser.add_argument(
+        '-t', "--template", dest='template', default=None, type=Path,
+        help="single partition XML to use when input is a NEXUS file", action='store'
+    )
+    parser.add_argument(
+        "--plan", dest='plan', default=None, type=Path,
+        help="apply a saved PartitionPlan (JSON) instead of -p", action='store'
+    )
+    parser.add_argument(
+        "--sweep", dest='sweep', default=None, type=str,
+        help="convert into each partition number in a range (e.g. 2..64) and write them to `output`",
+        action='store'
+    )
+    parser.add_argument(
+        "--taxa", dest='taxa', default=None, type=Path,
+        help="file listing the taxa to keep (one per line)", action='store'
+    )
+    parser.add_argument(
+        "--exclude-taxa", dest='exclude_taxa', default=None, type=Path,
+        help="file listing the taxa to remove (one per line)", action='store'
+    )
+    parser.add_argument(
+        "--drop-constant", dest='drop_constant', default=False,
+        help="remove sites that are constant in the remaining taxa", action='store_true'
+    )
+    parser.add_argument(
+        "--replicates", dest='replicates', default=None, type=int,
+        help="write this many resampled replicates to `output`", action='store'
+    )
+    parser.add_argument(
+        "--resample", dest='resample', default='jackknife:0.5', type=str,
+        help="resampling method for --replicates: jackknife:<fraction> or bootstrap", action='store'
+    )
+    parser.add_argument(
+        "--seed", dest='seed', default=0, type=int,
+        help="random seed for --replicates", action='store'
+    )
+    parser.add_argument(
+        "--metrics", dest='metrics', default=None, type=Path,
+        help="write per-stage timings, memory use and operation counts (JSON) here", action='store'
+    )
+    parser.add_argument(
+        "--progress", dest='progress', default=None, action=argparse.BooleanOptionalAction,
+        help="show a progress bar (default: when writing to a terminal)"
+    )
+    parser.add_argument(
+        "--watch", dest='watch', default=False,
+        help="keep running and re-convert whenever the input changes", action='store_true'
+    )
+    parser.add_argument(
+        "--interval", dest='interval', default=0.5, type=float,
+        help="seconds between checks for changes with --watch", action='store'
+    )
+    parser.add_argument(
+        "--check", dest='check', default=False,
+        help="check the output for broken references, duplicate ids and filters before writing it",
+        action='store_true'
+    )
+    parser.add_argument(
+        "--verify", dest='verify', default=False,
+        help="check the converted sequences against the input before writing them", action='store_true'
+    )
+    parser.add_argument(
+        '-j', "--jobs", dest='jobs', default=1, type=int,
+        help="number of processes to use", action='store'
+    )
+    add_profile_arguments(parser)
+    argv, args = args, parser.parse_args(args)
+    check_arguments(parser, args)
+    
+    # only single conversions go to a server: --watch never finishes, and sweeps and
+    # replicates start their own process pools
+    if not (args.watch or args.sweep or args.replicates):
+        if (returncode := forward('convert', argv)) is not None:
+            sys.exit(returncode)
+    
+    # only now load the conversion code (and lxml), so --help and mistakes are quick
+    from beastwords.main import _run
+    from beastwords.profiling import profiled
+    with profiled(args.profile, memory=args.profile_memory or None):  # None: see BEASTWORDS_PROFILE_MEMORY
+        return _run(parser, args)
+
+
+def check_arguments(parser, args):
+    """Exits with a usage error for combinations of options that don't work together"""
+    if args.taxa and args.exclude_taxa:
+        parser.error("Use one of --taxa or --exclude-taxa")
+    if args.input.suffix.lower() in ('.nex', '.nexus') and args.template is None:
+        parser.error("NEXUS input needs a --template XML")
+    if args.plan and args.partitions:
+        parser.error("Use one of -p/--partitions or --plan")
+    if args.partitions and args.sweep:
+        parser.error("Use one of -p/--partitions or --sweep, the sweep sets the partitions")
+    if args.plan and (args.sweep or args.replicates):
+        parser.error("--plan only works with single conversions, sweeps and replicates make their own")
+    if args.watch and (args.template or args.sweep or args.replicates):
+        parser.error("--watch only works with single XML to XML conversions")
+    if args.metrics and (args.watch or args.sweep or args.replicates):
+        parser.error("--metrics only works with single conversions")
+    if args.check and (args.watch or args.sweep or args.replicates):
+        parser.error("--check only works with single conversions, use `beastwords check` afterwards")
+    if args.verify and (args.watch or args.sweep or args.replicates):
+        parser.error("--verify only works with single conversions")
+
+
+def add_profile_arguments(parser):
+    parser.add_argument(
+        "--profile", dest='profile', default=None, type=Path,
+        help="profile the run, writing cProfile stats here (and collapsed stacks to <profile>.collapsed). "
+             "Also set with BEASTWORDS_PROFILE", action='store'
+    )
+    parser.add_argument(
+        "--profile-memory", dest='profile_memory', default=False,
+        help="with --profile, also record the biggest allocations in <profile>.memory.txt", action='store_true'
+    )
+
+
+if __name__ == "__main__":
+    main()
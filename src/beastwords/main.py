@@ -1,3 +1,7 @@
+import shutil
+import sys
+import time
+from contextlib import nullcontext
 from copy import deepcopy
 from collections import defaultdict
 from pathlib import Path
@@ -6,45 +10,437 @@ from lxml import etree
 
 from warnings import warn
 
-from beastwords.utils import repartition_by_size, repartition_by_groupsize
+from beastwords.cache import MetadataCache, ResultCache, hash_file
+from beastwords.check import CheckError, check as check_tree
+from beastwords.cli import main, add_profile_arguments  # noqa: F401 (they used to live here)
+from beastwords.nexus import read_nexus
+from beastwords.plan import PartitionPlan, PlanError
+from beastwords.progress import Cancelled, ProgressBar
+from beastwords.scan import peek_model, scan_words
+from beastwords.utils import repartition
+from beastwords.verify import VerifyError, checksum, verify as verify_tree
+
+
+def sort_partitions(partitions):
+    """
+    Returns `partitions` ordered by partition name.
+    
+    Everything that loops over partitions does so in this order so that the same
+    input always gives byte-identical output.
+    """
+    return defaultdict(list, sorted(partitions.items()))
+
+
+def is_constant(sequences, site, missing="?-"):
+    """True if `site` has (at most) one state across `sequences`, ignoring missing data"""
+    states = {seq[site] for seq in sequences.values()}
+    return len(states.difference(missing)) <= 1
+
+
+def encode_sequence(sequence, partitions):
+    """
+    Returns the partitioned value of `sequence`: the sites in each partition (in
+    partition order) prefixed with an ascertainment character, separated by spaces.
+    """
+    value = []
+    for partition in sorted(partitions):
+        chars = "".join(sequence[s] for s in partitions[partition])
+        # identify ascertainment character
+        if all(c == '?' for c in chars):
+            ascertainment = '?'
+        elif all(c == '-' for c in chars):
+            ascertainment = '-'
+        else:
+            ascertainment = '0'
+        value.append(ascertainment + chars)
+    return " ".join(value)
+
+
+def read_taxa(filename):
+    """Reads a list of taxa from `filename`, one per line"""
+    with open(filename, encoding='utf-8') as handle:
+        return [line.strip() for line in handle if line.strip() and not line.startswith('#')]
+
+
+class PreflightError(ValueError):
+    """Raised when a document is missing things the conversion needs, see `Converter.preflight`"""
+    def __init__(self, problems, filename=None):
+        self.problems = problems
+        where = f" {filename}" if filename else ""
+        super().__init__(f"Can't convert{where}:\n  " + "\n  ".join(problems))
 
 
 class Converter(object):
     
     userDataType_spec = '?'
     useAmbiguities = 'false'
+    many_substmodels = False  # whether preflight allows more than one <substModel>
     
-    def __init__(self, xmlfile, tree=None, root=None, model=None):
-        if not xmlfile.exists():
-            raise IOError(f"File {xmlfile} does not exist")
-        self.xmlfile = xmlfile
-        self.tree = tree if tree is not None else etree.parse(xmlfile)
-        self.root = root if root is not None else self.tree.getroot()
-        self.model = model if model is not None else self.root.get("beautitemplate")
-
-        self.words = self.get_words()
-        self.partitions, self.ascertainment = self.get_partitions()
+    def __init__(self, xmlfile=None, tree=None, root=None, model=None):
+        if tree is None:
+            if xmlfile is None:
+                raise ValueError("Need either an xmlfile or a tree")
+            if not Path(xmlfile).exists():
+                raise IOError(f"File {xmlfile} does not exist")
+        self.xmlfile = Path(xmlfile) if xmlfile is not None else None
+        self.keep_taxa, self.drop_constant = None, False
+        self.metrics = None  # set to a `beastwords.metrics.Metrics` to collect them
+        self.progress = None  # progress(stage, done, total) callback, see `beastwords.progress`
+        self.verifiable = False  # checksum the input in _convert_sequences so `verify` can check the output
+        self._source = None
+        # everything below is loaded on first use, see the properties below.
+        self._tree, self._root, self._model = tree, root, model
+        self.invalidate()
     
     @classmethod
-    def from_file(cls, xmlfile):
-        tree = etree.parse(xmlfile)
+    def from_file(cls, xmlfile, cache=None):
+        """
+        Builds a converter for `xmlfile`. 
+        
+        If `cache` (a `beastwords.cache.MetadataCache`) is given then the words,
+        partitions etc are re-used from there if possible.
+        """
+        entry = cache.load(xmlfile) if cache is not None else None
+        if entry is not None:
+            obj = cls.get_class(entry['model'])(Path(xmlfile), model=entry['model'])
+            obj._words = entry['words']
+            obj._partitions, obj._ascertainment = entry['partitions'], entry['ascertainment']
+            obj._alignment = entry.get('alignment')
+            return obj
+        
+        # only the root tag is needed to pick a converter, the tree is parsed on demand
+        model = peek_model(xmlfile)
+        obj = cls.get_class(model)(Path(xmlfile), model=model)
+        if cache is not None:
+            cache.store(xmlfile, obj)
+        return obj
+
+    @classmethod
+    def from_bytes(cls, data, xmlfile=None):
+        """Builds a converter from an in-memory XML document (bytes or str)"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return cls.from_tree(etree.fromstring(data).getroottree(), xmlfile=xmlfile)
+
+    from_string = from_bytes
+
+    @classmethod
+    def from_tree(cls, tree, xmlfile=None):
+        """
+        Builds a converter around an existing lxml tree (or root element).
+        
+        The tree is used as-is (not copied), so it will be modified by `convert`.
+        """
+        if not hasattr(tree, 'getroot'):  # got an element
+            tree = tree.getroottree()
         root = tree.getroot()
         model = root.get("beautitemplate")
+        return cls.get_class(model)(xmlfile, tree=tree, root=root, model=model)
+    
+    @classmethod
+    def from_nexus(cls, nexfile, template):
+        """
+        Builds a converter from the alignment in the NEXUS file `nexfile`, using the
+        single partition XML `template` for everything else.
         
+        Partitions are taken from any charsets in `nexfile`, otherwise from the
+        CHARSTATELABELS as usual. Without CHARSTATELABELS the sites are named after
+        their charsets (see `NexusReader.make_labels`).
+        """
+        nex = read_nexus(nexfile)
+        obj = cls.from_tree(etree.parse(str(template)))
+        obj.set_alignment(nex.labels or nex.make_labels(), nex.matrix)
+        if nex.charsets:
+            asc = set(obj.ascertainment)
+            obj.partitions = sort_partitions({
+                name: [s for s in sites if s not in asc] for name, sites in nex.charsets.items()
+            })
+        return obj
+
+    @staticmethod
+    def get_class(model):
         if model == "BinaryCovarion":
-            return CovarionConverter(xmlfile, tree=tree, root=root, model=model)
+            return CovarionConverter
         elif model == "BinaryCTMC":
-            return CTMCConverter(xmlfile, tree=tree, root=root, model=model)
-        else:
-            warn(f"Unsupported beauti template: {model}")
-            return Converter(xmlfile, tree=tree, root=root, model=model)
+            return CTMCConverter
+        warn(f"Unsupported beauti template: {model}")
+        return Converter
+
+    def copy(self):
+        """
+        Returns a new converter with a copy of the tree. This is much cheaper than
+        re-parsing so use it to convert the same input many times.
+        """
+        obj = self.__class__(self.xmlfile, tree=deepcopy(self.tree), model=self.model)
+        obj._words = list(self.words)
+        obj._partitions = sort_partitions({p: list(s) for p, s in self.partitions.items()})
+        obj._ascertainment = list(self.ascertainment)
+        obj._alignment = self._alignment  # never changed in place so safe to share
+        obj.keep_taxa, obj.drop_constant = self.keep_taxa, self.drop_constant
+        return obj
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = etree.parse(self.xmlfile)
+        return self._tree
+    
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = self.tree.getroot()
+        return self._root
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self.root.get("beautitemplate")
+        return self._model
+
+    def invalidate(self):
+        """Forgets the cached words/partitions/alignment so they are re-read from the tree"""
+        self._words = None
+        self._partitions, self._ascertainment = None, None
+        self._alignment = None
+        self._partitioned = None
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = self.get_words()
+        return self._words
+    
+    @words.setter
+    def words(self, value):
+        self._words = value
+
+    @property
+    def partitions(self):
+        if self._partitions is None:
+            self._partitions, self._ascertainment = self.get_partitions()
+        return self._partitions
+    
+    @partitions.setter
+    def partitions(self, value):
+        self._partitions = value
+    
+    @property
+    def ascertainment(self):
+        if self._ascertainment is None:
+            self._partitions, self._ascertainment = self.get_partitions()
+        return self._ascertainment
+    
+    @ascertainment.setter
+    def ascertainment(self, value):
+        self._ascertainment = value
+
+    @property
+    def partitioned(self):
+        """
+        True if this document has already been partitioned (i.e. is our own output)
+        """
+        if self._partitioned is None:
+            if any(self.parse_word(char)[0] == '_ascertainment' for (char, _) in self.words):
+                self._partitioned = False  # no need to look at the tree
+            else:
+                self._partitioned = bool(self.xpath(
+                    ".//data[@spec='FilteredAlignment']/data[@spec='FilteredAlignment']"
+                ))
+        return self._partitioned
+
+    @property
+    def data(self):
+        """The top-level alignment (<data>) element"""
+        return self.root.find('data')
+
+    @property
+    def alignment(self):
+        """Dictionary of {sequence id: sequence value}"""
+        if self._alignment is None:
+            # n.b. whitespace (e.g. between our partitions) is not part of the sequence
+            self._alignment = {
+                s.get('id'): "".join(s.get('value').split()) for s in self.data.iter('sequence')
+            }
+        return self._alignment
+
+    def set_alignment(self, labels, sequences):
+        """
+        Replaces the sequences and charstatelabels in the alignment with `sequences`
+        (a dictionary of {taxon: sequence}) and `labels` (a list of site names).
+        """
+        for taxon, seq in sequences.items():
+            if len(seq) != len(labels):
+                raise ValueError(f"Sequence for {taxon} has {len(seq)} sites, expected {len(labels)}")
+        
+        old = list(self.data.iter('sequence'))
+        template = old[0] if old else etree.Element("sequence", spec="Sequence", totalcount="2")
+        index = self.data.index(old[0]) if old else 0
+        for o in old:
+            self.data.remove(o)
+        for i, (taxon, seq) in enumerate(sequences.items()):
+            new = self.patch(template, {'id': f"seq_{taxon}", 'taxon': taxon, 'value': seq})
+            self.data.insert(index + i, new)
+        
+        udt = self.data.find('userDataType')
+        for o in udt.getchildren():
+            udt.remove(o)
+        for i, label in enumerate(labels):
+            etree.SubElement(udt, "charstatelabels",
+                id=f"UserDataType.{i}",
+                spec="beast.base.evolution.datatype.UserDataType",
+                characterName=label,
+                codeMap="", states="-1", value="")
+        
+        self.invalidate()
+        self.words = [(label, f"UserDataType.{i}") for i, label in enumerate(labels)]
+        self._alignment = {f"seq_{taxon}": seq for taxon, seq in sequences.items()}
+
+    def set_taxa(self, keep=None, exclude=None, drop_constant=False):
+        """
+        Restricts the conversion to the taxa in `keep`, or all but those in `exclude`.
+        
+        If `drop_constant` is True then any sites that are constant in the remaining
+        taxa are removed.
+        """
+        taxa = {s.get('taxon') for s in self.data.iter('sequence')}
+        requested = set(keep if keep is not None else exclude or [])
+        if unknown := sorted(requested - taxa):
+            warn(f"Unknown taxa: {unknown}")
+        
+        if keep is not None:
+            keep = requested & taxa
+        elif exclude is not None:
+            keep = taxa - requested
+        if keep is not None and not keep:
+            raise ValueError("No taxa left to analyse")
+        self.keep_taxa, self.drop_constant = keep, drop_constant
+
+    def get_sequences(self):
+        """Returns the {sequence id: sequence} of the taxa we're keeping (see `set_taxa`)"""
+        sequences = self.alignment
+        if self.keep_taxa is not None:
+            taxa = {s.get('id'): s.get('taxon') for s in self.data.iter('sequence')}
+            sequences = {k: v for (k, v) in sequences.items() if taxa[k] in self.keep_taxa}
+        return sequences
+
+    def get_constant_sites(self):
+        """Returns the set of sites that `drop_constant` would remove"""
+        sequences = self.get_sequences()
+        return {s for sites in self.partitions.values() for s in sites if is_constant(sequences, s)}
+
+    def verify(self, sequences=None):
+        """
+        Checks the converted alignment against the input, see `beastwords.verify`.
+        
+        Needs `verifiable` to have been set before converting. Returns a list of
+        problems, which list the wrong sites if given the input's `sequences`.
+        """
+        if self._source is None:
+            raise ValueError("Nothing to verify, set `verifiable` before converting")
+        if self.metrics is not None:
+            with self.metrics.stage('verify'):
+                return verify_tree(self.root, *self._source, sequences=sequences)
+        return verify_tree(self.root, *self._source, sequences=sequences)
+
+    def preflight(self):
+        """
+        Checks that everything the conversion needs is there, in one pass over the
+        document. Returns a list of problems, which is empty if it's fine to convert.
+        """
+        if self.metrics is not None:
+            with self.metrics.stage('parse'):  # so that's not counted as preflight
+                self.tree
+            with self.metrics.stage('preflight'):
+                return self._check_all()
+        return self._check_all()
+    
+    def _check_all(self):
+        problems = []
+        if self.__class__ is Converter:
+            problems.append(f"Unsupported beauti template: {self.model}")
+        if self.data is None:
+            return problems + ["Missing <data> alignment"]
+        index = defaultdict(list)
+        for el in self.root.iter(etree.Element):
+            index[el.tag].append(el)
+        self._preflight(index, problems)
+        return problems
+    
+    def _require(self, problems, index, tag, attr=None, value=None, prefix=False, many=True):
+        """
+        Adds a problem to `problems` unless there's a <tag> element in `index` whose `attr`
+        is `value` (or starts with it if `prefix`). If `many` is False there must only be one.
+        """
+        found = index[tag]
+        if attr is not None:
+            if prefix:
+                found = [e for e in found if e.get(attr, '').startswith(value)]
+            else:
+                found = [e for e in found if e.get(attr) == value]
+        name = f"<{tag}>" if attr is None else f"<{tag} {attr}='{value}{'...' if prefix else ''}'>"
+        if not found:
+            problems.append(f"Missing {name}")
+        elif len(found) > 1 and not many:
+            problems.append(f"Expected one {name}, found {len(found)}")
+        return found
+    
+    def _preflight(self, index, problems):
+        # alignment
+        sequences = list(self.data.iter('sequence'))
+        if self.data.find('userDataType') is None:
+            problems.append("Missing <userDataType> in <data>")
+        if not sequences:
+            problems.append("No <sequence>s in <data>")
+        nsites = len(self.words)
+        wrong = [s.get('id') for s in sequences if len(self.alignment.get(s.get('id'), '')) != nsites]
+        if wrong:
+            more = f" and {len(wrong) - 5} more" if len(wrong) > 5 else ""
+            problems.append(
+                f"Sequences with a different number of sites to the {nsites} charstatelabels: "
+                f"{', '.join(wrong[:5])}{more}"
+            )
+        
+        # state, prior, treelikelihood
+        self._require(problems, index, 'state', 'id', 'state', many=False)
+        self._require(problems, index, 'distribution', 'id', 'prior', many=False)
+        self._require(problems, index, 'distribution', 'id', 'likelihood', many=False)
+        # either one FilteredAlignment, or already partitioned with them nested in each other
+        filtered = self._require(problems, index, 'data', 'spec', 'FilteredAlignment')
+        nested = any(e.getparent().get('spec') == 'FilteredAlignment' for e in filtered)
+        if len(filtered) > 1 and not nested:
+            problems.append(f"Expected one <data spec='FilteredAlignment'>, found {len(filtered)}")
+        self._require(problems, index, 'branchRateModel', many=False)
+        for init in self._require(problems, index, 'init', many=False):
+            if init.get('initial') is None:
+                problems.append("Missing initial= on <init>")
+            break
+        self._require(problems, index, 'substModel', many=self.many_substmodels)
+        
+        # operators, log
+        self._require(problems, index, 'operator')
+        self._require(problems, index, 'log', 'idref', 'treeLikelihood.', prefix=True)
+        self._require(problems, index, 'log', 'idref', 'mutationRate.s', prefix=True)
     
     def get_words(self):
+        if self._tree is None and self.xmlfile is not None:
+            # not parsed yet, so don't bother parsing the whole thing just for the labels
+            return scan_words(self.xmlfile)
         words = []
-        for e in self.root.findall(".//charstatelabels"):
+        for e in self.data.iter("charstatelabels"):
             words.append((e.get('characterName'), e.get('id')))
         return words
     
+    def report(self, stage, done, total):
+        """Tells the progress callback (if any) how far we've got, raising `Cancelled` if it says to stop"""
+        if self.progress is not None and self.progress(stage, done, total) is False:
+            raise Cancelled(f"Conversion cancelled during {stage}")
+    
+    def xpath(self, path, element=None):
+        """Runs the XPath query `path` on `element` (default: the root)"""
+        if self.metrics is not None:
+            self.metrics.count('xpath')
+        return (self.root if element is None else element).xpath(path)
+    
     def patch(self, element, newattrib={}, update=False):
         """
         Clones `element`, updating it with key:values in `newattrib`
@@ -52,6 +448,8 @@ class Converter(object):
         If `update` is False - returns a clone, if true then it alters the original
         """
         new = deepcopy(element) if not update else element
+        if not update and self.metrics is not None:
+            self.metrics.count('deepcopy')
         for key, value in newattrib.items():
             new.set(key, value)
         return new
@@ -59,11 +457,13 @@ class Converter(object):
     def patch_child_ids(self, element, partition):
         """Iterates over children ids and adds the partition name to their IDs"""
         new = deepcopy(element)
+        if self.metrics is not None:
+            self.metrics.count('deepcopy')
         # do root
         old_id = new.get("id").split(":")[0]
         new.set("id", f"{old_id}:{partition}")
         # now do children
-        for el in new.xpath(".//*[@id]"):
+        for el in self.xpath(".//*[@id]", new):
             old_id = el.get("id").split(":")[0]
             el.set("id", f"{old_id}:{partition}")
         return new
@@ -71,20 +471,24 @@ class Converter(object):
     def replace(self, xpath, **kwargs):
         """
         Replaces a single element with one for each partition, setting values to kwargs
+        
+        If the document is already partitioned then all the old per-partition elements
+        are replaced, using the first one as the template.
         """
-        old = self.root.xpath(xpath)
+        old = self.xpath(xpath)
         if len(old) == 0:
             raise ValueError(f"Can't find element: {xpath}")
-        elif len(old) > 1:
+        elif len(old) > 1 and not self.partitioned:
             raise ValueError(f"Found many elements: {xpath}")
         
         for p in sorted(self.partitions):
             attr = {k: v.format(p) for (k, v) in kwargs.items()}
             new = self.patch(old[0], newattrib=attr, update=False)
-            parent = old[0].getparent()
-            index = parent.index(old[0])
-            parent.insert(index + 1, new)
-        old[0].getparent().remove(old[0])  # remove old one
+            # n.b. addnext rather than parent.insert(index + 1) which walks all the
+            # siblings before it, and there can be thousands of those from other partitions
+            old[0].addnext(new)
+        for o in old:
+            o.getparent().remove(o)  # remove old ones
         
     def parse_word(self, w):
         if 'ascertainment' in w:
@@ -95,20 +499,24 @@ class Converter(object):
         return w.replace("_u_", "_").rsplit("_" ,1)
     
     def set_partitions(self, size):
-        try:
-            size = int(size)
-            self.partitions = repartition_by_size(size, self.partitions)
-        except ValueError:
-            self.partitions = repartition_by_groupsize(size, self.partitions)
-        except:
-            raise
+        self.partitions = sort_partitions(repartition(size, self.partitions, ignore=self.ascertainment))
     
     def get_partitions(self):
         partitions = defaultdict(list)
+        if self.partitioned:  # our own output: <partition>_<index> with index 0 the ascertainment site
+            ascertainment = []
+            for i, (char, _id) in enumerate(self.words, 0):
+                p, index = self.parse_word(char)
+                if index == '0':
+                    ascertainment.append(i)
+                else:
+                    partitions[p].append(i)
+            return (sort_partitions(partitions), ascertainment)
+        
         for i, (char, _id) in enumerate(self.words, 0):
             partitions[self.parse_word(char)[0]].append(i)
         ascertainment = partitions.pop("_ascertainment", [])
-        return (partitions, ascertainment)
+        return (sort_partitions(partitions), ascertainment)
 
     def get_gamma(self):
         return 1  # assuming we don't want a gamma per partition here.
@@ -132,51 +540,42 @@ class Converter(object):
         return ",".join(runs)
 
     def _convert_sequences(self):  # i.e. add ascertainment characters into each partition
-        # get sequences
-        sequences = {s.get('id'): s.get('value') for s in self.root.xpath('.//sequence')}
-        # convert sequences in XML to dictionary of {'partition': {'taxon1': '...', 'taxon2': '...'}}
+        sequences = self.get_sequences()  # only the taxa we want
+        partitions = self.partitions
+        if self.drop_constant:
+            variable = {
+                p: [s for s in sites if not is_constant(sequences, s)] for (p, sites) in partitions.items()
+            }
+            for p in [p for p in variable if not variable[p]]:
+                warn(f"Partition {p} has no variable sites left, removing it")
+            partitions = {p: sites for (p, sites) in variable.items() if sites}
+        
         # n.b. this will ignore the old 'ascertainment' character (effectively deleting it) 
         # as it's not in the list of partitions
-        new = defaultdict(lambda: defaultdict(list))
-        for taxon in sequences:
-            for partition, sites in self.partitions.items():
-                for s in sites:
-                    new[partition][taxon].append(sequences[taxon][s])
-        
-        # loop over partitions, create an ascertainment character and insert it at pos 0
-        for partition in new:
-            for taxon in new[partition]:
-                # identify ascertainment character
-                if all(c == '?' for c in new[partition][taxon]):
-                    ascertainment = '?'
-                elif all(c == '-' for c in new[partition][taxon]):
-                    ascertainment = '-'
-                else:
-                    ascertainment = '0'
-                new[partition][taxon].insert(0, ascertainment)
+        # each partition gets its ascertainment character at position 0
+        positions = [(p, i) for p in sorted(partitions) for i in range(len(partitions[p]) + 1)]
+        if self.verifiable:
+            self._source = (partitions, checksum(sequences, partitions))
         
-        # ok, now regenerate sequences and figure out positions
-        positions = [] # we have `taxon` initialised above, we'll count that one
-        for oldseq in self.root.xpath('.//sequence'):
+        # ok, now regenerate sequences
+        old = list(self.data.iter('sequence'))
+        for i, oldseq in enumerate(old):
+            self.report('sequences', i, len(old))
             seqid = oldseq.get('id')
+            if seqid not in sequences:  # removed taxon
+                oldseq.getparent().remove(oldseq)
+                continue
             newseq = etree.Element("sequence", id=seqid, taxon=oldseq.get('taxon'), spec="Sequence", totalcount="2")
-            value = []
-            for partition in sorted(new):
-                value.append("".join(new[partition][seqid]))
-                
-                if oldseq.get('id') == taxon:
-                    positions.extend([
-                        (partition, i) for i, _ in enumerate(new[partition][seqid])
-                    ])
-            
-            newseq.set('value', " ".join(value))
+            newseq.set('value', encode_sequence(sequences[seqid], partitions))
             oldseq.getparent().append(newseq)  # add new sequence
             oldseq.getparent().remove(oldseq)  # remove old seq
+        self.report('sequences', len(old), len(old))
         
         # generate userDataType -- find old userDataType, and update
         # while we're here we will update ascertainment/partitions
+        self.invalidate()
         self.partitions, self.ascertainment = defaultdict(list), []
-        udt = self.root.xpath('./data/userDataType')[0]
+        udt = self.data.find('userDataType')
         # remove old chars
         for o in udt.getchildren():
             udt.remove(o)
@@ -192,22 +591,64 @@ class Converter(object):
             self.partitions[char].append(i)
             if index == 0:
                 self.ascertainment.append(i)
+        self.words = [(e.get('characterName'), e.get('id')) for e in udt]
+        
+    def _convert_taxa(self):
+        """Removes any references to taxa we aren't keeping (see `set_taxa`)"""
+        if self.keep_taxa is None:
+            return
+        # <taxon id="Taxon1" spec="Taxon"/> or <taxon idref="Taxon1"/>
+        changed = []  # taxonsets that have lost taxa
+        for el in list(self.root.iter('taxon')):
+            if (el.get('id') or el.get('idref')) not in self.keep_taxa:
+                if el.getparent().tag == 'taxonset':
+                    changed.append(el.getparent())
+                el.getparent().remove(el)
         
+        # tip dates etc: <trait ... value="Taxon1=10,Taxon2=20">
+        for trait in self.root.iter('trait'):
+            entries = [e for e in trait.get('value', '').split(',') if e.strip()]
+            trait.set('value', ",".join(
+                e for e in entries if e.split('=')[0].strip() in self.keep_taxa
+            ))
+        
+        # remove constraints (e.g. MRCAPriors) on taxonsets that have lost any taxa, as
+        # a clade without some of its members isn't the same constraint any more
+        ids = {ts.get('id') for ts in changed if ts.get('id')}
+        changed += [ts for ts in self.root.iter('taxonset') if ts.get('idref') in ids]
+        for ts in changed:
+            prior = ts.getparent()
+            while prior is not None and prior.tag == 'taxonset':  # nested taxonsets
+                prior = prior.getparent()
+            if prior is None or prior.getparent() is None or not self.is_clade_prior(prior):
+                continue  # e.g. the tree's or a trait's taxonset
+            warn(f"Removing {prior.get('id')} as some of its taxa have been removed")
+            for log in self.xpath(f".//log[@idref='{prior.get('id')}']"):
+                log.getparent().remove(log)
+            prior.getparent().remove(prior)
+
+    @staticmethod
+    def is_clade_prior(el):
+        """True if `el` is a constraint on a taxonset (e.g. a MRCAPrior)"""
+        if 'MRCAPrior' in el.get('spec', ''):
+            return True
+        return el.tag in ('prior', 'distribution') and el.find('taxonset') is not None
+
     def _convert_state(self):
         path = ".//state[@id='state']/parameter[starts-with(@id, 'mutationRate.s:')]"
-        mr = self.root.xpath(path)
+        mr = self.xpath(path)
         if len(mr) == 0: # Simon likes to delete these from one partiton runs. Make one up
             #<parameter id="mutationRate.s:overall" spec="parameter.RealParameter" name="stateNode">1.0</parameter>
             p = etree.Element("parameter",
                 id="mutationRate.s:dummy", spec="parameter.RealParameter", name="stateNode")
             p.text = "1.0"
-            self.root.xpath(".//state[@id='state']")[0].append(p)
+            self.xpath(".//state[@id='state']")[0].append(p)
         self.replace(path, id="mutationRate.s:{}")
 
     def _convert_prior(self):
-        prior = self.root.xpath(".//distribution[@id='prior']")[0]
+        prior = self.xpath(".//distribution[@id='prior']")[0]
         path = ".//prior[starts-with(@id, 'MutationRatePrior.s:')]"
-        mrp = prior.xpath(path)
+        mrp = self.xpath(path, prior)
         if len(mrp) == 0: # Simon likes to delete these from one partiton runs. Make one up
             mrp = etree.Element("prior",
                 id="MutationRatePrior.s:dummy", name="distribution", x="@mutationRate.s:dummy")
@@ -216,7 +657,7 @@ class Converter(object):
         
         self.replace(path, id="MutationRatePrior.s:{}", x="@mutationRate.s:{}")
         # and update internal OneOnX
-        for o in self.root.xpath(path):
+        for o in self.xpath(path):
             p = o.get('id').split(":")[1]
             o.getchildren()[0].set('id', f"OneOnX:{p}")
             
@@ -242,36 +683,40 @@ class Converter(object):
         # </distribution>
         
         # find data/sequence
-        data = self.root.xpath('.//data[@spec="FilteredAlignment"]')
-        if len(data) > 1:
-            raise ValueError("I can't handle multiple partitions")
-        data = data[0]
+        if self.partitioned:  # rebuild every partition, the nested <data> points at the sequences
+            data = self.xpath('.//data[@spec="FilteredAlignment"]/data[@spec="FilteredAlignment"]')[0]
+        else:
+            data = self.xpath('.//data[@spec="FilteredAlignment"]')
+            if len(data) > 1:
+                raise ValueError("I can't handle multiple partitions")
+            data = data[0]
         seq = data.get('data')
 
         # find brm
-        brm = self.root.xpath('.//branchRateModel')[0]
+        brm = self.xpath('.//branchRateModel')[0]
         assert brm is not None, "Unable to find branchRateModel"
         brm_id = brm.get('id')
         # -> we will move this into the first partition later
 
         # find tree
-        tree = self.root.xpath('.//init')[0]
+        tree = self.xpath('.//init')[0]
         assert tree is not None, "Unable to find tree"
         tree_id = tree.get('initial')
         
         # find substModel
-        substModel = self.root.xpath(".//substModel")[0]
+        substModel = self.xpath(".//substModel")[0]
         assert substModel is not None, "Unable to find substModel"
         
         # find Lh and treeLh
-        likelihood = self.root.xpath(f".//distribution[@id='likelihood']")[0]
+        likelihood = self.xpath(f".//distribution[@id='likelihood']")[0]
         assert likelihood is not None, "Unable to find likelihood"
-        treeLh = likelihood.xpath(".//distribution[@spec='TreeLikelihood']")[0]
+        treeLh = self.xpath(".//distribution[@spec='TreeLikelihood']", likelihood)
         
         # add the required substModels and put them after the state
-        state = self.root.xpath(f".//state[@id='state']")[0]
+        state = self.xpath(f".//state[@id='state']")[0]
         
-        for i, p in enumerate(self.partitions):
+        for i, p in enumerate(sorted(self.partitions)):
+            self.report('treelikelihood', i, len(self.partitions))
             # 1. construct <distribution>
             distribution = etree.Element("distribution",
                 id=f"treeLikelihood.{p}",
@@ -319,13 +764,16 @@ class Converter(object):
             likelihood.append(distribution)
         
         # cleanup old stuff.
-        data.getparent().remove(data)
-        treeLh.getparent().remove(treeLh)
-        substModel.getparent().remove(substModel)
+        if not self.partitioned:
+            data.getparent().remove(data)
+            substModel.getparent().remove(substModel)
+        for t in treeLh:  # (the partitioned data and substModels go with these)
+            t.getparent().remove(t)
+        self.report('treelikelihood', len(self.partitions), len(self.partitions))
 
     def _convert_operators(self):
         path = ".//operator[starts-with(@id, 'mutationRateScaler.s:')]"
-        mrs = self.root.xpath(path)
+        mrs = self.xpath(path)
         if len(mrs) == 0: # Simon likes to delete these from one partiton runs. Make one up
             # <operator id="mutationRateScaler.s:hand" spec="ScaleOperator" parameter="@mutationRate.s:hand" scaleFactor="0.5" weight="0.1"/>
             mrs = etree.Element("operator",
@@ -333,7 +781,7 @@ class Converter(object):
                 scaleFactor="0.5", weight="0.1")
 
             # find last operator
-            last = self.root.xpath(".//operator")[-1]
+            last = self.xpath(".//operator")[-1]
             last.getparent().append(mrs)
             parent = last.getparent()
             index = parent.index(last)
@@ -347,13 +795,35 @@ class Converter(object):
         # <log idref="mutationRate.s:hand"/>
         self.replace(".//log[starts-with(@idref, 'mutationRate.s')]", idref="mutationRate.s:{}")
     
-    def convert(self):
-        self._convert_sequences() # should go first i think
-        self._convert_state()
-        self._convert_prior()
-        self._convert_treelikelihood()
-        self._convert_operators()
-        self._convert_log()
+    def convert(self, plan=None):
+        """
+        Converts the document. If a `PartitionPlan` is given then its partitions are used.
+        
+        Raises `Cancelled` if the `progress` callback asks to stop.
+        """
+        if plan is not None:
+            plan.apply(self)
+        stages = [
+            ('sequences', self._convert_sequences),  # should go first i think
+            ('taxa', self._convert_taxa),
+            ('state', self._convert_state),
+            ('prior', self._convert_prior),
+            ('treelikelihood', self._convert_treelikelihood),
+            ('operators', self._convert_operators),
+            ('log', self._convert_log),
+        ]
+        # these report (i, N) for each taxon/partition themselves, the others are one step
+        counted = ('sequences', 'treelikelihood')
+        if self.metrics is not None:
+            with self.metrics.stage('parse'):  # if it hasn't been parsed already
+                self.tree
+        for name, stage in stages:
+            if name not in counted:
+                self.report(name, 0, 1)
+            with self.metrics.stage(name, self.root) if self.metrics is not None else nullcontext():
+                stage()
+            if name not in counted:
+                self.report(name, 1, 1)
         
     def __str__(self):
         return self.write(self.tree)
@@ -363,15 +833,28 @@ class Converter(object):
         etree.indent(el)  # needed to 'reset' the indentation
         return etree.tostring(el, pretty_print=True, encoding='unicode')
     
-    def to_file(self, filename):
+    def to_tree(self):
+        return self.tree
+
+    def to_bytes(self):
+        if self.metrics is not None:
+            with self.metrics.stage('serialize'):
+                return self._to_bytes()
+        return self._to_bytes()
+    
+    def _to_bytes(self):
         etree.indent(self.tree)  # needed to 'reset' the indentation
-        self.tree.write(
-            filename,
+        return etree.tostring(
+            self.tree,
             xml_declaration=True,
             encoding="UTF-8",
             standalone="no",
             pretty_print=True
         )
+    
+    def to_file(self, filename):
+        with open(filename, 'wb') as handle:
+            handle.write(self.to_bytes())
 
 
 class CovarionConverter(Converter):
@@ -382,25 +865,39 @@ class CovarionConverter(Converter):
     
     def _convert_state(self):
         super()._convert_state()
-        el = self.root.xpath(".//parameter[starts-with(@id, 'bcov_alpha.s:')]")[0]
+        el = self.xpath(".//parameter[starts-with(@id, 'bcov_alpha.s:')]")[0]
         assert el is not None, 'Unable to find original parameter/bcov_alpha.s:<.*>'
         el.set('id', "bcov_alpha.s:combined")
         
-        el = self.root.xpath(".//parameter[starts-with(@id, 'bcov_s.s:')]")[0]
+        el = self.xpath(".//parameter[starts-with(@id, 'bcov_s.s:')]")[0]
         assert el is not None, 'Unable to find original parameter/bcov_s.s:<.*>'
         el.set('id', "bcov_s.s:combined")
         
-        el = self.root.xpath(".//parameter[starts-with(@id, 'frequencies.s:')]")[0]
+        el = self.xpath(".//parameter[starts-with(@id, 'frequencies.s:')]")[0]
         assert el is not None, 'Unable to find original parameter/frequencies.s:<.*>'
         el.set('id', "frequencies.s:combined")
         return el
     
+    def _preflight(self, index, problems):
+        super()._preflight(index, problems)
+        for prefix in ('bcov_alpha.s:', 'bcov_s.s:', 'frequencies.s:'):
+            self._require(problems, index, 'parameter', 'id', prefix, prefix=True)
+            self._require(problems, index, 'log', 'idref', prefix, prefix=True)
+        for prefix in ('bcov_alpha_prior.s:', 'bcov_s_prior.s:'):
+            self._require(problems, index, 'prior', 'id', prefix, prefix=True)
+        for prefix in ('bcovAlphaScaler.s:', 'bcovSwitchParamScaler.s:'):
+            self._require(problems, index, 'operator', 'id', prefix, prefix=True)
+        for op in self._require(problems, index, 'operator', 'id', 'frequenciesDelta.s:', prefix=True):
+            if not len(op):
+                problems.append("Missing parameter inside <operator id='frequenciesDelta.s:...'>")
+            break
+    
     def _add_substmodel(self, partition, siteModel):
         if self.has_siteModel: # just add an attribute
             siteModel.set("substModel", "@covarion:combined")
         else:  # add the whole model
             # 1. find old one
-            old = self.root.xpath(".//*/substModel")
+            old = self.xpath(".//*/substModel")
             assert len(old) == 1, f"Expected 1 substModel, got {old}"
             new = self.patch(old[0], {
                 'id': 'covarion:combined',
@@ -423,28 +920,28 @@ class CovarionConverter(Converter):
     def _convert_prior(self):
         super()._convert_prior()
         self.patch(
-            self.root.xpath(".//prior[starts-with(@id, 'bcov_alpha_prior.s:')]")[0],
+            self.xpath(".//prior[starts-with(@id, 'bcov_alpha_prior.s:')]")[0],
             {'id': 'bcov_alpha_prior.s:combined', 'x': "@bcov_alpha.s:combined"},
             update=True)
         self.patch(
-            self.root.xpath(".//prior[starts-with(@id, 'bcov_s_prior.s:')]")[0],
+            self.xpath(".//prior[starts-with(@id, 'bcov_s_prior.s:')]")[0],
             {'id': 'bcov_s_prior.s:combined', 'x': "@bcov_s.s:combined"},
             update=True)
 
     def _convert_operators(self):
         super()._convert_operators()
         op = self.patch(
-            self.root.xpath(".//operator[starts-with(@id, 'bcovAlphaScaler.s:')]")[0],
+            self.xpath(".//operator[starts-with(@id, 'bcovAlphaScaler.s:')]")[0],
             {'id': 'bcovAlphaScaler.s:combined', 'parameter': "@bcov_alpha.s:combined"},
             update=True)
             
         op = self.patch(
-            self.root.xpath(".//operator[starts-with(@id, 'bcovSwitchParamScaler.s:')]")[0],
+            self.xpath(".//operator[starts-with(@id, 'bcovSwitchParamScaler.s:')]")[0],
             {'id': 'bcovSwitchParamScaler.s:combined', 'parameter': "@bcov_s.s:combined"},
             update=True)
         
         op = self.patch(
-            self.root.xpath(".//operator[starts-with(@id, 'frequenciesDelta.s:')]")[0],
+            self.xpath(".//operator[starts-with(@id, 'frequenciesDelta.s:')]")[0],
             {'id': 'frequenciesDelta.s:combined'},
             update=True)
         self.patch(op.getchildren()[0], {'idref': "frequencies.s:combined"}, update=True)
@@ -452,17 +949,17 @@ class CovarionConverter(Converter):
     def _convert_log(self):
         super()._convert_log()
         self.patch(
-            self.root.xpath(".//log[starts-with(@idref, 'bcov_alpha.s:')]")[0],
+            self.xpath(".//log[starts-with(@idref, 'bcov_alpha.s:')]")[0],
             {'idref': 'bcov_alpha.s:combined'},
             update=True)
 
         self.patch(
-            self.root.xpath(".//log[starts-with(@idref, 'bcov_s.s:')]")[0],
+            self.xpath(".//log[starts-with(@idref, 'bcov_s.s:')]")[0],
             {'idref': 'bcov_s.s:combined'},
             update=True)
         
         self.patch(
-            self.root.xpath(".//log[starts-with(@idref, 'frequencies.s:')]")[0],
+            self.xpath(".//log[starts-with(@idref, 'frequencies.s:')]")[0],
             {'idref': 'frequencies.s:combined'},
             update=True)
 
@@ -471,17 +968,18 @@ class CTMCConverter(Converter):
     
     userDataType_spec = "beast.base.evolution.datatype.Binary"
     useAmbiguities = 'false'
+    many_substmodels = True  # one per partition if already partitioned, we copy the first
     
     def _convert_state(self):
         super()._convert_state()
         # already have mutationRate.*
         # add gammaShape & freqParameter
         try:
-            self.replace(".//parameter[starts-with(@id, 'gammaShape.s:')]", id="gammaShape.s:{}")
+            self.replace(".//state[@id='state']/parameter[starts-with(@id, 'gammaShape.s:')]", id="gammaShape.s:{}")
         except ValueError:
             pass
             
-        self.replace(".//parameter[starts-with(@id, 'freqParameter.s:')]", id="freqParameter.s:{}")
+        self.replace(".//state[@id='state']/parameter[starts-with(@id, 'freqParameter.s:')]", id="freqParameter.s:{}")
 
 
     def _convert_prior(self):
@@ -500,26 +998,56 @@ class CTMCConverter(Converter):
             return  # no gamma - nothing to do
         
         # and update internal Exponential
-        for o in self.root.xpath(path):
+        for o in self.xpath(path):
             p = o.get('id').split(":")[1]
             exp = o.getchildren()[0]
-            old_id = exp.get('id').split(".")[0]
+            old_id = exp.get('id').split(":")[0].split(".")[0]
             exp.set('id', f"{old_id}:{p}")
             # and the nested <mean>
-            old_id = exp.getchildren()[0].get('id').split(".")[0]
+            old_id = exp.getchildren()[0].get('id').split(":")[0].split(".")[0]
             exp.getchildren()[0].set('id', f"{old_id}:{p}")
 
+    _substmodel = None
+    _gamma = False  # whether the state has a gammaShape for each partition to refer to
+    
+    def _preflight(self, index, problems):
+        super()._preflight(index, problems)
+        self._require(problems, index, 'parameter', 'id', 'freqParameter.s:', prefix=True)
+        self._require(problems, index, 'log', 'idref', 'freqParameter.s', prefix=True)
+        for op in self._require(problems, index, 'operator', 'id', 'FrequenciesExchanger.s:', prefix=True):
+            if not len(op):
+                problems.append("Missing parameter inside <operator id='FrequenciesExchanger.s:...'>")
+            break
+        substModels = [e for e in index['substModel'] if e.getparent() is not None]
+        if substModels and substModels[0].find('frequencies') is None:
+            problems.append("Missing <frequencies> in <substModel>")
+    
+    def _convert_treelikelihood(self):
+        # find the substModel to copy for each word once, an xpath per word is quadratic
+        self._substmodel = self.xpath(".//*/substModel")[0]
+        self._gamma = bool(self.xpath(".//state[@id='state']/parameter[starts-with(@id, 'gammaShape.s:')]"))
+        try:
+            super()._convert_treelikelihood()
+        finally:
+            self._substmodel, self._gamma = None, False
+
     def _add_substmodel(self, partition, siteModel):
         # ctmc gets one substModel per word
-        old = self.root.xpath(".//*/substModel")  # don't care which one it is 
-        new = self.patch_child_ids(old[0], partition)
+        old = self._substmodel
+        if old is None:
+            old = self.xpath(".//*/substModel")[0]  # don't care which one it is 
+        new = self.patch_child_ids(old, partition)
         # get freq subelement and change frequencies="@freqParameter.s:.."
         #  <frequencies id="estimatedFreqs.s:eye" spec="Frequencies" frequencies="@freqParameter.s:overall"/>
-        f = new.xpath('frequencies')[0]
+        f = self.xpath('frequencies', new)[0]
         f.set('frequencies', f'@freqParameter.s:{partition}')
         siteModel.insert(0, new)
         
-        # handle gamma by removing it being estimated
+        # the state's gammaShape is renamed for each partition (see _convert_state) so
+        # refer to that, otherwise fix the shape here
+        if self._gamma:
+            siteModel.set('shape', f"@gammaShape.s:{partition}")
+            return siteModel
         if 'shape' in siteModel.attrib:
             del(siteModel.attrib['shape'])
         
@@ -540,15 +1068,17 @@ class CTMCConverter(Converter):
         self.replace(".//operator[starts-with(@id, 'FrequenciesExchanger.s:')]", id="FrequenciesExchanger.s:{}")
 
         # patch internal freqParameters and gammaShapeScaler
-        for p in self.partitions:
-            op = self.root.xpath(f".//operator[@id='FrequenciesExchanger.s:{p}']")[0]
+        # n.b. look the operators up once, an xpath per partition is quadratic
+        operators = {}
+        for op in self.root.iter('operator'):
+            operators.setdefault(op.get('id'), op)
+        for p in sorted(self.partitions):
+            op = operators[f'FrequenciesExchanger.s:{p}']
             self.patch(op.getchildren()[0], {'idref': f"freqParameter.s:{p}"}, update=True)
             
-            try:
-                op = self.root.xpath(f".//operator[@id='gammaShapeScaler.s:{p}']")[0]
+            if (op := operators.get(f'gammaShapeScaler.s:{p}')) is not None:
                 op.set("parameter", f"@gammaShape.s:{p}")
-            except:
-                pass  # no gamma
+            # else no gamma
 
     def _convert_log(self):
         super()._convert_log()
@@ -560,22 +1090,152 @@ class CTMCConverter(Converter):
         except ValueError:
             pass  # no gamma
 
-def main():
-    import argparse
-    parser = argparse.ArgumentParser(description='Converts a one partition XML to a partitioned one')
-    parser.add_argument("input", help='filename', type=Path)
-    parser.add_argument("output", help='filename', type=Path)
-    parser.add_argument(
-        '-p', "--partitions", dest='partitions', default=None, type=str,
-        help="set partition number. If this is None use words", action='store'
-    )
-    args = parser.parse_args()
-    
-    xml = Converter.from_file(args.input)
-    if args.partitions:
-        xml.set_partitions(args.partitions)
-    xml.convert()
-    xml.to_file(args.output)
+def normalise_options(partitions=None):
+    """Returns the conversion options as a canonical dictionary"""
+    if partitions is not None:
+        partitions = str(partitions).replace(" ", "")
+        if partitions.isdigit():
+            partitions = int(partitions)
+    return {'partitions': partitions}
+
+
+def convert_file(input, output, partitions=None, cache=None, results=None, template=None, plan=None,
+                 taxa=None, exclude_taxa=None, drop_constant=False, metrics=None, progress=None,
+                 preflight=True, check=False, verify=False):
+    """
+    Converts `input` to `output`, optionally repartitioning into `partitions`.
+    
+    `cache` is a `MetadataCache` for the input's metadata and `results` a `ResultCache`
+    of previous conversions. Returns True if the result came from `results`.
+    
+    If `template` is given then `input` is a NEXUS file and `template` the single
+    partition XML to put it into. `plan` is a `PartitionPlan` to apply instead of `partitions`.
+    
+    `taxa`/`exclude_taxa` are lists of taxa to keep/remove (see `Converter.set_taxa`).
+    
+    `metrics` is a `Metrics` to record the conversion in, and `progress` a progress
+    callback (see `beastwords.progress`). If that cancels the conversion nothing is written.
+    
+    Unless `preflight` is False, raises `PreflightError` before doing any work if the
+    input is missing anything the conversion needs. If `check` is True then the
+    converted document is checked (see `beastwords.check`) and `CheckError` raised,
+    without writing anything, if it has broken references, duplicate ids or filters.
+    Likewise if `verify` is True the converted sequences are checked against the
+    input (see `beastwords.verify`), raising `VerifyError` if they don't match.
+    """
+    options = normalise_options(partitions)
+    if template is not None:
+        options['template'] = hash_file(template)
+    if plan is not None:
+        options['plan'] = plan.to_dict()
+    if taxa is not None or exclude_taxa is not None or drop_constant:
+        options['taxa'] = sorted(taxa) if taxa is not None else None
+        options['exclude_taxa'] = sorted(exclude_taxa) if exclude_taxa is not None else None
+        options['drop_constant'] = drop_constant
+    if results is not None:
+        key = results.key(input, options)
+        if (hit := results.get(key)) is not None:
+            shutil.copyfile(hit, output)
+            return True
+    
+    if template is not None:
+        xml = Converter.from_nexus(input, template)
+    else:
+        xml = Converter.from_file(input, cache=cache)
+    xml.metrics, xml.progress, xml.verifiable = metrics, progress, verify
+    if preflight and (problems := xml.preflight()):
+        raise PreflightError(problems, input)
+    if 'taxa' in options:
+        xml.set_taxa(keep=taxa, exclude=exclude_taxa, drop_constant=drop_constant)
+    if options['partitions']:
+        xml.set_partitions(options['partitions'])
+    xml.convert(plan)
+    if verify and xml.verify():
+        # re-read the input to find out which sites are wrong
+        source = Converter.from_nexus(input, template) if template is not None else Converter.from_file(input)
+        raise VerifyError(xml.verify(source.alignment), output)
+    if check and (problems := check_tree(xml.root)):
+        raise CheckError(problems, output)
+    data = xml.to_bytes()
+    with open(output, 'wb') as handle:
+        handle.write(data)
+    if results is not None:
+        results.put(key, data)
+    return False
+
+
+def _run(parser, args):
+    """Runs the `beastwords` command once `beastwords.cli` has parsed and checked `args`"""
+    taxa = read_taxa(args.taxa) if args.taxa else None
+    exclude_taxa = read_taxa(args.exclude_taxa) if args.exclude_taxa else None
+    
+    cache = MetadataCache(args.cache, alignment=True) if args.cache else None
+    results = ResultCache(args.results) if args.results else None
+    if args.sweep or args.replicates:
+        if args.template:
+            xml = Converter.from_nexus(args.input, args.template)
+        else:
+            xml = Converter.from_file(args.input, cache=cache)
+        if taxa or exclude_taxa or args.drop_constant:
+            xml.set_taxa(keep=taxa, exclude=exclude_taxa, drop_constant=args.drop_constant)
+        if problems := xml.preflight():
+            sys.exit(str(PreflightError(problems, args.input)))
+    
+    if args.sweep:
+        from beastwords.sweep import sweep, parse_range
+        for row in sweep(xml, parse_range(args.sweep), args.output, jobs=args.jobs, stem=args.input.stem):
+            print("\t".join(f"{k}={v}" for k, v in row.items()))
+        return
+    elif args.replicates:
+        from beastwords.replicates import replicates
+        replicates(
+            xml, args.replicates, args.output, resample=args.resample, seed=args.seed,
+            scheme=args.partitions, jobs=args.jobs, stem=args.input.stem
+        )
+        return
+    
+    plan = PartitionPlan.load(args.plan) if args.plan else None
+    if args.watch:
+        from beastwords.watch import Watcher
+        watcher = Watcher(
+            args.input, args.output, partitions=args.partitions, plan=plan, taxa=taxa,
+            exclude_taxa=exclude_taxa, drop_constant=args.drop_constant
+        )
+        def report(result):
+            if isinstance(result, ValueError):
+                message = f"failed: {result}"
+            elif isinstance(result, Exception):
+                message = f"failed: {result.__class__.__name__}: {result}"
+            elif result == 'full':
+                message = f"converted {args.input} -> {args.output}"
+            else:
+                message = f"updated {len(result)} sequence(s) in {args.output}"
+            print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+        print(f"Watching {args.input} (Ctrl-C to stop)", flush=True)
+        try:
+            watcher.run(interval=args.interval, callback=report)
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    from beastwords.metrics import Metrics
+    metrics = Metrics() if args.metrics else None
+    show = args.progress if args.progress is not None else sys.stderr.isatty()
+    progress = ProgressBar() if show else None
+    try:
+        convert_file(
+            args.input, args.output, partitions=args.partitions, cache=cache, results=results,
+            template=args.template, plan=plan, taxa=taxa, exclude_taxa=exclude_taxa,
+            drop_constant=args.drop_constant, metrics=metrics, progress=progress, check=args.check,
+            verify=args.verify
+        )
+    except (PreflightError, PlanError, CheckError, VerifyError) as e:
+        sys.exit(str(e))
+    finally:
+        if progress is not None:
+            progress.close()
+    if metrics is not None:
+        metrics.save(args.metrics)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,95 @@
+"""
+Per-stage timings, memory and operation counts for a conversion.
+
+    xml = Converter.from_file("in.xml")
+    xml.metrics = Metrics()
+    xml.convert()
+    xml.to_bytes()
+    xml.metrics.save("metrics.json")
+
+Each stage records wall and CPU time, peak memory allocated while it ran (via
+tracemalloc, unless `memory` is False), and how many XPath queries and
+deepcopies it did and how many elements it created and removed. Nothing is
+collected unless a converter has a `metrics` set.
+"""
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from lxml import etree
+
+OPERATIONS = ('xpath', 'deepcopy')
+
+
+class Metrics(object):
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+        self.counts = Counter()
+    
+    def count(self, operation, n=1):
+        self.counts[operation] += n
+    
+    @contextmanager
+    def stage(self, name, root=None):
+        """
+        Records the stage `name`. If `root` is given then the elements under it are
+        compared before and after to count those created and removed.
+        """
+        counts = {k: self.counts[k] for k in OPERATIONS}
+        before = set(root.iter(etree.Element)) if root is not None else None
+        
+        started = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record = {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+            if self.memory:
+                record['peak_memory'] = tracemalloc.get_traced_memory()[1] - baseline
+                if started:
+                    tracemalloc.stop()
+            for k in OPERATIONS:
+                record[k] = self.counts[k] - counts[k]
+            if before is not None:
+                after = set(root.iter(etree.Element))
+                record['created'] = len(after - before)
+                record['removed'] = len(before - after)
+            if name in self.stages:  # e.g. serialising twice, add them up
+                record = {k: v + self.stages[name].get(k, 0) for k, v in record.items()}
+            self.stages[name] = record
+    
+    def get_total(self):
+        total = Counter()
+        for record in self.stages.values():
+            for k, v in record.items():
+                if k == 'peak_memory':
+                    total[k] = max(total[k], v)
+                else:
+                    total[k] += v
+        return dict(total)
+    
+    def to_dict(self):
+        return {'stages': self.stages, 'total': self.get_total()}
+    
+    def save(self, filename):
+        with open(filename, 'w', encoding='utf-8') as handle:
+            json.dump(self.to_dict(), handle, indent=2)
+    
+    def __str__(self):
+        rows = [f"{'stage':<16}{'wall':>10}{'cpu':>10}{'memory':>12}{'xpath':>8}{'copies':>8}{'created':>9}{'removed':>9}"]
+        for name, r in list(self.stages.items()) + [('total', self.get_total())]:
+            rows.append(
+                f"{name:<16}{r['wall']:>10.4f}{r['cpu']:>10.4f}{r.get('peak_memory', 0) / 1e6:>10.1f}MB"
+                f"{r['xpath']:>8}{r['deepcopy']:>8}{r.get('created', 0):>9}{r.get('removed', 0):>9}"
+            )
+        return "\n".join(rows)
@@ -0,0 +1,164 @@
+"""
+Minimal streaming NEXUS reader.
+
+Only reads what beastwords needs: the CHARSTATELABELS, the MATRIX and any
+`charset` assumptions. The file is read line by line so the matrix is
+never held in memory more than once.
+"""
+import re
+
+is_bracket = re.compile(r"(\[|\])")
+is_nchar = re.compile(r"\bNCHAR\s*=\s*(\d+)", re.IGNORECASE)
+is_interleaved = re.compile(r"\bINTERLEAVE\b(?!\s*=\s*NO)", re.IGNORECASE)
+is_charset = re.compile(r"""^charset\s+['"]?(?P<name>[^'"\s=]+)['"]?\s*=\s*(?P<sites>[^;]+);?""", re.IGNORECASE)
+is_range = re.compile(r"^(?P<start>\d+)(?:-(?P<end>\d+|\.))?(?:\\(?P<step>\d+))?$")
+
+
+class NexusReader(object):
+    
+    def __init__(self):
+        self.labels = []    # list of character labels in site order
+        self.matrix = {}    # dictionary of {taxon: sequence}
+        self.charsets = {}  # dictionary of {name: [0-based site, ...]}
+        self.nchar = None   # from DIMENSIONS, if given
+        self.interleaved = False
+        self._command = None
+        self._taxon = None  # the matrix row we're reading
+        self._comment = 0   # depth of the [comment] we're in, they can span lines
+        self._charset = ""  # a charset that hasn't reached its ';' yet
+    
+    @classmethod
+    def from_file(cls, filename):
+        obj = cls()
+        with open(filename, encoding='utf-8') as handle:
+            for line in handle:
+                obj.feed(line)
+        return obj
+    
+    def feed(self, line):
+        line = self._strip_comments(line).strip()
+        if not line:
+            return
+        upper = line.upper()
+        
+        if self._command is None:
+            if upper.startswith('CHARSTATELABELS'):
+                self._command = 'charstatelabels'
+                line = line[len('CHARSTATELABELS'):].strip()
+            elif upper.startswith('MATRIX'):
+                self._command = 'matrix'
+                line = line[len('MATRIX'):].strip()
+            elif upper.startswith('CHARSET'):
+                self._command = 'charset'
+            elif upper.startswith('DIMENSIONS') or upper.startswith('FORMAT'):
+                if m := is_nchar.search(line):
+                    self.nchar = int(m.group(1))
+                if upper.startswith('FORMAT') and is_interleaved.search(line):
+                    self.interleaved = True
+                return
+            else:
+                return  # something we don't care about
+        
+        if self._command == 'charset':
+            # charsets can be wrapped too, so collect until the ';'
+            self._charset = f"{self._charset} {line}".strip()
+            if line.endswith(';'):
+                self._read_charset(self._charset)
+                self._charset, self._command = "", None
+            return
+        
+        end = line.endswith(';')
+        line = line.rstrip(';').strip()
+        if not line:
+            pass
+        elif self._command == 'charstatelabels':
+            self._read_labels(line)
+        elif self._command == 'matrix':
+            self._read_matrix(line)
+        if end:
+            self._command = None
+    
+    def _strip_comments(self, line):
+        out = []
+        for part in is_bracket.split(line):
+            if part == '[':
+                self._comment += 1
+            elif part == ']':
+                self._comment = max(self._comment - 1, 0)
+            elif not self._comment:
+                out.append(part)
+        return "".join(out)
+    
+    def _read_labels(self, line):
+        for entry in line.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            index, label = entry.split(None, 1)
+            # charstatelabels can have a list of state labels after a slash, we don't need them
+            label = label.split('/')[0].strip().strip("'\"")
+            self.labels.append(label)
+    
+    def _read_matrix(self, line):
+        # rows of a non-interleaved matrix can be wrapped over several lines, so
+        # until the current row is long enough the next line is more of it
+        expected = self.nchar or len(self.labels)
+        if self._taxon is not None and not self.interleaved and expected and \
+                len(self.matrix[self._taxon]) < expected:
+            self.matrix[self._taxon] += "".join(line.split())
+            return
+        if line.startswith("'"):  # quoted taxon name
+            taxon, _, seq = line[1:].partition("'")
+        else:
+            taxon, seq = (line.split(None, 1) + [""])[:2]
+        # interleaved matrices just repeat the taxon
+        self.matrix[taxon] = self.matrix.get(taxon, "") + "".join(seq.split())
+        self._taxon = taxon
+    
+    def _read_charset(self, line):
+        m = is_charset.match(line)
+        if not m:
+            raise ValueError(f"Unable to parse charset: {line}")
+        # e.g. "1-3 5 7-.\2": '.' is the last site and '\n' takes every nth site
+        sites = re.sub(r"\s*([-\\])\s*", r"\1", m.group('sites').strip())
+        out = []
+        for part in sites.replace(',', ' ').split():
+            r = is_range.match(part)
+            if not r:
+                raise ValueError(f"Unable to parse charset: {line}")
+            start, end, step = r.group('start', 'end', 'step')
+            if end == '.':
+                if not self.nchar:
+                    raise ValueError(f"Charset {m.group('name')} uses '.' but NCHAR is not given")
+                end = self.nchar
+            out.extend(range(int(start) - 1, int(end or start), int(step or 1)))
+        self.charsets[m.group('name')] = out
+    
+    def make_labels(self):
+        """
+        Returns character labels built from the charsets, for files without
+        CHARSTATELABELS.
+        
+        Sites are labelled `<charset>_<n>` and any sites not in a charset are
+        treated as ascertainment characters.
+        """
+        if not self.charsets:
+            raise ValueError("NEXUS file has no CHARSTATELABELS or charsets to name the sites by")
+        nchar = self.nchar or max((len(seq) for seq in self.matrix.values()), default=0)
+        labels = [None] * nchar
+        for name, sites in self.charsets.items():
+            for n, site in enumerate(sites, 1):
+                if site >= nchar:
+                    raise ValueError(f"Charset {name} has site {site + 1} but there are only {nchar} sites")
+                if labels[site] is None:  # first charset wins if they overlap
+                    labels[site] = f"{name}_{n}"
+        asc = 0
+        for i, label in enumerate(labels):
+            if label is None:
+                labels[i], asc = f"_ascertainment_{asc}", asc + 1
+        return labels
+
+
+def read_nexus(filename):
+    """Returns a `NexusReader` for `filename`"""
+    return NexusReader.from_file(filename)
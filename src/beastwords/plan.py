@@ -0,0 +1,141 @@
+"""
+PartitionPlan - a compact, model-independent description of a partitioning.
+
+A plan holds the word -> sites map of an input, which words go into which
+partition and where the ascertainment sites are. Plans can be computed from
+the site labels alone (no tree is needed), saved as JSON, and applied to any
+converter with the same word list via `Converter.convert(plan)`.
+"""
+import json
+from array import array
+
+from beastwords.utils import repartition
+
+
+class PlanError(ValueError):
+    """Raised when a plan doesn't fit the file it's applied to"""
+
+
+class PartitionPlan(object):
+    
+    __slots__ = ('words', 'sites', 'offsets', 'partitions', 'members', 'ascertainment', 'scheme')
+    
+    def __init__(self, words, sites, offsets, partitions, members, ascertainment, scheme=None):
+        self.words = tuple(words)                     # word names
+        self.sites = array('l', sites)                # sites of all words, concatenated
+        self.offsets = array('l', offsets)            # word i has sites[offsets[i]:offsets[i+1]]
+        self.partitions = tuple(partitions)           # partition names
+        self.members = tuple(array('l', m) for m in members)  # word indices in each partition
+        self.ascertainment = array('l', ascertainment)
+        self.scheme = scheme
+    
+    @classmethod
+    def from_partitions(cls, words, partitions, ascertainment=(), scheme=None):
+        """
+        Builds a plan from `words`, a dictionary of {word: [sites]}, and `partitions`,
+        a dictionary of {partition: [sites]} made by grouping whole words.
+        """
+        names = sorted(words)
+        sites, offsets, lookup = [], [0], {}
+        for i, w in enumerate(names):
+            for s in words[w]:
+                lookup[s] = i
+            sites.extend(words[w])
+            offsets.append(len(sites))
+        
+        members = []
+        for p in sorted(partitions):
+            # walk over the partition a word at a time, keeping words in the order they
+            # appear (n.b. the same word can be there more than once when resampling)
+            m, sites_p, j = [], partitions[p], 0
+            while j < len(sites_p):
+                if sites_p[j] not in lookup:
+                    raise ValueError(f"Site {sites_p[j]} in partition {p} is not in any word")
+                w = lookup[sites_p[j]]
+                n = offsets[w + 1] - offsets[w]
+                if sites_p[j:j + n] != sites[offsets[w]:offsets[w + 1]]:
+                    raise ValueError(f"Partition {p} does not contain whole words")
+                m.append(w)
+                j += n
+            members.append(m)
+        return cls(names, sites, offsets, sorted(partitions), members, ascertainment, scheme=scheme)
+    
+    @classmethod
+    def from_converter(cls, converter, scheme=None):
+        """
+        Builds a plan for `converter`'s current partitions, repartitioned by `scheme`
+        (anything that `Converter.set_partitions` accepts) if given.
+        
+        Only the site labels are used, so this doesn't need to parse the tree.
+        """
+        words = converter.partitions
+        partitions = words if scheme is None else repartition(scheme, words, ignore=converter.ascertainment)
+        return cls.from_partitions(words, partitions, converter.ascertainment, scheme=scheme)
+    
+    def get_sites(self, word):
+        """Returns the sites in `word` (by index)"""
+        return self.sites[self.offsets[word]:self.offsets[word + 1]]
+    
+    def get_words(self):
+        """Returns the dictionary of {word: [sites]}"""
+        return {w: list(self.get_sites(i)) for i, w in enumerate(self.words)}
+    
+    def get_partitions(self):
+        """Returns the dictionary of {partition: [sites]}"""
+        out = {}
+        for p, members in zip(self.partitions, self.members):
+            out[p] = [s for w in members for s in self.get_sites(w)]
+        return out
+    
+    def get_stats(self):
+        """Returns a dictionary of {partition: {'words': n, 'sites': n}}"""
+        return {
+            p: {
+                'words': len(members),
+                'sites': sum(self.offsets[w + 1] - self.offsets[w] for w in members)
+            } for p, members in zip(self.partitions, self.members)
+        }
+    
+    def matches(self, converter):
+        """True if `converter` has the same words as this plan"""
+        return self.get_words() == dict(converter.partitions)
+    
+    def apply(self, converter):
+        """Sets the partitions of `converter` from this plan"""
+        if not self.matches(converter):
+            raise PlanError("PartitionPlan does not match the words in this file")
+        from beastwords.main import sort_partitions
+        converter.partitions = sort_partitions(self.get_partitions())
+        converter.ascertainment = list(self.ascertainment)
+        return converter
+    
+    def to_dict(self):
+        return {
+            'scheme': self.scheme,
+            'words': self.get_words(),
+            'partitions': {
+                p: [self.words[w] for w in members] for p, members in zip(self.partitions, self.members)
+            },
+            'ascertainment': list(self.ascertainment),
+        }
+    
+    @classmethod
+    def from_dict(cls, d):
+        words = d['words']
+        partitions = {p: [s for w in members for s in words[w]] for p, members in d['partitions'].items()}
+        return cls.from_partitions(words, partitions, d['ascertainment'], scheme=d.get('scheme'))
+    
+    def save(self, filename):
+        with open(filename, 'w', encoding='utf-8') as handle:
+            json.dump(self.to_dict(), handle, indent=1)
+    
+    @classmethod
+    def load(cls, filename):
+        with open(filename, encoding='utf-8') as handle:
+            return cls.from_dict(json.load(handle))
+    
+    def __eq__(self, other):
+        return isinstance(other, PartitionPlan) and self.to_dict() == other.to_dict()
+    
+    def __repr__(self):
+        return f"<PartitionPlan {len(self.words)} words in {len(self.partitions)} partitions>"
@@ -0,0 +1,107 @@
+"""
+Profiling hooks.
+
+    with profiled("out.prof"):
+        convert_file(...)
+
+writes the cProfile stats to `out.prof` (load with `pstats` or snakeviz), and
+the same profile as collapsed stacks to `out.prof.collapsed` for flamegraph.pl,
+speedscope, inferno etc. With `memory=True` the biggest allocations (from
+tracemalloc) are written to `out.prof.memory.txt`.
+
+If no filename is given the BEASTWORDS_PROFILE environment variable is used
+(and BEASTWORDS_PROFILE_MEMORY=1 turns on memory), otherwise nothing happens.
+"""
+import cProfile
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+
+
+def get_label(func):
+    filename, line, name = func
+    if filename == '~':  # built-ins
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def collapse(stats, floor=None):
+    """
+    Converts `pstats.Stats` into collapsed stacks: {"a;b;c": microseconds}.
+    
+    cProfile only keeps caller -> callee edges, not whole stacks, so a function's
+    time is split between the stacks it is called from in proportion to the time
+    spent in it from each caller. Stacks under `floor` microseconds (default: 0.001%
+    of the total) are dropped.
+    """
+    if floor is None:
+        floor = max(1, sum(s[2] for s in stats.stats.values()) * 1e6 * 1e-5)
+    children = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, (cc, nc, tt, ct, callers) in stats.stats.items() if not callers]
+    
+    stacks = {}
+    todo = [((func,), 1.0) for func in roots]
+    while todo:
+        stack, fraction = todo.pop()
+        func = stack[-1]
+        cc, nc, tt, ct, callers = stats.stats[func]
+        own = tt * fraction * 1e6
+        if own >= floor:
+            key = ";".join(get_label(f) for f in stack)
+            stacks[key] = stacks.get(key, 0) + own
+        for child, edge_ct in children.get(func, []):
+            if child in stack:  # recursion, already counted in the child's time
+                continue
+            child_ct = stats.stats[child][3]
+            if child_ct <= 0:
+                continue
+            share = fraction * edge_ct / child_ct
+            if child_ct * share * 1e6 >= floor:
+                todo.append((stack + (child,), share))
+    return {k: int(round(v)) for k, v in stacks.items() if round(v) >= floor}
+
+
+def write_collapsed(stats, filename):
+    with open(filename, 'w', encoding='utf-8') as handle:
+        for stack, value in sorted(collapse(stats).items()):
+            handle.write(f"{stack} {value}\n")
+
+
+def write_memory(snapshot, filename, limit=50):
+    with open(filename, 'w', encoding='utf-8') as handle:
+        for stat in snapshot.statistics('lineno')[:limit]:
+            handle.write(f"{stat}\n")
+
+
+@contextmanager
+def profiled(filename=None, memory=None):
+    """
+    Profiles the block, writing the results to `filename` (see the module docstring).
+    """
+    filename = filename or os.environ.get('BEASTWORDS_PROFILE')
+    if not filename:
+        yield None
+        return
+    if memory is None:
+        memory = os.environ.get('BEASTWORDS_PROFILE_MEMORY', '') not in ('', '0')
+    
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(25)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        stats = pstats.Stats(profile)
+        stats.dump_stats(filename)
+        write_collapsed(stats, f"{filename}.collapsed")
+        if memory:
+            write_memory(tracemalloc.take_snapshot(), f"{filename}.memory.txt")
+            if started:
+                tracemalloc.stop()
@@ -0,0 +1,45 @@
+"""
+Progress reporting for conversions.
+
+A converter's `progress` is called as `progress(stage, done, total)` as each
+stage goes: for each taxon/partition in the slower ones, otherwise just at the
+start and end as (0, 1) and (1, 1). Every stage ends with `done == total`.
+If it returns False (or raises `Cancelled` itself) the conversion stops with
+`Cancelled`. Nothing is written when that happens, but the converter is left
+part-converted so use a `copy()` if you want to try again.
+"""
+import sys
+import time
+
+
+class Cancelled(Exception):
+    """Raised when a progress callback cancels a conversion"""
+
+
+class ProgressBar(object):
+    """Progress callback that draws a progress bar on a terminal"""
+    def __init__(self, stream=None, width=30, interval=0.1):
+        self.stream = stream or sys.stderr
+        self.width, self.interval = width, interval
+        self.stage, self.started, self.last = None, None, 0
+    
+    def __call__(self, stage, done, total):
+        now = time.perf_counter()
+        if stage != self.stage:
+            self.stage, self.started = stage, now
+        elif done < total and now - self.last < self.interval:
+            return  # don't redraw too often
+        self.last = now
+        filled = int(self.width * done / total) if total else self.width
+        bar = "#" * filled + "." * (self.width - filled)
+        rate = done / (now - self.started) if done and now > self.started else 0
+        line = f"\r{stage:<15} [{bar}] {done}/{total}"
+        if rate and total > 1:
+            line += f" ({rate:.0f}/s)"
+        self.stream.write(line.ljust(self.width + 45))
+        self.stream.flush()
+    
+    def close(self):
+        if self.stage is not None:
+            self.stream.write("\n")
+            self.stream.flush()
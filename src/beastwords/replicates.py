@@ -0,0 +1,105 @@
+"""
+Word jackknife / bootstrap replicates.
+
+Each replicate is a PartitionPlan over a random sample of the input's words,
+so the input is only parsed once and replicates are converted from copies
+of the pristine tree (in parallel if asked). Replicate `i` is generated from
+the seed and `i` alone, so any replicate can be regenerated on its own.
+"""
+import csv
+import random
+from pathlib import Path
+
+from beastwords.plan import PartitionPlan
+from beastwords.sweep import run_plans
+from beastwords.utils import repartition
+
+
+def parse_resample(value):
+    """
+    Parses a resampling method.
+    
+    > parse_resample("jackknife:0.8") == ('jackknife', 0.8)
+    > parse_resample("bootstrap") == ('bootstrap', None)
+    """
+    method, _, fraction = value.partition(":")
+    if method == 'jackknife':
+        fraction = float(fraction) if fraction else 0.5
+        if not 0 < fraction <= 1:
+            raise ValueError(f"jackknife fraction should be in (0, 1], got {fraction}")
+        return (method, fraction)
+    elif method == 'bootstrap':
+        return (method, None)
+    raise ValueError(f"Unknown resampling method: {value}")
+
+
+def sample_words(words, method, fraction, rng):
+    """
+    Returns a dictionary of {name: [sites]} sampled from `words`.
+    
+    Bootstrapped words that are drawn more than once are named word_b2, word_b3 etc.
+    """
+    names = sorted(words)
+    if method == 'jackknife':
+        n = max(1, round(len(names) * fraction))
+        return {w: list(words[w]) for w in sorted(rng.sample(names, n))}
+    
+    sample, counts = {}, {}
+    for w in sorted(rng.choices(names, k=len(names))):
+        counts[w] = counts.get(w, 0) + 1
+        sample[w if counts[w] == 1 else f"{w}_b{counts[w]}"] = list(words[w])
+    return sample
+
+
+def repartition_sample(scheme, sample):
+    """
+    `repartition` for a sample of words. A sample can leave out sites (jackknife)
+    or have the same sites more than once (bootstrap), which `repartition` would
+    warn about or reject, so it's given stand-in sites numbered from 1 instead
+    and the real sites are swapped back in afterwards.
+    """
+    stand_in, real = {}, {}
+    for w, sites in sample.items():
+        stand_in[w] = list(range(len(real) + 1, len(real) + len(sites) + 1))
+        real.update(zip(stand_in[w], sites))
+    return {p: [real[s] for s in sites] for p, sites in repartition(scheme, stand_in).items()}
+
+
+def make_replicates(converter, n, method, fraction=None, seed=0, scheme=None):
+    """
+    Returns a list of `n` PartitionPlans, each a resample of `converter`'s words
+    (optionally repartitioned by `scheme`)
+    """
+    plans = []
+    for i in range(n):
+        rng = random.Random(f"{seed}:{i}")
+        partitions = sample_words(converter.partitions, method, fraction, rng)
+        if scheme is not None:
+            partitions = repartition_sample(scheme, partitions)
+        plans.append(PartitionPlan.from_partitions(
+            converter.partitions, partitions, converter.ascertainment, scheme=scheme
+        ))
+    return plans
+
+
+def replicates(converter, n, outdir, resample="jackknife:0.5", seed=0, scheme=None, jobs=1, stem=None):
+    """
+    Writes `n` resampled replicates of `converter` into `outdir` along with
+    `replicates.tsv` listing the words in each. Returns the list of output files.
+    """
+    method, fraction = parse_resample(resample)
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    stem = stem or (converter.xmlfile.stem if converter.xmlfile else 'replicate')
+    
+    plans = make_replicates(converter, n, method, fraction, seed=seed, scheme=scheme)
+    outputs = [outdir / f"{stem}.r{i + 1:03d}.xml" for i in range(n)]
+    run_plans(converter, plans, outputs, jobs=jobs)
+    
+    with open(outdir / 'replicates.tsv', 'w', newline='') as handle:
+        writer = csv.writer(handle, delimiter="\t")
+        writer.writerow(['replicate', 'output', 'seed', 'resample', 'words'])
+        for i, (plan, output) in enumerate(zip(plans, outputs), 1):
+            words = [plan.words[w] for members in plan.members for w in members]
+            writer.writerow([i, output.name, seed, resample, ",".join(words)])
+    return outputs
@@ -0,0 +1,36 @@
+"""
+Fast metadata scanning.
+
+These read just enough of a BEAST XML file to get at the model and the
+word/site labels, stopping as soon as the alignment (<data>) is closed so
+the (often much larger) MCMC section is never parsed.
+"""
+from lxml import etree
+
+
+def peek_model(xmlfile):
+    """Returns the beauti template of `xmlfile` without parsing the whole document"""
+    # n.b. open the file here, as iterparse only closes the ones it opens when it gets to the end
+    with open(xmlfile, 'rb') as handle:
+        for _, root in etree.iterparse(handle, events=('start',)):
+            return root.get("beautitemplate")
+
+
+def scan_words(xmlfile):
+    """
+    Returns a list of (characterName, id) tuples for the charstatelabels in `xmlfile`.
+    
+    Equivalent to `Converter.get_words` but stops reading at the end of the alignment.
+    """
+    words = []
+    with open(xmlfile, 'rb') as handle:
+        for event, el in etree.iterparse(handle, events=('end',), tag=('charstatelabels', 'data')):
+            if el.tag == 'charstatelabels':
+                words.append((el.get('characterName'), el.get('id')))
+            elif len(words):  # closed the <data> holding the labels, we're done.
+                break
+            # we're done with this element and anything before it, so free them
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+    return words
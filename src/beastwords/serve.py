@@ -0,0 +1,290 @@
+"""
+Conversion daemon.
+
+`beastwords serve` listens on a Unix socket and runs
+convert/sitedistr requests in a pool of warm worker processes, so each call
+doesn't pay for starting Python and importing lxml. Requests beyond the
+workers plus a bounded queue are turned away with a `busy` response, and the
+client backs off and retries.
+
+The protocol is one JSON object per line each way:
+
+    -> {"command": "convert", "args": ["-p", "5", "in.xml", "out.xml"], "cwd": "/path"}
+    <- {"status": "ok", "returncode": 0, "stdout": "...", "stderr": "..."}
+
+Anyone who can connect can read and write files as the server's user, so the
+socket is only readable/writable by its owner (by default it lives in
+$XDG_RUNTIME_DIR, or a private directory under /tmp). That's the only access
+control, which is why there's no TCP option: file permissions don't protect
+a port, even on localhost.
+
+If BEASTWORDS_SERVER is set (e.g. `unix:$XDG_RUNTIME_DIR/beastwords.sock`)
+the `beastwords` and `beastsitedistr` commands send their
+arguments to that server instead of running locally, falling back to running
+locally if it can't be reached.
+"""
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+COMMANDS = ('convert', 'sitedistr')
+LOCAL_ONLY = ('batch', '--watch', '--sweep', '--replicates')  # too long-running/parallel for a worker
+
+_DEFAULTS = {}  # extra CLI arguments for each command, e.g. the cache directories
+
+
+def parse_address(address):
+    """
+    Returns the socket path of a server address, raising ValueError if it isn't one.
+    
+    > parse_address("unix:/tmp/beastwords.sock") == "/tmp/beastwords.sock"
+    """
+    if address.startswith("unix:") and address[5:]:
+        return address[5:]
+    raise ValueError(f"Unsupported server address {address}, only unix:<path> sockets are")
+
+
+def get_default_address():
+    """
+    Returns the default unix:<path> address, in $XDG_RUNTIME_DIR or failing that
+    a directory under /tmp that only we can use.
+    """
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+    if not directory:
+        directory = Path(tempfile.gettempdir()) / f"beastwords-{os.getuid()}"
+        with contextlib.suppress(FileExistsError):
+            directory.mkdir(mode=0o700)
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise ValueError(f"{directory} isn't a private directory, give an address to listen on")
+    return f"unix:{Path(directory) / 'beastwords.sock'}"
+
+
+def remove_stale_socket(path):
+    """
+    Removes the socket at `path` if no server is listening on it. Raises ValueError
+    if `path` is something else, or another server is using it.
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode):
+        raise ValueError(f"{path} exists and isn't a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:  # nobody there
+            os.unlink(path)
+            return
+    raise ValueError(f"Another server is already listening on {path}")
+
+
+def _init_worker(defaults):
+    os.environ.pop('BEASTWORDS_SERVER', None)  # don't forward requests back to ourselves
+    _DEFAULTS.update(defaults)
+    # warm up
+    import beastwords.main  # noqa: F401
+    import beastwords.sitedistr  # noqa: F401
+
+
+def run_command(command, args, cwd=None):
+    """Runs a CLI command in this process, returning (returncode, stdout, stderr)"""
+    from beastwords.main import main as convert_main
+    from beastwords.sitedistr import main as sitedistr_main
+    
+    args = list(args)
+    given = {str(a).split('=')[0] for a in args}  # i.e. --cache dir or --cache=dir
+    for option, value in _DEFAULTS.get(command, {}).items():
+        if option not in given:
+            args.extend([option, value])
+    
+    stdout, stderr = io.StringIO(), io.StringIO()
+    previous = os.getcwd()
+    try:
+        if cwd:
+            os.chdir(cwd)
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                if command == 'sitedistr':
+                    sitedistr_main(args)
+                else:
+                    convert_main(args)
+                returncode = 0
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    returncode = e.code or 0
+                else:  # sys.exit("message"), which the interpreter would print
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except Exception as e:
+                print(f"{e.__class__.__name__}: {e}", file=sys.stderr)
+                returncode = 1
+    finally:
+        os.chdir(previous)
+    return (returncode, stdout.getvalue(), stderr.getvalue())
+
+
+class Handler(socketserver.StreamRequestHandler):
+    
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            if request.get('command') not in COMMANDS:
+                raise ValueError(f"Unknown command: {request.get('command')}")
+            if any(str(a).split('=')[0] in LOCAL_ONLY for a in request.get('args', [])):
+                raise ValueError("batch, --watch, --sweep and --replicates have to be run locally")
+        except ValueError as e:
+            return self.respond({'status': 'error', 'error': str(e)})
+        
+        if not self.server.slots.acquire(blocking=False):
+            return self.respond({'status': 'busy'})
+        try:
+            future = self.server.pool.submit(
+                run_command, request['command'], request.get('args', []), request.get('cwd')
+            )
+            returncode, stdout, stderr = future.result()
+        except Exception as e:
+            return self.respond({'status': 'error', 'error': f"{e.__class__.__name__}: {e}"})
+        finally:
+            self.server.slots.release()
+        self.respond({'status': 'ok', 'returncode': returncode, 'stdout': stdout, 'stderr': stderr})
+    
+    def respond(self, response):
+        self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(address, workers=2, queue=8, defaults=None):
+    """
+    Returns a server for `address` running requests over `workers` processes, with at
+    most `queue` more waiting. Call `serve_forever()` on it and `shutdown()` when done.
+    
+    The socket is made readable/writable by its owner only. Raises ValueError if
+    `address` isn't a unix:<path>, or something else is using the path.
+    """
+    path = parse_address(address)
+    remove_stale_socket(path)
+    umask = os.umask(0o177)  # so the socket is never usable by anyone else
+    try:
+        server = UnixServer(path, Handler)
+    finally:
+        os.umask(umask)
+    os.chmod(path, 0o600)
+    server.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(defaults or {},))
+    server.slots = threading.BoundedSemaphore(workers + queue)
+    # start the workers now rather than on the first request
+    list(server.pool.map(int, range(workers)))
+    return server
+
+
+def request(address, command, args, cwd=None, retries=50, timeout=None):
+    """
+    Sends a request to the server at `address`, retrying with backoff while it's busy.
+    
+    Returns the response dictionary.
+    """
+    path = parse_address(address)
+    payload = json.dumps({'command': command, 'args': list(args), 'cwd': cwd or os.getcwd()})
+    delay = 0.05
+    for attempt in range(retries + 1):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall(payload.encode('utf-8') + b"\n")
+            with sock.makefile('rb') as handle:
+                response = json.loads(handle.readline())
+        if response['status'] != 'busy':
+            return response
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+    return response
+
+
+def forward(command, args):
+    """
+    Runs `command` on the server in BEASTWORDS_SERVER if set, printing its output.
+    
+    Returns the return code, or None if there's no server (or it can't be reached,
+    or is still busy after retrying) and the command should be run locally.
+    """
+    address = os.environ.get('BEASTWORDS_SERVER')
+    if not address:
+        return None
+    try:
+        response = request(address, command, args)
+    except (OSError, ValueError):
+        return None
+    if response['status'] == 'busy':
+        return None
+    if response['status'] != 'ok':
+        print(f"beastwords server: {response.get('error', response['status'])}", file=sys.stderr)
+        return 1
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['returncode']
+
+
+def main(args=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='beastwords serve', description='Runs a beastwords conversion server')
+    parser.add_argument(
+        "address", nargs='?', default=None,
+        help="unix:<path> to listen on (default: unix:$XDG_RUNTIME_DIR/beastwords.sock)"
+    )
+    parser.add_argument(
+        '-j', "--workers", dest='workers', default=os.cpu_count() or 2, type=int,
+        help="number of worker processes", action='store'
+    )
+    parser.add_argument(
+        "--queue", dest='queue', default=16, type=int,
+        help="number of requests that can wait for a worker before clients are told to retry",
+        action='store'
+    )
+    parser.add_argument(
+        "--cache", dest='cache', default=None,
+        help="metadata cache directory for requests that don't set one", action='store'
+    )
+    parser.add_argument(
+        "--result-cache", dest='results', default=None,
+        help="result cache directory for convert requests that don't set one", action='store'
+    )
+    args = parser.parse_args(args)
+    
+    defaults = {'convert': {}, 'sitedistr': {}}
+    if args.cache:
+        defaults['convert']['--cache'] = defaults['sitedistr']['--cache'] = str(Path(args.cache).resolve())
+    if args.results:
+        defaults['convert']['--result-cache'] = str(Path(args.results).resolve())
+    
+    try:
+        address = args.address or get_default_address()
+        server = make_server(address, workers=args.workers, queue=args.queue, defaults=defaults)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"beastwords serving on {address} with {args.workers} workers "
+          f"(export BEASTWORDS_SERVER={address})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+    return 0
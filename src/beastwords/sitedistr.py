@@ -1,36 +1,210 @@
+"""
+Partition size distributions.
+
+`beastsitedistr` prints a histogram of how many partitions there are of each
+size, for one file or summed over many (optionally after repartitioning with
+`-p`, as `beastwords` would). It only reads the charstatelabels of each file
+(or their metadata from `--cache`), and can write the per-file and combined
+counts as JSON or CSV.
+"""
+import csv
+import glob
+import json
+import sys
 from collections import Counter
 from pathlib import Path
 
-from beastwords.main import Converter
+from beastwords.cli import add_profile_arguments, forward
+
+COMBINED = '(all)'  # the `file` of the combined counts in CSV output
+
+
+def get_sizes(partitions):
+    """Returns a Counter of {partition size: number of partitions}"""
+    return Counter(len(sites) for sites in partitions.values())
+
+
+def histogram(sizes, glyph="█", width=None, stream=None):
+    """
+    Prints `sizes` ({size: count}) as a histogram, one line per size.
+
+    If `width` is given, bars longer than that are scaled down to fit.
+    """
+    if not sizes:
+        return
+    stream = stream or sys.stdout
+    scale = width / max(sizes.values()) if width and max(sizes.values()) > width else 1
+    for i in range(min(sizes), max(sizes) + 1):
+        n = sizes.get(i, 0)
+        bar = glyph * (max(1, round(n * scale)) if n else 0)  # keep small counts visible
+        print(f"{i}\t{n}\t{bar}", file=stream)
+
 
 def sitedistr(obj, glyph="█"):
-    sizes = Counter()
-    for p, s in obj.partitions.items():
-        sizes[len(s)] += 1
+    """Prints the partition sizes of `obj` (a `Converter`, or {size: count}) and their histogram"""
+    sizes = obj if isinstance(obj, dict) else get_sizes(obj.partitions)
     print(sizes)
-    offset = min(sizes) - 5
-    for i in range(min(sizes), max(sizes) + 1):
-        n = sizes[i]
-        bar = glyph * n
-        print(f"{i}\t{n}\t{bar}")
-    
+    histogram(sizes, glyph)
+
+
+def summarise(filename, partitions=None, cache=None):
+    """
+    Returns a dictionary with the number of partitions, sites and partitions of
+    each size in `filename` (repartitioned into `partitions` if given).
+
+    `cache` is a directory for a `MetadataCache`.
+    """
+    from beastwords.cache import MetadataCache
+    from beastwords.main import Converter
+    xml = Converter.from_file(filename, cache=MetadataCache(cache) if cache else None)
+    if partitions:
+        xml.set_partitions(partitions)
+    sizes = get_sizes(xml.partitions)
+    return {
+        'file': str(filename),
+        'partitions': sum(sizes.values()),
+        'sites': sum(size * n for size, n in sizes.items()),
+        'sizes': dict(sorted(sizes.items())),
+    }
+
+
+def _summarise(args):
+    """`summarise` for a process pool, returning errors instead of raising them"""
+    filename, partitions, cache = args
+    try:
+        return summarise(filename, partitions, cache)
+    except Exception as e:
+        return {'file': str(filename), 'error': f"{e.__class__.__name__}: {e}"}
+
+
+def aggregate(filenames, partitions=None, cache=None, jobs=1):
+    """
+    Summarises each of `filenames` (see `summarise`) over `jobs` processes.
+
+    Returns a dictionary of the per-file summaries (`files`, in order), their
+    `combined` totals and any files that couldn't be read (`errors`).
+    """
+    work = [(f, partitions, cache) for f in filenames]
+    if jobs > 1 and len(work) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(jobs, len(work))) as pool:
+            results = list(pool.map(_summarise, work, chunksize=max(1, len(work) // (jobs * 4))))
+    else:
+        results = [_summarise(w) for w in work]
+
+    files = [r for r in results if 'error' not in r]
+    sizes = Counter()
+    for r in files:
+        sizes.update(r['sizes'])
+    return {
+        'files': files,
+        'combined': {
+            'files': len(files),
+            'partitions': sum(r['partitions'] for r in files),
+            'sites': sum(r['sites'] for r in files),
+            'sizes': dict(sorted(sizes.items())),
+        },
+        'errors': [r for r in results if 'error' in r],
+    }
+
+
+def write_json(summary, handle):
+    # JSON keys are strings, so sizes come out as "2": 11 etc
+    json.dump(summary, handle, indent=2)
+    handle.write("\n")
 
-def main():
+
+def write_csv(summary, handle):
+    """Writes `summary` (see `aggregate`) as file,size,count rows, the combined counts last"""
+    writer = csv.writer(handle, lineterminator="\n")
+    writer.writerow(['file', 'size', 'count'])
+    for r in summary['files'] + [dict(summary['combined'], file=COMBINED)]:
+        for size, n in r['sizes'].items():
+            writer.writerow([r['file'], size, n])
+
+
+def expand(patterns):
+    """Returns the files matching `patterns` (left as they are if nothing matches)"""
+    filenames = []
+    for pattern in patterns:
+        filenames.extend(sorted(glob.glob(pattern)) or [pattern])
+    return filenames
+
+
+def main(args=None):
     import argparse
+    args = sys.argv[1:] if args is None else args
+
+    if (returncode := forward('sitedistr', args)) is not None:  # hand over to a running server if there is one
+        sys.exit(returncode)
+
     parser = argparse.ArgumentParser(description='Prints a graph of the partition sizes')
-    parser.add_argument("input", help='filename', type=Path) 
+    parser.add_argument("inputs", help='filenames/globs (counts are summed over them)', nargs='+')
     parser.add_argument(
-        '-p', "--partitions", dest='partitions', default=None, type=int,
-        help="set partition number. If this is None use words", action='store'
+        '-p', "--partitions", dest='partitions', default=None, type=str,
+        help="set partition number or groups, as for beastwords. If this is None use words", action='store'
     )
-    args = parser.parse_args()
-    
-    xml = Converter.from_file(args.input)
-    if args.partitions:
-        xml.set_partitions(args.partitions)
-    sitedistr(xml)
+    parser.add_argument(
+        "--cache", dest='cache', default=None, type=Path,
+        help="directory to cache word/partition metadata in between runs", action='store'
+    )
+    parser.add_argument(
+        '-j', "--jobs", dest='jobs', default=1, type=int,
+        help="number of processes to use", action='store'
+    )
+    parser.add_argument(
+        "--json", dest='json', default=None, type=str,
+        help="also write the per-file and combined counts (JSON) here, or - for stdout", action='store'
+    )
+    parser.add_argument(
+        "--csv", dest='csv', default=None, type=str,
+        help="also write the per-file and combined counts (CSV) here, or - for stdout", action='store'
+    )
+    parser.add_argument(
+        "--width", dest='width', default=80, type=int,
+        help="longest bar in the combined histogram of many files", action='store'
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args(args)
+    if args.json == '-' and args.csv == '-':
+        parser.error("Only one of --json and --csv can go to stdout")
+
+    from beastwords.profiling import profiled
+    with profiled(args.profile, memory=args.profile_memory or None):  # None: see BEASTWORDS_PROFILE_MEMORY
+        filenames = expand(args.inputs)
+        summary = aggregate(filenames, partitions=args.partitions, cache=args.cache, jobs=args.jobs)
+        report(summary, json_output=args.json, csv_output=args.csv, width=args.width)
+    if summary['errors']:
+        sys.exit(1)
 
-if __name__ == "__main__":
-    main()
 
+def report(summary, json_output=None, csv_output=None, width=80):
+    """
+    Prints `summary` (see `aggregate`): the histogram for a single file, or the
+    per-file totals and combined histogram for many. Also writes it as JSON/CSV
+    to the files `json_output`/`csv_output`, where "-" is stdout instead.
+    """
+    for r in summary['errors']:
+        print(f"{r['file']}: {r['error']}", file=sys.stderr)
+    for output, write in ((json_output, write_json), (csv_output, write_csv)):
+        if output == '-':
+            write(summary, sys.stdout)
+        elif output:
+            with open(output, 'w', newline='', encoding='utf-8') as handle:
+                write(summary, handle)
+    if '-' in (json_output, csv_output) or not summary['files']:
+        return
+    
+    sizes = Counter(summary['combined']['sizes'])
+    if len(summary['files']) + len(summary['errors']) == 1:
+        sitedistr(sizes)
+        return
+    for r in summary['files']:
+        print(f"{r['file']}\t{r['partitions']} partitions\t{r['sites']} sites")
+    combined = summary['combined']
+    print(f"{combined['files']} files\t{combined['partitions']} partitions\t{combined['sites']} sites")
+    histogram(sizes, width=width)
 
+
+if __name__ == "__main__":
+    sys.exit(main())
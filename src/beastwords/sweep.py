@@ -0,0 +1,139 @@
+"""
+Sweep mode: convert one input into many partition schemes.
+
+The input is parsed once and every scheme is converted from a copy of the
+pristine tree. With more than one job, schemes are spread over a process
+pool where each worker parses the input once and copies it per scheme. The
+workers are sent the input's partitions as well, as those don't always come
+from the document (e.g. NEXUS charsets).
+"""
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from statistics import mean
+from warnings import warn
+
+from beastwords.plan import PartitionPlan
+
+_PRISTINE = None  # the parsed input in a worker process
+
+
+def parse_range(value):
+    """
+    Parses a sweep range into a list of schemes.
+    
+    > parse_range("2..5") == [2, 3, 4, 5]
+    > parse_range("2,4,8") == [2, 4, 8]
+    > parse_range("2..64:2") == [2, 4, 6, ..., 64]
+    """
+    schemes = []
+    for chunk in value.split(","):
+        if '..' in chunk:
+            chunk, _, step = chunk.partition(":")
+            start, end = map(int, chunk.split(".."))
+            schemes.extend(range(start, end + 1, int(step) if step else 1))
+        else:
+            schemes.append(int(chunk))
+    return schemes
+
+
+def get_summary(plan, ntaxa, constant=()):
+    """
+    Returns a dictionary of partition balance and cost statistics for `plan`.
+    
+    Sites in `constant` aren't counted, nor are partitions left without any sites,
+    to match a conversion with `drop_constant`.
+    """
+    stats = plan.get_stats()
+    if constant:
+        constant = set(constant)
+        for p, members in plan.get_partitions().items():
+            stats[p]['sites'] = len([s for s in members if s not in constant])
+            if not stats[p]['sites']:
+                del stats[p]
+    sites = [s['sites'] for s in stats.values()] or [0]
+    words = [s['words'] for s in stats.values()] or [0]
+    total = sum(sites) + len(stats)  # + 1 ascertainment column per partition
+    return {
+        'scheme': plan.scheme,
+        'partitions': len(stats),
+        'empty': len([s for s in stats.values() if s['sites'] == 0]),
+        'min_words': min(words),
+        'max_words': max(words),
+        'min_sites': min(sites),
+        'max_sites': max(sites),
+        'mean_sites': round(mean(sites), 2),
+        'imbalance': round(max(sites) / mean(sites), 3) if mean(sites) else 0,
+        'total_sites': total,
+        'cost': total * ntaxa,  # ~ number of site likelihoods to compute per tree evaluation
+    }
+
+
+def _init_worker(source, partitions, ascertainment, keep_taxa, drop_constant):
+    global _PRISTINE
+    from beastwords.main import Converter
+    _PRISTINE = Converter.from_bytes(source)
+    _PRISTINE.partitions, _PRISTINE.ascertainment = partitions, ascertainment
+    _PRISTINE.keep_taxa, _PRISTINE.drop_constant = keep_taxa, drop_constant
+
+
+def _convert(converter, plan, output):
+    start = time.perf_counter()
+    conv = converter.copy()
+    conv.convert(plan)
+    conv.to_file(output)
+    return time.perf_counter() - start
+
+
+def _run(plan, output):
+    return _convert(_PRISTINE, plan, output)
+
+
+def run_plans(converter, plans, outputs, jobs=1):
+    """
+    Converts `converter` with each of `plans` into the matching file in `outputs`,
+    returning the time taken for each.
+    """
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(
+            converter.to_bytes(), dict(converter.partitions), list(converter.ascertainment),
+            converter.keep_taxa, converter.drop_constant
+        )) as pool:
+            return list(pool.map(_run, plans, outputs))
+    return [_convert(converter, plan, output) for plan, output in zip(plans, outputs)]
+
+
+def sweep(converter, schemes, outdir, jobs=1, stem=None):
+    """
+    Converts `converter` into every partition scheme in `schemes`, writing one file per
+    scheme into `outdir` along with `summary.tsv`. Returns the summary rows.
+    """
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    stem = stem or (converter.xmlfile.stem if converter.xmlfile else 'sweep')
+    
+    plans = []
+    for scheme in schemes:
+        try:
+            plans.append(PartitionPlan.from_converter(converter, scheme))
+        except ValueError as e:
+            warn(f"Skipping scheme {scheme}: {e}")
+    outputs = [outdir / f"{stem}.p{plan.scheme}.xml" for plan in plans]
+    timings = run_plans(converter, plans, outputs, jobs=jobs)
+    
+    ntaxa = len(converter.keep_taxa) if converter.keep_taxa is not None else len(converter.alignment)
+    constant = converter.get_constant_sites() if converter.drop_constant else ()
+    rows = []
+    for plan, output, seconds in zip(plans, outputs, timings):
+        row = get_summary(plan, ntaxa, constant)
+        row['seconds'] = round(seconds, 4)
+        row['output'] = output.name
+        rows.append(row)
+    
+    if rows:
+        with open(outdir / 'summary.tsv', 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0]), delimiter="\t")
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
@@ -0,0 +1,192 @@
+"""
+Generates synthetic single partition XMLs for load testing.
+
+The template is any single partition BEAUti XML (e.g. the test fixtures). Its
+alignment is replaced with `ntaxa` taxa and `nwords` words of cognate-coded
+data: for each word a taxon is either missing (all '?') or in exactly one of
+the word's cognate sets. Everything is streamed to the output so very large
+files need very little memory, and the same seed always gives the same file.
+"""
+import math
+import random
+import sys
+from copy import deepcopy
+from pathlib import Path
+
+from lxml import etree
+
+from beastwords.main import Converter
+
+MARKER = "beastsynth:{}"
+LAYOUTS = ('start', 'end', 'none')
+
+
+def parse_sizes(spec):
+    """
+    Parses a word size distribution, returning a function of a `random.Random` that
+    gives the number of sites in a word:
+    
+        fixed:<n>           every word has n sites
+        uniform:<a>-<b>     between a and b sites
+        geometric:<mean>    1 or more sites, with mean `mean` (most words are small)
+    """
+    name, _, arg = spec.partition(':')
+    try:
+        if name == 'fixed':
+            n = int(arg)
+            if n >= 1:
+                return lambda rng: n
+        elif name == 'uniform':
+            lo, hi = map(int, arg.split('-'))
+            if 1 <= lo <= hi:
+                return lambda rng: rng.randint(lo, hi)
+        elif name == 'geometric':
+            mean = float(arg or 3)
+            if mean == 1:
+                return lambda rng: 1
+            if mean > 1:
+                p = 1 / mean
+                return lambda rng: 1 + int(math.log(1 - rng.random()) / math.log(1 - p))
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid word size distribution: {spec}")
+
+
+def get_labels(sizes, ascertainment='start'):
+    """Returns the site names for words with `sizes` sites"""
+    if ascertainment not in LAYOUTS:
+        raise ValueError(f"Unknown ascertainment layout: {ascertainment}")
+    labels = ["_ascertainment_0"] if ascertainment == 'start' else []
+    for w, size in enumerate(sizes):
+        labels.extend(f"word{w + 1}_{i}" for i in range(1, size + 1))
+    if ascertainment == 'end':
+        labels.append("_ascertainment_0")
+    return labels
+
+
+def get_sequence(rng, sizes, missing=0.1, ascertainment='start'):
+    """Returns one taxon's sequence for words with `sizes` sites"""
+    chunks = ['0'] if ascertainment == 'start' else []
+    for size in sizes:
+        if rng.random() < missing:
+            chunks.append('?' * size)
+        else:
+            cognate = rng.randrange(size)
+            chunks.append('0' * cognate + '1' + '0' * (size - cognate - 1))
+    if ascertainment == 'end':
+        chunks.append('0')
+    return "".join(chunks)
+
+
+def _split(document, name):
+    """Splits `document` at the marker comment `name`, returning (before, indentation, after)"""
+    marker = f"<!--{MARKER.format(name)}-->".encode()
+    before, after = document.split(marker)
+    stripped = before.rstrip(b' ')
+    return stripped, before[len(stripped):], after[1:]  # after starts with the newline
+
+
+def synthesise(template, output, ntaxa=10, nwords=100, sizes='geometric:3', missing=0.1,
+               ascertainment='start', seed=0):
+    """
+    Writes a synthetic version of `template` to `output` (a binary file object).
+    
+    `sizes` is a word size distribution (see `parse_sizes`), `missing` the chance
+    of a taxon having no data for a word, and `ascertainment` where to put the
+    ascertainment site ('start', 'end' or 'none'). Returns the number of sites.
+    """
+    if ntaxa < 1 or nwords < 1:
+        raise ValueError("Need at least one taxon and one word")
+    rng = random.Random(f"{seed}:words")
+    size = parse_sizes(sizes)
+    sizes = [size(rng) for _ in range(nwords)]
+    labels = get_labels(sizes, ascertainment)
+    
+    # replace the sequences and labels in the template with markers and write
+    # out our own where they are
+    xml = Converter.from_file(template)
+    old = list(xml.data.iter('sequence'))
+    template = deepcopy(old[0]) if old else etree.Element("sequence", spec="Sequence", totalcount="2")
+    template.tail = None
+    xml.data.insert(xml.data.index(old[0]) if old else 0, etree.Comment(MARKER.format('sequences')))
+    for o in old:
+        xml.data.remove(o)
+    udt = xml.data.find('userDataType')
+    for o in udt.getchildren():
+        udt.remove(o)
+    udt.append(etree.Comment(MARKER.format('labels')))
+    
+    head, indent, rest = _split(xml.to_bytes(), 'sequences')
+    middle, label_indent, tail = _split(rest, 'labels')
+    
+    output.write(head)
+    for t in range(ntaxa):
+        taxon = f"Taxon{t + 1}"
+        sequence = get_sequence(random.Random(f"{seed}:{taxon}"), sizes, missing, ascertainment)
+        element = deepcopy(template)
+        element.set('id', f"seq_{taxon}")
+        element.set('taxon', taxon)
+        element.set('value', sequence)
+        output.write(indent + etree.tostring(element) + b"\n")
+    output.write(middle)
+    for i, label in enumerate(labels):
+        element = etree.Element("charstatelabels",
+            id=f"UserDataType.{i}",
+            spec="beast.base.evolution.datatype.UserDataType",
+            characterName=label,
+            codeMap="", states="-1", value="")
+        output.write(label_indent + etree.tostring(element) + b"\n")
+    output.write(tail)
+    return len(labels)
+
+
+def main(args=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Generates a synthetic single partition XML from a template')
+    parser.add_argument("template", help='single partition XML to use as a template', type=Path)
+    parser.add_argument("output", help="filename ('-' for stdout)", type=str)
+    parser.add_argument(
+        '-n', "--taxa", dest='taxa', default=10, type=int,
+        help="number of taxa", action='store'
+    )
+    parser.add_argument(
+        '-w', "--words", dest='words', default=100, type=int,
+        help="number of words", action='store'
+    )
+    parser.add_argument(
+        "--word-size", dest='sizes', default='geometric:3', type=str,
+        help="word size distribution: fixed:<n>, uniform:<a>-<b> or geometric:<mean> (default geometric:3)",
+        action='store'
+    )
+    parser.add_argument(
+        "--missing", dest='missing', default=0.1, type=float,
+        help="chance of a taxon having no data for a word", action='store'
+    )
+    parser.add_argument(
+        "--ascertainment", dest='ascertainment', default='start', choices=LAYOUTS,
+        help="where to put the ascertainment site", action='store'
+    )
+    parser.add_argument(
+        "--seed", dest='seed', default=0, type=int,
+        help="random seed", action='store'
+    )
+    args = parser.parse_args(args)
+    
+    try:
+        parse_sizes(args.sizes)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    options = dict(
+        ntaxa=args.taxa, nwords=args.words, sizes=args.sizes, missing=args.missing,
+        ascertainment=args.ascertainment, seed=args.seed
+    )
+    if args.output == '-':
+        synthesise(args.template, sys.stdout.buffer, **options)
+    else:
+        with open(args.output, 'wb') as handle:
+            synthesise(args.template, handle, **options)
+
+
+if __name__ == "__main__":
+    main()
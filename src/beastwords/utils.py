@@ -52,17 +52,19 @@ def _split(rangestr):
     return chunks
 
 
-def repartition_by_groupsize(partitions, data):
+def repartition_by_groupsize(partitions, data, ignore=()):
     """
     Repartitions `data` by splitting into groups
     
+    Sites in `ignore` (e.g. ascertainment characters) are not expected to be in any group.
+    
     > repartition_by_group("1-5,6-10", {...})
     """
     # 1. collect data by size:
     sizes = [(len(sites), k) for (k, sites) in data.items()]
     #[(1, 'book'), (1, 'elbow'), (2, 'hand'), (3, 'eye'), (4, 'foot'), (5, 'arm')]
     
-    out, seen = {}, []
+    out, seen = {}, set()
     for window in _split(partitions):
         window = sorted(window)
         label = f'p{window[0]}' if len(window) == 1 else f'p{window[0]}-{window[-1]}'
@@ -72,13 +74,25 @@ def repartition_by_groupsize(partitions, data):
                 out[label].extend(data[partition])
                 if dupe := len([site for site in data[partition] if site in seen]):
                     raise ValueError(f"Sites in multiple partitions: {dupe}")
-                seen.extend(data[partition])
+                seen.update(data[partition])
     
-    missing = [s for s in range(1, max(seen)) if s not in seen]
+    ignore = set(ignore)
+    missing = [s for s in range(1, max(seen)) if s not in seen and s not in ignore]
     if len(missing):
         warn(f"Some sites are ignored: {missing}")
     
     return out
         
     
-    
\ No newline at end of file
+    
+
+def repartition(scheme, data, ignore=()):
+    """
+    Repartitions `data` using `scheme`, either a number of partitions (see
+    `repartition_by_size`) or a group string (see `repartition_by_groupsize`)
+    """
+    try:
+        size = int(scheme)
+    except ValueError:
+        return repartition_by_groupsize(scheme, data, ignore=ignore)
+    return repartition_by_size(size, data)
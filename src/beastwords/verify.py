@@ -0,0 +1,199 @@
+"""
+Round-trip checks of converted alignments.
+
+`_convert_sequences` reorders the sites into partitions and adds an ascertainment
+column to each, so an off-by-one there would quietly scramble the data. Before
+converting we take a checksum of each taxon's sites (in input order), and
+afterwards `verify` rebuilds the input order from the output's charstatelabels
+and checks the checksums match. The ascertainment columns are checked as well:
+each should be '0', unless all of that taxon's sites in the partition are
+missing ('?') or gaps ('-'), when it's the same.
+"""
+from hashlib import blake2b
+from operator import itemgetter
+
+
+class VerifyError(ValueError):
+    """Raised when a converted alignment doesn't match its input, see `verify`"""
+    def __init__(self, problems, filename=None):
+        self.problems = problems
+        where = f" {filename}" if filename else ""
+        super().__init__(f"Converted{where} doesn't match its input:\n  " + "\n  ".join(problems))
+
+
+def get_runs(indices):
+    """Returns `indices` as a list of (start, stop) slices of consecutive indices"""
+    runs = []
+    for i in indices:
+        if runs and runs[-1][1] == i:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    return [tuple(r) for r in runs]
+
+
+def gather(indices):
+    """Returns a function picking the characters at `indices` out of a string"""
+    if not indices:
+        return lambda value: ""
+    if len(indices) == 1:  # itemgetter returns a bare item for one index
+        index = indices[0]
+        return lambda value: value[index]
+    # sites mostly come in runs (words, partitions) which are much quicker to slice
+    runs = get_runs(indices)
+    if len(runs) * 4 < len(indices):
+        getters = [slice(*r) for r in runs]
+        return lambda value: "".join([value[s] for s in getters])
+    getter = itemgetter(*indices)
+    return lambda value: "".join(getter(value))
+
+
+def digest(value):
+    return blake2b(value.encode('utf-8'), digest_size=16).digest()
+
+
+def get_sites(partitions):
+    """Returns the sorted input sites in `partitions` ({partition: [input sites]})"""
+    return sorted(s for sites in partitions.values() for s in sites)
+
+
+def checksum(sequences, partitions):
+    """
+    Returns {sequence id: checksum} of the sites in `partitions` (in input order)
+    for each of `sequences` ({sequence id: value}).
+    """
+    take = gather(get_sites(partitions))
+    return {seqid: digest(take(value)) for seqid, value in sequences.items()}
+
+
+def get_layout(data):
+    """Returns a list of (partition, index) for each column of a converted <data>"""
+    layout = []
+    for label in data.iter('charstatelabels'):
+        partition, _, index = label.get('characterName', '').rpartition('_')
+        layout.append((partition, int(index) if index.isdigit() else None))
+    return layout
+
+
+def quick_ascertainment(partitions, layout):
+    """
+    Returns a function that checks the ascertainment characters of a converted
+    sequence in one go, as written by `encode_sequence` (each partition's
+    ascertainment character and sites separated by spaces). It returns True if
+    they're all right, False if not, or None if the value isn't split up like
+    that. Returns None if the output columns aren't in that order.
+    
+    That's a few passes over the value in C rather than a loop over partitions,
+    which is too slow with thousands of them.
+    """
+    order = sorted(partitions)
+    if layout != [(p, i) for p in order for i in range(len(partitions[p]) + 1)]:
+        return None
+    lengths = [len(partitions[p]) + 1 for p in order]
+    sizes = set(lengths)
+    wrong = {'0' + c * (n - 1) for n in sizes for c in '?-'}   # missing, but ascertainment 0
+    missing = {c * n for n in sizes for c in '?-'}              # missing and ascertainment ?/-
+    starts, start = [], 0
+    for n in lengths:
+        starts.append(start)
+        start += n
+    take = gather(starts)
+    
+    def check(raw, value):
+        blocks = raw.split(' ')
+        if list(map(len, blocks)) != lengths:
+            return None
+        if wrong.intersection(blocks):
+            return False
+        # and every other ascertainment character should start a block that's all ? or -
+        asc = take(value)
+        return sum(map(missing.__contains__, blocks)) == len(asc) - asc.count('0')
+    return check
+
+
+def get_ascertainment(value, getters):
+    """
+    Returns the partitions (in `getters`, {partition: (ascertainment getter, sites getter)})
+    of the converted sequence `value` with the wrong ascertainment character.
+    """
+    wrong = []
+    for partition, (asc, sites) in getters.items():
+        a, chars = asc(value), sites(value)
+        if a == '0':
+            ok = chars.strip('?') and chars.strip('-')  # n.b. strip stops at the first site that isn't
+        else:
+            ok = a in '?-' and not chars.strip(a)
+        if not ok:
+            wrong.append(partition)
+    return wrong
+
+
+def verify(root, partitions, checksums, sequences=None):
+    """
+    Checks the converted document `root` holds the same data as went into it.
+
+    `partitions` is {partition: [input sites]} as converted and `checksums` the
+    `checksum` of the input. Returns a list of problems, naming the taxa that
+    don't match and, if the input `sequences` are given, the sites.
+    """
+    data = root.find('data')
+    layout = get_layout(data)
+    problems = []
+
+    # where each output column came from: index 0 is the ascertainment column,
+    # then the partition's sites in order
+    columns, ascertainment = {}, {}
+    for column, (partition, index) in enumerate(layout):
+        sites = partitions.get(partition)
+        if sites is None or index is None or index > len(sites):
+            problems.append(f"Column {column + 1} ({partition}_{index}) isn't in the input partitions")
+        elif index == 0:
+            if partition in ascertainment:
+                problems.append(f"Partition {partition} has more than one ascertainment column")
+            ascertainment[partition] = column
+        else:
+            if sites[index - 1] in columns:
+                problems.append(f"Input site {sites[index - 1] + 1} is in the output twice")
+            columns[sites[index - 1]] = column
+    missing = [s for s in get_sites(partitions) if s not in columns]
+    if missing:
+        problems.append(f"Input site(s) {format_sites(missing)} missing from the output")
+    for partition in sorted(partitions.keys() - ascertainment.keys()):
+        problems.append(f"Partition {partition} has no ascertainment column")
+    if problems:  # can't line the sequences up
+        return problems
+    getters = {
+        p: (gather([ascertainment[p]]), gather([columns[s] for s in sites])) for p, sites in partitions.items()
+    }
+    quick = quick_ascertainment(partitions, layout)
+
+    order = sorted(columns)
+    take = gather([columns[s] for s in order])
+    raw = {s.get('id'): s.get('value', '') for s in data.iter('sequence')}
+    output = {seqid: "".join(value.split()) for seqid, value in raw.items()}
+    for seqid in sorted(checksums.keys() - output.keys()):
+        problems.append(f"Sequence {seqid} missing from the output")
+    for seqid, value in output.items():
+        if seqid not in checksums:
+            problems.append(f"Sequence {seqid} isn't in the input")
+        elif len(value) != len(layout):
+            problems.append(f"Sequence {seqid} has {len(value)} sites, expected {len(layout)}")
+        elif digest(rebuilt := take(value)) != checksums[seqid]:
+            if sequences is None:
+                problems.append(f"Sequence {seqid} doesn't match the input")
+            else:
+                original = sequences[seqid]
+                bad = [s for s, c in zip(order, rebuilt) if original[s] != c]
+                problems.append(f"Sequence {seqid} differs from the input at site(s) {format_sites(bad)}")
+        elif (quick is None or not quick(raw[seqid], value)) and (wrong := get_ascertainment(value, getters)):
+            more = f" and {len(wrong) - 5} more" if len(wrong) > 5 else ""
+            problems.append(
+                f"Sequence {seqid} has the wrong ascertainment character in {', '.join(sorted(wrong)[:5])}{more}"
+            )
+    return problems
+
+
+def format_sites(sites, limit=5):
+    """Formats (0-based) `sites` as 1-based site numbers, eliding all but the first `limit`"""
+    text = ", ".join(str(s + 1) for s in sites[:limit])
+    return text + (f", ... ({len(sites)} in total)" if len(sites) > limit else "")
@@ -0,0 +1,161 @@
+"""
+Watch mode: re-convert a file every time it changes.
+
+The converted output is kept in memory. Each change reads the input's bytes and
+hashes them with the sequence values blanked out, so if only sequence values have
+changed since the last conversion the input isn't parsed at all: the values are
+picked out of the bytes and just those `<sequence>` elements are re-encoded in
+the output, leaving writing it out as the main cost. Anything else (new labels,
+taxa, model elements, even formatting), or `drop_constant`, means a full
+conversion.
+"""
+import hashlib
+import re
+import time
+from pathlib import Path
+from xml.sax.saxutils import unescape
+
+from beastwords.main import Converter, PreflightError, encode_sequence
+
+is_sequence = re.compile(rb"<sequence\b[^>]*>")
+is_attribute = re.compile(rb"""\s([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+def _blank_value(match):
+    tag = match.group(0)
+    for attr in is_attribute.finditer(tag):
+        if attr.group(1) == b'value':
+            return tag[:attr.start()] + b' value=""' + tag[attr.end():]
+    return tag
+
+
+def get_signature(data):
+    """Hash of the document `data` (bytes) with its sequence values blanked out, i.e. everything but the data"""
+    return hashlib.sha256(is_sequence.sub(_blank_value, data)).hexdigest()
+
+
+def read_sequences(data):
+    """
+    Returns the {sequence id: value} of the `<sequence>` elements in the document `data`
+    (bytes), without parsing it.
+    """
+    sequences = {}
+    for match in is_sequence.finditer(data):
+        attrs = {
+            a.group(1).decode('utf-8'): (a.group(2) if a.group(2) is not None else a.group(3)).decode('utf-8')
+            for a in is_attribute.finditer(match.group(0))
+        }
+        # n.b. whitespace isn't part of the sequence, as in `Converter.alignment`
+        sequences[unescape(attrs.get('id', ''), {'&quot;': '"', '&apos;': "'"})] = "".join(
+            attrs.get('value', '').split()
+        )
+    return sequences
+
+
+class Watcher(object):
+    """
+    Converts `input` into `output`, then again whenever `input` changes.
+    
+    The other arguments are as for `convert_file`.
+    """
+    def __init__(self, input, output, partitions=None, plan=None, taxa=None, exclude_taxa=None,
+                 drop_constant=False):
+        self.input, self.output = Path(input), Path(output)
+        self.partitions, self.plan = partitions, plan
+        self.taxa, self.exclude_taxa, self.drop_constant = taxa, exclude_taxa, drop_constant
+        self.stat = None
+        self.signature = None
+        self.sequences = {}  # input {sequence id: value} as of the last conversion
+        self.layout = None   # {partition: [input sites]} used for the last conversion
+        self.converted = None
+    
+    def get_stat(self):
+        try:
+            stat = self.input.stat()
+        except FileNotFoundError:  # e.g. an editor replacing the file
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def changed(self):
+        """True if `input` has been modified since we last looked"""
+        stat = self.get_stat()
+        if stat is None or stat == self.stat:
+            return False
+        self.stat = stat
+        return True
+    
+    def convert(self, xml):
+        """Full conversion of `xml`, raising `PreflightError` if it can't be converted"""
+        problems = xml.preflight()
+        if problems:
+            raise PreflightError(problems, self.input)
+        sequences = dict(xml.alignment)
+        if self.taxa is not None or self.exclude_taxa is not None or self.drop_constant:
+            xml.set_taxa(keep=self.taxa, exclude=self.exclude_taxa, drop_constant=self.drop_constant)
+        if self.plan is not None:
+            self.plan.apply(xml)
+        elif self.partitions:
+            xml.set_partitions(self.partitions)
+        self.layout = dict(xml.partitions)
+        xml.convert()
+        self.converted, self.sequences = xml, sequences
+        return 'full'
+    
+    def patch(self, data):
+        """
+        Updates the sequences in the last output that differ in the document `data`
+        (bytes, with the same signature as the last conversion).
+        
+        Returns None if it can't (e.g. the sequence lengths have changed).
+        """
+        if self.converted is None or self.drop_constant:  # the sites depend on the values
+            return None
+        sequences = read_sequences(data)
+        if sequences.keys() != self.sequences.keys():  # e.g. a <sequence> outside the alignment
+            return None
+        changed = [k for k, v in sequences.items() if self.sequences[k] != v]
+        for seqid in changed:
+            if len(sequences[seqid]) != len(self.sequences[seqid]):
+                return None
+        output = {s.get('id'): s for s in self.converted.data.iter('sequence')}
+        for seqid in changed:
+            if seqid in output:  # i.e. not a removed taxon
+                output[seqid].set('value', encode_sequence(sequences[seqid], self.layout))
+        self.sequences = sequences
+        return changed
+    
+    def update(self):
+        """
+        Re-converts `input` and writes `output`.
+        
+        Returns 'full' for a full conversion, or the list of sequence ids that were updated.
+        """
+        data = self.input.read_bytes()
+        signature = get_signature(data)
+        result = self.patch(data) if signature == self.signature else None
+        if result is None:
+            result = self.convert(Converter.from_bytes(data, xmlfile=self.input))
+        self.signature = signature
+        self.converted.to_file(self.output)
+        return result
+    
+    def run(self, interval=0.5, callback=None, count=None):
+        """
+        Polls `input` every `interval` seconds and updates `output` when it changes.
+        
+        `callback` is called with the result of each update (or the exception if the
+        conversion failed, e.g. the file was saved half-way through an edit). Stops
+        after `count` updates if given.
+        """
+        done = 0
+        while count is None or done < count:
+            if self.changed():
+                try:
+                    result = self.update()
+                except Exception as e:  # keep watching, whatever the edit broke
+                    result = e
+                if callback is not None:
+                    callback(result)
+                done += 1
+            else:
+                time.sleep(interval)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import beastwords
+from beastwords import aio
+from beastwords.main import Converter
+from beastwords.plan import PartitionPlan
+from beastwords.progress import Cancelled
+
+HERE = Path(__file__).parent
+
+
+def expected(filename, partitions=None):
+    xml = Converter.from_file(HERE / filename)
+    if partitions:
+        xml.set_partitions(partitions)
+    xml.convert()
+    return xml.to_bytes()
+
+
+def test_aconvert(tmp_path):
+    out = asyncio.run(beastwords.aconvert(HERE / 'overall-ctmc.xml', tmp_path / 'out.xml', partitions=2))
+    assert out == tmp_path / 'out.xml'
+    assert out.read_bytes() == expected('overall-ctmc.xml', 2)
+
+
+def test_aconvert_plan_in_process_pool(tmp_path):
+    plan = PartitionPlan.from_converter(Converter.from_file(HERE / 'overall-covarion.xml'), 2)
+    with ProcessPoolExecutor(1) as executor:
+        asyncio.run(aio.aconvert(HERE / 'overall-covarion.xml', tmp_path / 'out.xml', plan=plan, executor=executor))
+    assert (tmp_path / 'out.xml').read_bytes() == expected('overall-covarion.xml', 2)
+
+
+def test_aconvert_many(tmp_path):
+    jobs = [
+        {'src': HERE / 'overall-ctmc.xml', 'dst': tmp_path / 'a.xml'},
+        {'src': HERE / 'overall-covarion.xml', 'dst': tmp_path / 'b.xml', 'partitions': 2},
+        {'src': HERE / 'missing.xml', 'dst': tmp_path / 'c.xml'},
+    ]
+    results = asyncio.run(aio.aconvert_many(jobs, limit=2))
+    assert results[:2] == [tmp_path / 'a.xml', tmp_path / 'b.xml']
+    assert isinstance(results[2], OSError)
+    assert not (tmp_path / 'c.xml').exists()
+
+
+def test_aconvert_timeout(tmp_path, monkeypatch):
+    def slow(*args):
+        time.sleep(0.5)
+        return b""
+    monkeypatch.setattr(aio, 'convert_bytes', slow)
+    with pytest.raises(TimeoutError):
+        asyncio.run(aio.aconvert(HERE / 'overall-ctmc.xml', tmp_path / 'out.xml', timeout=0.05))
+    time.sleep(0.5)  # let the thread finish
+    assert not (tmp_path / 'out.xml').exists(), 'should not write anything after a timeout'
+
+
+def test_aconvert_timeout_stops_conversion(tmp_path, monkeypatch):
+    outcome = []
+    def recorded(*args):
+        try:
+            outcome.append(convert_bytes(*args))
+        except Exception as e:
+            outcome.append(e)
+    convert_bytes = aio.convert_bytes
+    monkeypatch.setattr(aio, 'convert_bytes', recorded)
+    
+    convert_taxa = Converter._convert_taxa
+    def slow(self):
+        time.sleep(0.3)
+        convert_taxa(self)
+    monkeypatch.setattr(Converter, '_convert_taxa', slow)
+    
+    with pytest.raises(TimeoutError):
+        asyncio.run(aio.aconvert(HERE / 'overall-ctmc.xml', tmp_path / 'out.xml', timeout=0.05))
+    time.sleep(0.5)  # let the thread get to its next progress report
+    assert len(outcome) == 1 and isinstance(outcome[0], Cancelled)
+    assert not (tmp_path / 'out.xml').exists()
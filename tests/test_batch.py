@@ -0,0 +1,79 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from beastwords.batch import batch, expand_inputs, read_journal, read_manifest, main
+
+HERE = Path(__file__).parent
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    for f in ['overall-covarion.xml', 'overall-ctmc.xml']:
+        shutil.copy(HERE / f, tmp_path / f)
+    (tmp_path / 'broken.xml').write_text("<beast>")
+    return tmp_path
+
+
+def test_read_manifest(tmp_path):
+    (tmp_path / 'jobs.tsv').write_text(
+        "input\toutput\tpartitions\tdrop_constant\n"
+        "a.xml\tout/a.xml\t2\t\n"
+        "b.xml\tout/b.xml\t\ttrue\n"
+    )
+    jobs = read_manifest(tmp_path / 'jobs.tsv')
+    assert jobs[0] == {
+        'input': str(tmp_path / 'a.xml'), 'output': str(tmp_path / 'out/a.xml'),
+        'partitions': '2', 'drop_constant': False
+    }
+    assert jobs[1]['partitions'] is None
+    assert jobs[1]['drop_constant'] is True
+
+
+def test_expand_inputs(inputs):
+    jobs = expand_inputs([str(inputs / 'overall-*.xml')], outdir='out')
+    assert [j['output'] for j in jobs] == ['out/overall-covarion.partitioned.xml', 'out/overall-ctmc.partitioned.xml']
+
+
+def test_expand_inputs_skips_outputs(inputs):
+    jobs = expand_inputs([str(inputs / 'overall-*.xml')])
+    batch(jobs, inputs / 'journal.jsonl', defaults={'partitions': '2'})
+    assert (inputs / 'overall-ctmc.partitioned.xml').exists()
+    # re-running over the same glob doesn't pick up the outputs
+    assert expand_inputs([str(inputs / 'overall-*.xml')]) == jobs
+    # nor do inputs that are another job's output, however they're given
+    jobs = expand_inputs([str(inputs / 'overall-ctmc.xml'), str(inputs / 'overall-ctmc.partitioned.xml')])
+    assert [Path(j['input']).name for j in jobs] == ['overall-ctmc.xml']
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch(inputs, workers):
+    jobs = expand_inputs([str(inputs / '*.xml')], outdir=inputs / 'out')
+    journal = inputs / 'journal.jsonl'
+    records = batch(jobs, journal, defaults={'partitions': '2'}, workers=workers)
+    assert len(records) == 3
+    status = {Path(r['input']).name: r['status'] for r in records}
+    assert status == {'broken.xml': 'error', 'overall-covarion.xml': 'ok', 'overall-ctmc.xml': 'ok'}
+    assert (inputs / 'out' / 'overall-ctmc.partitioned.xml').exists()
+    assert len(read_journal(journal)) == 2
+    
+    # resume -- only the broken one is re-run
+    records = batch(jobs, journal, defaults={'partitions': '2'}, workers=workers)
+    assert [Path(r['input']).name for r in records] == ['broken.xml']
+    
+    # changing the options or the input re-runs
+    (inputs / 'overall-ctmc.xml').write_text((inputs / 'overall-ctmc.xml').read_text() + "\n")
+    records = batch(jobs, journal, defaults={'partitions': '2'}, workers=workers)
+    assert sorted(Path(r['input']).name for r in records) == ['broken.xml', 'overall-ctmc.xml']
+    records = batch(jobs, journal, defaults={'partitions': '3'}, workers=workers)
+    assert len(records) == 3
+
+
+def test_main(inputs):
+    journal = inputs / 'journal.jsonl'
+    outdir = str(inputs / 'out')
+    assert main([str(inputs / 'overall-*.xml'), '-o', outdir, '--journal', str(journal)]) == 0
+    assert main([str(inputs / '*.xml'), '-o', outdir, '--journal', str(journal)]) == 1
+    assert len([json.loads(l) for l in journal.read_text().splitlines()]) == 3
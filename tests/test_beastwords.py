@@ -36,6 +36,47 @@ def test_model(covarion, ctmc):
     assert ctmc.model == 'BinaryCTMC', 'Got %s' % ctmc.model
 
 
+def test_in_memory(covarion):
+    xmlfile = Path(__file__).parent / 'overall-covarion.xml'
+    for conv in [
+        Converter.from_bytes(xmlfile.read_bytes()),
+        Converter.from_string(xmlfile.read_text()),
+        Converter.from_tree(etree.parse(xmlfile)),
+    ]:
+        assert isinstance(conv, CovarionConverter)
+        assert conv.xmlfile is None
+        assert conv.partitions == covarion.partitions
+        conv.convert()
+        assert conv.to_tree() is conv.tree
+
+    covarion.convert()
+    assert conv.to_bytes() == covarion.to_bytes()
+
+
+def test_init_requires_file_or_tree():
+    with pytest.raises(ValueError):
+        Converter()
+    with pytest.raises(IOError):
+        Converter(Path('does-not-exist.xml'))
+
+
+def test_lazy():
+    conv = Converter.from_file(Path(__file__).parent / 'overall-ctmc.xml')
+    assert isinstance(conv, CTMCConverter)
+    assert conv._tree is None, 'should not have parsed the file yet'
+    assert conv._partitions is None
+    assert len(conv.partitions) == 3
+    assert conv.ascertainment == [0]
+    assert conv.alignment['seq_Taxon11'] == '0111000?11'
+
+    conv.set_partitions(2)
+    assert len(conv.partitions) == 2
+    conv._convert_sequences()
+    assert conv.ascertainment == [1, 7]
+    assert conv.words[0] == ('p1_0', 'UserDataType.1')
+    assert conv.alignment['seq_Taxon11'] == '011?1101000'
+
+
 def test_patch(covarion):
     root = etree.Element("root")
     child = etree.SubElement(root, "child")
@@ -584,15 +625,144 @@ def test_convert_treelikelihood_ctmc(request, fixture):
         sm = m.root.xpath(f".//distribution/siteModel[@id='SiteModel.s:{p}']/substModel")
         assert len(sm), f'SiteModel.s:{p}/substModel.s:{p} missing'
         
-        # check parent siteModel 
-        assert sm[0].getparent().get('shape') == None
+        # check parent siteModel refers to the partition's gammaShape in the state
+        assert sm[0].getparent().get('shape') == f"@gammaShape.s:{p}"
         assert sm[0].get('id') == f'CTMC.s:{p}'
-
-        gs = sm[0].getparent().xpath(f".//parameter[@id='gammaShape.s:{p}']")
-        assert len(gs), "No gammaShape parameter in this siteModel {p}"
-        assert gs[0].get('id') == f"gammaShape.s:{p}"
-        assert gs[0].get('spec') == "parameter.RealParameter"
-        assert gs[0].get('name') == "shape"
+        assert not sm[0].getparent().xpath(f".//parameter[@id='gammaShape.s:{p}']")
         
     
         
+
+
+### --------------------------------------------------------------------------------------------------###
+### Re-partitioning
+### --------------------------------------------------------------------------------------------------###
+@pytest.mark.parametrize("filename", ['overall-covarion.xml', 'overall-ctmc.xml'])
+@pytest.mark.parametrize("scheme", [None, 2, "1-3,4-9"])
+def test_repartition_converted(filename, scheme):
+    # converting our own output again should give the same as converting the original
+    first = Converter.from_file(Path(__file__).parent / filename)
+    first.convert()
+    
+    again = Converter.from_bytes(first.to_bytes())
+    assert again.partitioned
+    assert again.partitions == {'eye': [1, 2, 3], 'foot': [5, 6, 7, 8], 'hand': [10, 11]}
+    assert again.ascertainment == [0, 4, 9]
+    
+    expected = Converter.from_file(Path(__file__).parent / filename)
+    assert not expected.partitioned
+    if scheme:
+        again.set_partitions(scheme)
+        expected.set_partitions(scheme)
+    again.convert()
+    expected.convert()
+    assert again.to_bytes() == expected.to_bytes()
+
+
+### --------------------------------------------------------------------------------------------------###
+### Taxa subsets
+### --------------------------------------------------------------------------------------------------###
+def get_sequences(m):
+    return {s.get('taxon'): s.get('value') for s in m.root.xpath('.//sequence')}
+
+
+@pytest.mark.parametrize("fixture", ALL_MODELS)
+def test_set_taxa(request, fixture):
+    m = request.getfixturevalue(fixture)
+    m.set_taxa(exclude=['Taxon3'])
+    m.convert()
+    assert sorted(get_sequences(m)) == ['Taxon1', 'Taxon2']
+
+
+def test_set_taxa_sequences(covarion):
+    covarion.set_taxa(keep=['Taxon1', 'Taxon2'])
+    covarion.convert()
+    assert get_sequences(covarion) == {'Taxon1': '0?11 01000 011', 'Taxon2': '0??1 00100 011'}
+
+
+def test_set_taxa_drop_constant(covarion):
+    covarion.set_taxa(keep=['Taxon1', 'Taxon2'], drop_constant=True)
+    with pytest.warns(UserWarning):  # hand and eye are now constant
+        covarion.convert()
+    assert list(covarion.partitions) == ['foot']
+    assert get_sequences(covarion) == {'Taxon1': '010', 'Taxon2': '001'}
+    # and the emptied partitions are gone from the model too
+    filtered = [e.get('id') for e in covarion.root.iter('data') if e.get('spec') == 'FilteredAlignment']
+    assert not [f for f in filtered if 'hand' in f or 'eye' in f]
+
+
+def test_set_taxa_errors(covarion):
+    with pytest.warns(UserWarning):
+        covarion.set_taxa(keep=['Taxon1', 'Unknown'])
+    assert covarion.keep_taxa == {'Taxon1'}
+    with pytest.raises(ValueError):
+        covarion.set_taxa(keep=[])
+
+
+def with_clade(*taxa, extra=""):
+    """overall-covarion.xml with a monophyly constraint on `taxa` (and `extra` after it)"""
+    members = "".join(f'<taxon id="{t}" spec="Taxon"/>' for t in taxa)
+    return (Path(__file__).parent / 'overall-covarion.xml').read_text().replace(
+        '<prior id="YuleBirthRatePrior.t:tree"',
+        f'''<distribution id="clade.prior" spec="beast.base.evolution.tree.MRCAPrior" monophyletic="true" tree="@Tree.t:tree">
+            <taxonset id="clade" spec="TaxonSet">
+                {members}
+            </taxonset>
+        </distribution>
+        {extra}
+        <prior id="YuleBirthRatePrior.t:tree"''').replace(
+        '<log idref="YuleModel.t:tree"/>', '<log idref="YuleModel.t:tree"/><log idref="clade.prior"/>'
+    )
+
+
+@pytest.mark.parametrize("taxa", [['Taxon3'], ['Taxon2', 'Taxon3']])
+def test_set_taxa_constraints(taxa):
+    # the constraint goes whether none or only some of its taxa are left
+    m = Converter.from_string(with_clade(*taxa))
+    m.set_taxa(exclude=['Taxon3'])
+    with pytest.warns(UserWarning, match="Removing clade.prior as some of its taxa have been removed"):
+        m.convert()
+    assert not m.root.xpath(".//taxon[@id='Taxon3']")
+    assert not m.root.xpath(".//distribution[@id='clade.prior']")
+    assert not m.root.xpath(".//log[@idref='clade.prior']")
+
+
+def test_set_taxa_constraints_kept():
+    m = Converter.from_string(with_clade('Taxon1', 'Taxon2'))
+    m.set_taxa(exclude=['Taxon3'])
+    m.convert()
+    assert m.root.xpath(".//distribution[@id='clade.prior']")
+    assert m.root.xpath(".//log[@idref='clade.prior']")
+
+
+def test_set_taxa_constraints_idref():
+    other = '''<distribution id="other.prior" spec="beast.base.evolution.tree.MRCAPrior" tree="@Tree.t:tree">
+            <taxonset idref="clade"/>
+        </distribution>'''
+    m = Converter.from_string(with_clade('Taxon2', 'Taxon3', extra=other))
+    m.set_taxa(exclude=['Taxon3'])
+    with pytest.warns(UserWarning):
+        m.convert()
+    assert not m.root.xpath(".//distribution[@id='clade.prior']")
+    assert not m.root.xpath(".//distribution[@id='other.prior']")
+
+
+def test_set_taxa_trait_kept():
+    # a trait on taxa that have been removed isn't a constraint, so is only trimmed
+    trait = '''<trait id="dateTrait.t:tree" spec="beast.base.evolution.tree.TraitSet" traitname="date" value="Taxon1=1,Taxon2=2,Taxon3=3">
+                    <taxonset id="dates" spec="TaxonSet">
+                        <taxon idref="Taxon1"/>
+                        <taxon idref="Taxon2"/>
+                        <taxon idref="Taxon3"/>
+                    </taxonset>
+                </trait>
+            </tree>'''
+    m = Converter.from_string(with_clade('Taxon2', 'Taxon3').replace('</tree>', trait, 1))
+    m.set_taxa(exclude=['Taxon3'])
+    with pytest.warns(UserWarning, match="Removing clade.prior") as record:
+        m.convert()
+    assert not any('dateTrait' in str(w.message) for w in record)
+    assert not m.root.xpath(".//distribution[@id='clade.prior']")
+    trait = m.root.xpath(".//trait[@id='dateTrait.t:tree']")[0]
+    assert trait.get('value') == "Taxon1=1,Taxon2=2"
+    assert [t.get('idref') for t in trait.iter('taxon')] == ['Taxon1', 'Taxon2']
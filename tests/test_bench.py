@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BENCHMARKS = Path(__file__).parent.parent / 'benchmarks'
+
+
+def bench(*args):
+    return subprocess.run(
+        [sys.executable, str(BENCHMARKS / 'bench.py'), *map(str, args)], capture_output=True, text=True
+    )
+
+
+def test_run_and_compare(tmp_path):
+    # a smoke test: the timings themselves depend on the machine, so only a huge
+    # slowdown against the stored baseline should fail
+    result = bench('run', '--quick', '--repeat', 1, '-o', tmp_path / 'current.json')
+    assert result.returncode == 0, result.stderr
+    baseline = json.loads((BENCHMARKS / 'baseline.json').read_text())
+    current = json.loads((tmp_path / 'current.json').read_text())
+    assert set(current['results']) <= set(baseline['results'])
+    
+    result = bench('compare', BENCHMARKS / 'baseline.json', tmp_path / 'current.json', '--tolerance', 20)
+    assert result.returncode == 0, result.stdout
+    assert "No slowdowns beyond 2000%" in result.stdout
+    
+    # anything slower at all fails with no tolerance
+    result = bench('compare', tmp_path / 'current.json', tmp_path / 'current.json', '--tolerance', -0.5)
+    assert result.returncode == 1
@@ -0,0 +1,85 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from beastwords.cache import DirectoryCache, MetadataCache, ResultCache
+from beastwords.main import Converter, CTMCConverter, convert_file
+
+
+@pytest.fixture
+def xmlfile(tmp_path):
+    return shutil.copy(Path(__file__).parent / 'overall-ctmc.xml', tmp_path / 'in.xml')
+
+
+@pytest.mark.parametrize("content", [False, True])
+def test_metadata_cache(tmp_path, xmlfile, content):
+    cache = MetadataCache(tmp_path / 'cache', content=content, alignment=True)
+    assert cache.load(xmlfile) is None
+    
+    first = Converter.from_file(xmlfile, cache=cache)
+    assert len(cache.entries()) == 1
+    
+    second = Converter.from_file(xmlfile, cache=cache)
+    assert isinstance(second, CTMCConverter)
+    assert second._words is not None, 'should have been loaded from cache'
+    assert second.words == first.words
+    assert second.partitions == first.partitions
+    assert second.ascertainment == first.ascertainment
+    assert second.alignment == first.alignment
+    assert second._tree is None, 'should not have parsed the file'
+    
+    # and still converts identically
+    first.convert()
+    second.convert()
+    assert first.to_bytes() == second.to_bytes()
+
+
+def test_metadata_cache_invalidated_on_change(tmp_path, xmlfile):
+    cache = MetadataCache(tmp_path / 'cache')
+    Converter.from_file(xmlfile, cache=cache)
+    xmlfile.write_text(xmlfile.read_text().replace('hand_', 'arm_'))
+    assert cache.load(xmlfile) is None
+    assert 'arm' in Converter.from_file(xmlfile, cache=cache).partitions
+
+
+def test_lru_eviction(tmp_path):
+    cache = DirectoryCache(tmp_path, max_size=100)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, b'0123456789')
+        os.utime(cache.path(key), ns=(i * 10**9, i * 10**9))
+    assert cache.get('d') is None
+    assert cache.get('a') is not None  # a is now the most recently used
+    cache.max_size = 25
+    cache.evict()
+    assert sorted(p.name for p in cache.entries()) == ['a', 'c']
+
+
+def test_result_cache(tmp_path, xmlfile):
+    results = ResultCache(tmp_path / 'results')
+    assert convert_file(xmlfile, tmp_path / 'a.xml', partitions='2', results=results) is False
+    assert convert_file(xmlfile, tmp_path / 'b.xml', partitions=2, results=results) is True
+    assert (tmp_path / 'a.xml').read_bytes() == (tmp_path / 'b.xml').read_bytes()
+    # different options are a different entry
+    assert convert_file(xmlfile, tmp_path / 'c.xml', partitions=3, results=results) is False
+    assert len(results.entries()) == 2
+
+
+def test_deterministic_output(covarion):
+    # same partitions in a different insertion order should give identical output
+    other = Converter.from_file(covarion.xmlfile)
+    other.partitions = dict(reversed(list(other.partitions.items())))
+    covarion._convert_treelikelihood()
+    other._convert_treelikelihood()
+    assert covarion.to_bytes() == other.to_bytes()
+
+
+def test_result_cache_code_change(tmp_path, xmlfile, monkeypatch):
+    # results from a different version of the code aren't reused
+    from beastwords import cache
+    results = ResultCache(tmp_path / 'results')
+    assert convert_file(xmlfile, tmp_path / 'a.xml', partitions=2, results=results) is False
+    monkeypatch.setattr(cache, 'code_hash', lambda: 'changed')
+    assert convert_file(xmlfile, tmp_path / 'b.xml', partitions=2, results=results) is False
+    assert len(results.entries()) == 2
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import pytest
+from lxml import etree
+
+from beastwords.check import CheckError, check, check_file, check_ranges, main
+from beastwords.main import CTMCConverter, convert_file
+
+HERE = Path(__file__).parent
+
+
+def tree(body):
+    return etree.fromstring(f"<beast>{body}</beast>")
+
+
+@pytest.mark.parametrize("filename", [
+    'overall-covarion.xml', 'overall-covarion-no_mutationrate.xml', 'overall-ctmc.xml',
+    'words-covarion.xml', 'words-ctmc.xml',
+])
+def test_fixtures_ok(filename):
+    assert check_file(HERE / filename) == []
+
+
+def test_converted_covarion_ok(covarion):
+    covarion.set_partitions(3)
+    covarion.convert()
+    assert check(covarion.root) == []
+
+
+def test_converted_ctmc_ok(ctmc):
+    ctmc.set_partitions(2)
+    ctmc.convert()
+    assert check(ctmc.root) == []
+
+
+def test_references():
+    root = tree('<a id="a" x="@b"/><c idref="a"/><d y="@a" spec="notaref"/>')
+    assert check(root) == ["<a id='a'> refers to missing id 'b'"]
+
+
+def test_duplicates():
+    root = tree('<a id="a"/><b id="a"/><c id="c"/>')
+    assert check(root) == ["Duplicate id 'a' (2 elements)"]
+
+
+def test_check_ranges():
+    assert check_ranges('-', 10) == []
+    assert check_ranges('1-10', 10) == []
+    assert check_ranges('1-3,4,5-11', 10) == ['5-11']
+    assert check_ranges('0-2', 10) == ['0-2']
+    assert check_ranges('5-2', 10) == ['5-2']
+    assert check_ranges('1-10\\3', 5) == []  # not checked
+
+
+def test_filters():
+    root = tree(
+        '<data id="words"><sequence value="0101 01"/></data>'
+        '<data id="p1" spec="FilteredAlignment" data="@words" filter="1-4"/>'
+        '<data id="p2" spec="FilteredAlignment" data="@words" filter="5-7"/>'
+    )
+    assert check(root) == ["FilteredAlignment 'p2' filter 5-7 is outside alignment 'words' (1-6)"]
+
+
+def test_convert_file_check(tmp_path):
+    out = tmp_path / 'out.xml'
+    convert_file(HERE / 'words-covarion.xml', out, partitions='2', check=True)
+    assert check_file(out) == []
+
+    out = tmp_path / 'ctmc.xml'
+    convert_file(HERE / 'words-ctmc.xml', out, partitions='2', check=True)
+    assert check_file(out) == []
+
+
+def test_convert_file_check_error(tmp_path, monkeypatch):
+    # a converter bug that leaves a dangling reference
+    monkeypatch.setattr(CTMCConverter, '_convert_log', lambda self: self.root.append(etree.Element('log', idref='nope')))
+    out = tmp_path / 'ctmc.xml'
+    with pytest.raises(CheckError) as e:
+        convert_file(HERE / 'words-ctmc.xml', out, partitions='2', check=True)
+    assert "missing id 'nope'" in str(e.value)
+    assert not out.exists()
+
+
+def test_main(tmp_path, capsys):
+    good = tmp_path / 'good.xml'
+    bad = tmp_path / 'bad.xml'
+    good.write_text('<beast><a id="a"/><b x="@a"/></beast>')
+    bad.write_text('<beast><b x="@a"/></beast>')
+    assert main([str(good)]) == 0
+    assert main([str(good), str(bad)]) == 1
+    out = capsys.readouterr().out
+    assert f"{good}: ok" in out
+    assert f"{bad}: 1 problem(s)" in out
+    assert "missing id 'a'" in out
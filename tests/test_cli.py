@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import beastwords
+from beastwords.cli import main
+
+HERE = Path(__file__).parent
+
+
+def loaded(code):
+    """Returns which of the heavy modules are loaded after running `code` in a new interpreter"""
+    env = dict(os.environ, PYTHONPATH=str(HERE.parent / 'src'))
+    env.pop('BEASTWORDS_SERVER', None)
+    check = "import sys; print('loaded:', *(m for m in ('lxml', 'asyncio', 'beastwords.main') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, '-c', f"{code}\n{check}"], env=env, capture_output=True, text=True
+    )
+    return result.stdout.splitlines()[-1].split()[1:]
+
+
+@pytest.mark.parametrize("code", [
+    "import beastwords",
+    "import beastwords.cli",
+    "import beastwords.sitedistr",
+    "from beastwords.cli import main\ntry: main(['--help'])\nexcept SystemExit: pass",
+    "from beastwords.cli import main\ntry: main(['a.xml', 'b.xml', '--watch', '--sweep', '2..4'])\nexcept SystemExit: pass",
+])
+def test_lazy(code):
+    assert loaded(code) == []
+
+
+def test_lazy_attributes():
+    from beastwords.main import Converter
+    from beastwords.aio import aconvert
+    assert beastwords.Converter is Converter
+    assert beastwords.aconvert is aconvert
+    assert 'Converter' in dir(beastwords)
+    with pytest.raises(AttributeError):
+        beastwords.Nothing
+
+
+@pytest.mark.parametrize("args, message", [
+    (['a.xml', 'b.xml', '--taxa', 'a', '--exclude-taxa', 'b'], "Use one of --taxa or --exclude-taxa"),
+    (['a.nex', 'b.xml'], "NEXUS input needs a --template XML"),
+    (['a.xml', 'b.xml', '--verify', '--replicates', '3'], "--verify only works with single conversions"),
+    (['a.xml', 'b.xml', '--plan', 'plan.json', '-p', '2'], "Use one of -p/--partitions or --plan"),
+    (['a.xml', 'b.xml', '--plan', 'plan.json', '--sweep', '2..4'], "--plan only works with single conversions"),
+    (['a.xml', 'b.xml', '--plan', 'plan.json', '--replicates', '3'], "--plan only works with single conversions"),
+    (['a.xml', 'b.xml', '-p', '2', '--sweep', '2..4'], "Use one of -p/--partitions or --sweep"),
+])
+def test_usage_errors(args, message, capsys):
+    with pytest.raises(SystemExit):
+        main(args)
+    assert message in capsys.readouterr().err
+
+
+def test_convert(tmp_path):
+    main([str(HERE / 'words-covarion.xml'), str(tmp_path / 'out.xml'), '-p', '2', '--no-progress'])
+    assert (tmp_path / 'out.xml').exists()
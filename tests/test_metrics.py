@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter, main
+from beastwords.metrics import Metrics
+
+HERE = Path(__file__).parent
+
+STAGES = ['parse', 'sequences', 'taxa', 'state', 'prior', 'treelikelihood', 'operators', 'log', 'serialize']
+
+
+@pytest.mark.parametrize("filename", ['overall-covarion.xml', 'overall-ctmc.xml'])
+def test_metrics(filename):
+    xml = Converter.from_file(HERE / filename)
+    xml.metrics = Metrics()
+    xml.set_partitions(2)
+    xml.convert()
+    data = xml.to_bytes()
+    
+    assert list(xml.metrics.stages) == STAGES
+    for name, record in xml.metrics.stages.items():
+        assert record['wall'] >= 0 and record['cpu'] >= 0
+        assert record['peak_memory'] >= 0
+    stages = xml.metrics.stages
+    assert stages['treelikelihood']['xpath'] > 0
+    assert stages['treelikelihood']['created'] > 0
+    assert stages['treelikelihood']['removed'] > 0  # the old TreeLikelihood
+    assert stages['state']['deepcopy'] == stages['state']['created']
+    
+    total = xml.metrics.get_total()
+    assert total['xpath'] == sum(s['xpath'] for s in stages.values())
+    
+    # and the output shouldn't change
+    expected = Converter.from_file(HERE / filename)
+    expected.set_partitions(2)
+    expected.convert()
+    assert expected.to_bytes() == data
+
+
+def test_disabled(covarion):
+    assert covarion.metrics is None
+    covarion.convert()  # fine without
+
+
+def test_without_memory(ctmc):
+    ctmc.metrics = Metrics(memory=False)
+    ctmc.convert()
+    assert 'peak_memory' not in ctmc.metrics.stages['log']
+    assert 'log' in str(ctmc.metrics)
+
+
+def test_main(tmp_path):
+    main([str(HERE / 'overall-ctmc.xml'), str(tmp_path / 'out.xml'), '--metrics', str(tmp_path / 'metrics.json')])
+    metrics = json.loads((tmp_path / 'metrics.json').read_text())
+    assert list(metrics['stages']) == ['parse', 'preflight'] + STAGES[1:]
+    assert metrics['total']['xpath'] > 0
@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter, CovarionConverter
+from beastwords.nexus import read_nexus
+
+HERE = Path(__file__).parent
+
+
+def test_read_nexus():
+    nex = read_nexus(HERE / 'words.nex')
+    assert len(nex.labels) == 10
+    assert nex.labels[0] == '_ascertainment_0'
+    assert nex.labels[9] == 'eye_3'
+    assert nex.matrix == {
+        'Taxon1': '0111000?11',
+        'Taxon2': '0110100??1',
+        'Taxon3': '0110010???',
+    }
+    assert nex.charsets == {'hand': [0, 1, 2], 'foot': [3, 4, 5, 6], 'eye': [7, 8, 9]}
+
+
+def write_nexus(tmp_path, matrix, format=""):
+    text = (HERE / 'words.nex').read_text()
+    start, end = text.index("MATRIX"), text.index(";\nEND;")
+    text = text[:start] + "MATRIX\n" + matrix + "\n" + text[end:]
+    text = text.replace('SYMBOLS="01";', f'SYMBOLS="01" {format};')
+    (tmp_path / 'test.nex').write_text(text)
+    return read_nexus(tmp_path / 'test.nex')
+
+
+EXPECTED = {'Taxon1': '0111000?11', 'Taxon2': '0110100??1', 'Taxon3': '0110010???'}
+
+
+def test_read_nexus_tabs(tmp_path):
+    nex = write_nexus(tmp_path, "Taxon1\t0111000?11\nTaxon2\t\t0110100??1\n'Taxon3'\t0110010???")
+    assert nex.matrix == EXPECTED
+
+
+def test_read_nexus_wrapped(tmp_path):
+    nex = write_nexus(tmp_path, "Taxon1 01110\n00?11\nTaxon2 0110100\n  ??1\nTaxon3\n0110010???")
+    assert nex.matrix == EXPECTED
+
+
+def test_read_nexus_interleaved(tmp_path):
+    nex = write_nexus(
+        tmp_path, "Taxon1 01110\nTaxon2 01101\nTaxon3 01100\n\nTaxon1 00?11\nTaxon2 00??1\nTaxon3 10???",
+        format="INTERLEAVE"
+    )
+    assert nex.interleaved
+    assert nex.matrix == EXPECTED
+
+
+def test_read_nexus_no_charsets():
+    nex = read_nexus(HERE / 'overall.nex')
+    assert len(nex.labels) == 10
+    assert nex.charsets == {}
+
+
+@pytest.mark.parametrize("nexfile", ['words.nex', 'overall.nex'])
+def test_from_nexus(covarion, nexfile):
+    conv = Converter.from_nexus(HERE / nexfile, HERE / 'overall-covarion.xml')
+    assert isinstance(conv, CovarionConverter)
+    assert conv.partitions == covarion.partitions
+    assert conv.ascertainment == [0]
+    # same data as the template so should convert identically
+    conv.convert()
+    covarion.convert()
+    assert conv.to_bytes() == covarion.to_bytes()
+
+
+def test_from_nexus_bad_matrix(tmp_path):
+    nexfile = tmp_path / 'bad.nex'
+    nexfile.write_text((HERE / 'overall.nex').read_text().replace('Taxon3  011 0010 ???', 'Taxon3  011 0010 ??'))
+    with pytest.raises(ValueError):
+        Converter.from_nexus(nexfile, HERE / 'overall-covarion.xml')
+
+
+def test_read_nexus_comments(tmp_path):
+    text = (HERE / 'words.nex').read_text().replace(
+        "MATRIX", "[a comment\nover [nested] several\nlines;]\nMATRIX"
+    ).replace("Taxon2  011 0100 ??1", "Taxon2  011 0100 ??1 [another]")
+    (tmp_path / 'test.nex').write_text(text)
+    nex = read_nexus(tmp_path / 'test.nex')
+    assert nex.matrix == EXPECTED
+    assert len(nex.labels) == 10
+
+
+@pytest.mark.parametrize("charset, expected", [
+    ("1-3", [0, 1, 2]),
+    ("1 - 3, 5", [0, 1, 2, 4]),
+    ("2-10\\3", [1, 4, 7]),
+    ("2-10 \\ 3", [1, 4, 7]),
+    ("8-.", [7, 8, 9]),
+    ("1-.\\4 6", [0, 4, 8, 5]),
+    ("1-2\n  3", [0, 1, 2]),
+])
+def test_read_nexus_charset(tmp_path, charset, expected):
+    text = (HERE / 'words.nex').read_text().replace("charset eye = 8-10;", f"charset eye = {charset};")
+    (tmp_path / 'test.nex').write_text(text)
+    assert read_nexus(tmp_path / 'test.nex').charsets['eye'] == expected
+
+
+def test_read_nexus_bad_charset(tmp_path):
+    text = (HERE / 'words.nex').read_text().replace("charset eye = 8-10;", "charset eye = 8-10\\x;")
+    (tmp_path / 'test.nex').write_text(text)
+    with pytest.raises(ValueError, match="Unable to parse charset"):
+        read_nexus(tmp_path / 'test.nex')
+
+
+def write_unlabelled(tmp_path, charsets="charset hand = 2-3;\n\tcharset foot = 4-7;\n\tcharset eye = 8-10;"):
+    text = (HERE / 'words.nex').read_text()
+    start, end = text.index("CHARSTATELABELS"), text.index("MATRIX")
+    text = text[:start] + text[end:]
+    start, end = text.index("charset hand"), text.index("end;", text.index("charset hand"))
+    text = text[:start] + charsets + "\nend;"
+    (tmp_path / 'test.nex').write_text(text)
+    return tmp_path / 'test.nex'
+
+
+def test_make_labels(tmp_path):
+    nex = read_nexus(write_unlabelled(tmp_path))
+    assert nex.labels == []
+    assert nex.make_labels() == [
+        '_ascertainment_0', 'hand_1', 'hand_2', 'foot_1', 'foot_2', 'foot_3', 'foot_4',
+        'eye_1', 'eye_2', 'eye_3',
+    ]
+
+
+def test_make_labels_no_charsets(tmp_path):
+    nex = read_nexus(write_unlabelled(tmp_path, charsets=""))
+    with pytest.raises(ValueError, match="no CHARSTATELABELS or charsets"):
+        nex.make_labels()
+
+
+def test_from_nexus_no_labels(covarion, tmp_path):
+    conv = Converter.from_nexus(write_unlabelled(tmp_path), HERE / 'overall-covarion.xml')
+    assert conv.partitions == covarion.partitions
+    assert conv.ascertainment == [0]
+    conv.convert()
+    covarion.convert()
+    assert conv.to_bytes() == covarion.to_bytes()
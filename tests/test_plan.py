@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter, main
+from beastwords.plan import PartitionPlan, PlanError
+
+HERE = Path(__file__).parent
+
+
+@pytest.mark.parametrize("scheme", [None, 2, "1-3,4-9"])
+def test_plan(scheme):
+    conv = Converter.from_file(HERE / 'overall-covarion.xml')
+    plan = PartitionPlan.from_converter(conv, scheme)
+    assert conv._tree is None, 'planning should not parse the tree'
+    assert plan.get_words() == {'eye': [7, 8, 9], 'foot': [3, 4, 5, 6], 'hand': [1, 2]}
+    assert list(plan.ascertainment) == [0]
+    
+    if scheme:
+        conv.set_partitions(scheme)
+    assert plan.get_partitions() == dict(conv.partitions)
+
+
+def test_plan_stats():
+    plan = PartitionPlan.from_converter(Converter.from_file(HERE / 'overall-covarion.xml'), 2)
+    assert plan.get_stats() == {'p1': {'words': 2, 'sites': 5}, 'p2': {'words': 1, 'sites': 4}}
+
+
+def test_plan_save_load(tmp_path):
+    plan = PartitionPlan.from_converter(Converter.from_file(HERE / 'overall-ctmc.xml'), 2)
+    plan.save(tmp_path / 'plan.json')
+    assert PartitionPlan.load(tmp_path / 'plan.json') == plan
+
+
+@pytest.mark.parametrize("filename", ['overall-covarion.xml', 'overall-ctmc.xml'])
+def test_convert_plan(filename):
+    # a plan made from one file can be applied to another with the same words
+    plan = PartitionPlan.from_converter(Converter.from_file(HERE / 'overall-covarion.xml'), 2)
+    
+    conv = Converter.from_file(HERE / filename)
+    conv.convert(plan)
+    
+    expected = Converter.from_file(HERE / filename)
+    expected.set_partitions(2)
+    expected.convert()
+    assert conv.to_bytes() == expected.to_bytes()
+
+
+def test_convert_plan_mismatch():
+    plan = PartitionPlan.from_converter(Converter.from_file(HERE / 'overall-covarion.xml'))
+    with pytest.raises(PlanError):
+        Converter.from_file(HERE / 'misc1.xml').convert(plan)
+
+
+def test_main_plan_mismatch(tmp_path):
+    PartitionPlan.from_converter(Converter.from_file(HERE / 'overall-covarion.xml')).save(tmp_path / 'plan.json')
+    other = tmp_path / 'other.xml'
+    other.write_text((HERE / 'overall-ctmc.xml').read_text().replace('characterName="hand_1"', 'characterName="arm_1"'))
+    with pytest.raises(SystemExit) as e:
+        main([str(other), str(tmp_path / 'out.xml'), '--plan', str(tmp_path / 'plan.json'), '--no-progress'])
+    assert e.value.code == "PartitionPlan does not match the words in this file"
+    assert not (tmp_path / 'out.xml').exists()
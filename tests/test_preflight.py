@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import pytest
+
+from beastwords.batch import run_job, get_options
+from beastwords.main import Converter, PreflightError, convert_file, main
+
+HERE = Path(__file__).parent
+
+
+def broken(tmp_path, filename, *removals):
+    """Copies `filename` without the lines containing any of `removals`"""
+    lines = (HERE / filename).read_text().splitlines(keepends=True)
+    out = tmp_path / filename
+    out.write_text("".join(l for l in lines if not any(r in l for r in removals)))
+    return out
+
+
+@pytest.mark.parametrize("filename", [
+    'overall-covarion.xml', 'overall-covarion-no_mutationrate.xml', 'overall-ctmc.xml',
+    'words-covarion.xml', 'words-ctmc.xml',
+])
+def test_ok(filename):
+    assert Converter.from_file(HERE / filename).preflight() == []
+
+
+def test_converted_ok(ctmc):
+    ctmc.set_partitions(2)
+    ctmc.convert()
+    assert Converter.from_bytes(ctmc.to_bytes()).preflight() == []
+
+
+def test_all_problems(tmp_path):
+    filename = broken(tmp_path, 'overall-covarion.xml', '<branchRateModel', '</branchRateModel', 'id="bcov_alpha.s:')
+    problems = Converter.from_file(filename).preflight()
+    assert problems == [
+        "Missing <branchRateModel>",
+        "Missing <parameter id='bcov_alpha.s:...'>",
+    ]
+
+
+def test_ctmc(tmp_path):
+    filename = broken(tmp_path, 'overall-ctmc.xml', 'freqParameter.s:', '<frequencies')
+    problems = Converter.from_file(filename).preflight()
+    assert "Missing <parameter id='freqParameter.s:...'>" in problems
+    assert "Missing <log idref='freqParameter.s...'>" in problems
+    assert "Missing <frequencies> in <substModel>" in problems
+
+
+def test_sequences(tmp_path):
+    filename = tmp_path / 'short.xml'
+    filename.write_text((HERE / 'overall-ctmc.xml').read_text().replace('value="0110100??1"', 'value="0110100??"'))
+    problems = Converter.from_file(filename).preflight()
+    assert problems == ["Sequences with a different number of sites to the 10 charstatelabels: seq_Taxon21"]
+
+
+def test_unsupported(tmp_path):
+    filename = tmp_path / 'other.xml'
+    filename.write_text((HERE / 'overall-ctmc.xml').read_text().replace("BinaryCTMC", "Standard"))
+    with pytest.warns(UserWarning):
+        xml = Converter.from_file(filename)
+    assert xml.preflight()[0] == "Unsupported beauti template: Standard"
+
+
+def test_convert_file(tmp_path):
+    filename = broken(tmp_path, 'overall-ctmc.xml', '<init')
+    with pytest.raises(PreflightError) as e:
+        convert_file(filename, tmp_path / 'out.xml')
+    assert e.value.problems == ["Missing <init>"]
+    assert not (tmp_path / 'out.xml').exists()
+
+
+def test_batch(tmp_path):
+    filename = broken(tmp_path, 'overall-ctmc.xml', '<init')
+    job = {'input': str(filename), 'output': str(tmp_path / 'out.xml')}
+    record = run_job(job, get_options(job, {}))
+    assert record['status'] == 'error'
+    assert record['error'].startswith('PreflightError')
+    assert "Missing <init>" in record['error']
+
+
+def test_main(tmp_path):
+    filename = broken(tmp_path, 'overall-ctmc.xml', '<init')
+    with pytest.raises(SystemExit) as e:
+        main([str(filename), str(tmp_path / 'out.xml')])
+    assert "Missing <init>" in str(e.value.code)
+
+
+def test_duplicates(tmp_path):
+    text = (HERE / 'overall-covarion.xml').read_text()
+    substmodel = text[text.index('<substModel'):text.index('</substModel>') + len('</substModel>')]
+    rates = text[text.index('<branchRateModel'):text.index('</branchRateModel>') + len('</branchRateModel>')]
+    init = text[text.index('<init'):text.index('/>', text.index('<init')) + 2]
+    for element in (substmodel, rates, init):
+        text = text.replace(element, element + element.replace('id="', 'id="copy.'), 1)
+    filename = tmp_path / 'duplicates.xml'
+    filename.write_text(text)
+    problems = Converter.from_file(filename).preflight()
+    assert "Expected one <substModel>, found 2" in problems
+    assert "Expected one <branchRateModel>, found 2" in problems
+    assert "Expected one <init>, found 2" in problems
@@ -0,0 +1,79 @@
+import pstats
+import re
+from pathlib import Path
+
+import pytest
+
+from beastwords.batch import main as batch_main
+from beastwords.main import Converter, main
+from beastwords.profiling import profiled
+from beastwords.sitedistr import main as sitedistr_main
+
+HERE = Path(__file__).parent
+
+
+def check_profile(filename, function='convert'):
+    stats = pstats.Stats(str(filename))
+    assert any(name == function for (_, _, name) in stats.stats)
+    lines = Path(f"{filename}.collapsed").read_text().splitlines()
+    assert lines
+    for line in lines:
+        assert re.fullmatch(r"\S.*;?.* \d+", line), line
+    assert any(f"({function})" in line for line in lines)
+
+
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def test_profiled(tmp_path):
+    with profiled(tmp_path / 'out.prof', memory=True):
+        xml = Converter.from_file(HERE / 'overall-ctmc.xml')
+        xml.convert()
+        fib(15)  # recursion shouldn't trip it up
+    check_profile(tmp_path / 'out.prof')
+    assert (tmp_path / 'out.prof.memory.txt').read_text()
+
+
+def test_profiled_environment(tmp_path, monkeypatch):
+    with profiled() as profile:
+        assert profile is None  # off unless asked for
+    monkeypatch.setenv('BEASTWORDS_PROFILE', str(tmp_path / 'env.prof'))
+    with profiled():
+        Converter.from_file(HERE / 'overall-ctmc.xml').convert()
+    check_profile(tmp_path / 'env.prof')
+    assert not (tmp_path / 'env.prof.memory.txt').exists()
+
+
+def test_main(tmp_path):
+    main([str(HERE / 'overall-covarion.xml'), str(tmp_path / 'out.xml'), '--profile', str(tmp_path / 'out.prof')])
+    check_profile(tmp_path / 'out.prof')
+
+
+@pytest.mark.parametrize("flag, env, expected", [
+    ([], None, False),
+    (['--profile-memory'], None, True),
+    ([], '1', True),  # the flag defaults to off, which mustn't override the environment
+])
+def test_main_memory(tmp_path, monkeypatch, flag, env, expected):
+    if env is not None:
+        monkeypatch.setenv('BEASTWORDS_PROFILE_MEMORY', env)
+    main([str(HERE / 'overall-covarion.xml'), str(tmp_path / 'out.xml'), '--profile', str(tmp_path / 'out.prof'), *flag])
+    assert (tmp_path / 'out.prof.memory.txt').exists() == expected
+
+
+def test_sitedistr(tmp_path, capsys):
+    sitedistr_main([str(HERE / 'overall-covarion.xml'), '--profile', str(tmp_path / 'out.prof')])
+    check_profile(tmp_path / 'out.prof', 'sitedistr')
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch(tmp_path, jobs):
+    args = [str(HERE / 'overall-covarion.xml'), str(HERE / 'overall-ctmc.xml'), '-o', str(tmp_path / 'out'),
+            '--journal', str(tmp_path / 'journal.jsonl'), '-j', str(jobs), '--profile', str(tmp_path / 'out.prof')]
+    assert batch_main(args) == 0
+    if jobs == 1:
+        check_profile(tmp_path / 'out.prof')
+    else:  # one per job
+        check_profile(tmp_path / 'out.prof.1')
+        check_profile(tmp_path / 'out.prof.2')
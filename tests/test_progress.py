@@ -0,0 +1,63 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter, convert_file, main
+from beastwords.progress import Cancelled, ProgressBar
+
+HERE = Path(__file__).parent
+
+
+@pytest.mark.parametrize("filename", ['overall-covarion.xml', 'overall-ctmc.xml'])
+def test_progress(filename):
+    calls = []
+    xml = Converter.from_file(HERE / filename)
+    xml.progress = lambda *args: calls.append(args)
+    xml.set_partitions(2)
+    xml.convert()
+    
+    stages = list(dict.fromkeys(stage for (stage, _, _) in calls))
+    assert stages == ['sequences', 'taxa', 'state', 'prior', 'treelikelihood', 'operators', 'log']
+    totals = {'sequences': 3, 'treelikelihood': 2}  # one per taxon/partition, otherwise one step
+    for stage in stages:
+        reports = [(done, total) for (s, done, total) in calls if s == stage]
+        total = totals.get(stage, 1)
+        assert reports == [(i, total) for i in range(total + 1)]  # in order, from 0 to done
+
+
+def test_cancel(tmp_path):
+    def cancel(stage, done, total):
+        return stage != 'treelikelihood'
+    
+    with pytest.raises(Cancelled):
+        convert_file(HERE / 'overall-ctmc.xml', tmp_path / 'out.xml', progress=cancel)
+    assert not (tmp_path / 'out.xml').exists()
+
+
+def test_cancel_by_raising(covarion):
+    def cancel(stage, done, total):
+        if stage == 'sequences' and done == 1:
+            raise Cancelled("deadline")
+    covarion.progress = cancel
+    with pytest.raises(Cancelled, match="deadline"):
+        covarion.convert()
+
+
+def test_progress_bar():
+    stream = io.StringIO()
+    bar = ProgressBar(stream, width=10, interval=0)
+    bar('sequences', 0, 4)
+    bar('sequences', 2, 4)
+    bar('sequences', 4, 4)
+    bar.close()
+    assert "[#####.....] 2/4" in stream.getvalue()
+    assert "[##########] 4/4" in stream.getvalue()
+    assert stream.getvalue().endswith("\n")
+
+
+def test_main(tmp_path, capsys):
+    main([str(HERE / 'overall-ctmc.xml'), str(tmp_path / 'out.xml'), '--progress'])
+    assert "treelikelihood" in capsys.readouterr().err
+    main([str(HERE / 'overall-ctmc.xml'), str(tmp_path / 'out.xml'), '--no-progress'])
+    assert capsys.readouterr().err == ""
@@ -0,0 +1,72 @@
+import random
+import warnings
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter
+from beastwords.replicates import parse_resample, sample_words, make_replicates, replicates
+
+HERE = Path(__file__).parent
+
+
+@pytest.fixture
+def words():
+    return {'hand': [1, 2], 'foot': [3, 4, 5, 6], 'eye': [7, 8, 9], 'arm': [10], 'leg': [11]}
+
+
+def test_parse_resample():
+    assert parse_resample("jackknife:0.8") == ('jackknife', 0.8)
+    assert parse_resample("bootstrap") == ('bootstrap', None)
+    with pytest.raises(ValueError):
+        parse_resample("jackknife:2")
+    with pytest.raises(ValueError):
+        parse_resample("shuffle")
+
+
+def test_sample_words_jackknife(words):
+    sample = sample_words(words, 'jackknife', 0.6, random.Random(1))
+    assert len(sample) == 3
+    for w, sites in sample.items():
+        assert words[w] == sites
+
+
+def test_sample_words_bootstrap(words):
+    sample = sample_words(words, 'bootstrap', None, random.Random(1))
+    assert len(sample) == 5
+    for w, sites in sample.items():
+        assert words[w.split("_b")[0]] == sites
+
+
+def test_make_replicates_reproducible():
+    conv = Converter.from_file(HERE / 'overall-covarion.xml')
+    a = make_replicates(conv, 5, 'bootstrap', seed=42)
+    b = make_replicates(conv, 5, 'bootstrap', seed=42)
+    assert a == b
+    assert make_replicates(conv, 3, 'bootstrap', seed=42) == a[:3]
+    assert make_replicates(conv, 5, 'bootstrap', seed=1) != a
+
+
+def test_replicates(tmp_path):
+    conv = Converter.from_file(HERE / 'overall-ctmc.xml')
+    outputs = replicates(conv, 3, tmp_path, resample="bootstrap", seed=1)
+    assert len(outputs) == 3
+    assert (tmp_path / 'replicates.tsv').exists()
+    for o in outputs:
+        out = Converter.from_file(o)
+        assert out.partitioned
+        # every site is still from the input
+        assert len(out.words) == sum(len(s) + 1 for s in out.partitions.values())
+
+
+@pytest.mark.parametrize("method, fraction", [('jackknife', 0.5), ('bootstrap', None)])
+@pytest.mark.parametrize("scheme", [None, 2, '1-3,4'])
+def test_make_replicates_words(method, fraction, scheme):
+    conv = Converter.from_file(HERE / 'overall-covarion.xml')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # nothing is missing or duplicated as far as repartition knows
+        plans = make_replicates(conv, 5, method, fraction, seed=3, scheme=scheme)
+    for i, plan in enumerate(plans):
+        sample = sample_words(conv.partitions, method, fraction, random.Random(f"3:{i}"))
+        words = [plan.words[w] for members in plan.members for w in members]
+        assert sorted(words) == sorted(w.split("_b")[0] for w in sample)
@@ -0,0 +1,22 @@
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter
+from beastwords.scan import peek_model, scan_words
+
+FIXTURES = sorted(Path(__file__).parent.glob("*.xml"))
+
+
+@pytest.mark.parametrize("xmlfile", FIXTURES, ids=lambda p: p.name)
+def test_scan_words(xmlfile):
+    full = Converter.from_tree(Converter.from_file(xmlfile).tree)
+    assert scan_words(xmlfile) == full.get_words()
+    assert peek_model(xmlfile) == full.model
+
+
+def test_partitions_without_parse():
+    conv = Converter.from_file(Path(__file__).parent / 'overall-covarion.xml')
+    conv.set_partitions(2)
+    assert sorted(conv.partitions) == ['p1', 'p2']
+    assert conv._tree is None, 'should not need to parse the tree for partitions'
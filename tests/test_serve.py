@@ -0,0 +1,144 @@
+import os
+import shutil
+import socket
+import stat
+import threading
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter
+from beastwords.serve import make_server, parse_address, request, forward
+
+HERE = Path(__file__).parent
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/x.sock") == "/tmp/x.sock"
+    for address in ["localhost:8765", ":8765", "unix:"]:
+        with pytest.raises(ValueError):
+            parse_address(address)
+
+
+@pytest.fixture
+def server(tmp_path):
+    address = f"unix:{tmp_path / 'bw.sock'}"
+    server = make_server(address, workers=1, queue=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield address
+    server.shutdown()
+    server.server_close()
+    server.pool.shutdown()
+
+
+def test_serve(server, tmp_path):
+    shutil.copy(HERE / 'overall-ctmc.xml', tmp_path / 'in.xml')
+    response = request(server, 'convert', ['-p', '2', 'in.xml', 'out.xml'], cwd=str(tmp_path))
+    assert response['status'] == 'ok'
+    assert response['returncode'] == 0
+    
+    expected = Converter.from_file(HERE / 'overall-ctmc.xml')
+    expected.set_partitions(2)
+    expected.convert()
+    assert (tmp_path / 'out.xml').read_bytes() == expected.to_bytes()
+    
+    response = request(server, 'sitedistr', ['in.xml'], cwd=str(tmp_path))
+    assert response['returncode'] == 0
+    assert 'Counter' in response['stdout']
+    
+    response = request(server, 'convert', ['missing.xml', 'out.xml'], cwd=str(tmp_path))
+    assert response['returncode'] != 0
+    
+    # sys.exit("message") from a preflight failure
+    (tmp_path / 'broken.xml').write_text(
+        "".join(l for l in (HERE / 'overall-ctmc.xml').read_text().splitlines(True) if '<branchRateModel' not in l and '</branchRateModel' not in l)
+    )
+    response = request(server, 'convert', ['broken.xml', 'out.xml'], cwd=str(tmp_path))
+    assert response['returncode'] == 1
+    assert "Missing <branchRateModel>" in response['stderr']
+    
+    assert request(server, 'rm', ['-rf', '/'])['status'] == 'error'
+
+
+def test_forward(server, tmp_path, monkeypatch, capsys):
+    assert forward('sitedistr', [str(HERE / 'overall-ctmc.xml')]) is None  # no server set
+    monkeypatch.setenv('BEASTWORDS_SERVER', server)
+    assert forward('sitedistr', [str(HERE / 'overall-ctmc.xml')]) == 0
+    assert 'Counter' in capsys.readouterr().out
+    monkeypatch.setenv('BEASTWORDS_SERVER', f"unix:{tmp_path / 'nothing.sock'}")
+    assert forward('sitedistr', [str(HERE / 'overall-ctmc.xml')]) is None  # can't connect
+    monkeypatch.setenv('BEASTWORDS_SERVER', "localhost:8765")
+    assert forward('sitedistr', [str(HERE / 'overall-ctmc.xml')]) is None  # not a unix socket
+
+
+def test_socket_permissions(server):
+    path = server[len('unix:'):]
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_refuses(server, tmp_path):
+    with pytest.raises(ValueError, match="already listening"):
+        make_server(server)
+    (tmp_path / 'file').write_text("not a socket")
+    with pytest.raises(ValueError, match="isn't a socket"):
+        make_server(f"unix:{tmp_path / 'file'}")
+    assert (tmp_path / 'file').exists()
+    with pytest.raises(ValueError, match="only unix"):
+        make_server("localhost:0")
+
+
+def test_stale_socket(tmp_path):
+    path = tmp_path / 'stale.sock'
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    sock.close()  # leaves the file behind
+    server = make_server(f"unix:{path}", workers=1, queue=1)
+    server.server_close()
+    server.pool.shutdown()
+
+
+def test_default_address(tmp_path, monkeypatch):
+    from beastwords.serve import get_default_address
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert get_default_address() == f"unix:{tmp_path / 'beastwords.sock'}"
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    monkeypatch.setattr('tempfile.gettempdir', lambda: str(tmp_path))
+    assert get_default_address() == f"unix:{tmp_path / f'beastwords-{os.getuid()}' / 'beastwords.sock'}"
+    assert stat.S_IMODE(os.stat(tmp_path / f'beastwords-{os.getuid()}').st_mode) == 0o700
+
+
+def test_forward_local_only(server, tmp_path, monkeypatch):
+    import beastwords.serve
+    from beastwords.cli import main
+    assert request(server, 'convert', ['in.xml', 'out', '--watch'])['status'] == 'error'
+    
+    sent = []
+    monkeypatch.setenv('BEASTWORDS_SERVER', server)
+    monkeypatch.setattr(beastwords.serve, 'forward', lambda command, args: sent.append(args) or 0)
+    with pytest.raises(SystemExit):
+        main([str(HERE / 'overall-ctmc.xml'), str(tmp_path / 'out.xml')])
+    assert len(sent) == 1
+    main([str(HERE / 'overall-ctmc.xml'), str(tmp_path / 'sweep'), '--sweep', '2..3'])
+    assert len(sent) == 1  # ran locally
+    assert len(list((tmp_path / 'sweep').glob('*.xml'))) == 2
+
+
+@pytest.mark.parametrize("args", [['--cache', 'mine'], ['--cache=mine']])
+def test_defaults_dont_override(args, monkeypatch):
+    import beastwords.serve
+    import beastwords.sitedistr
+    seen = []
+    monkeypatch.setitem(beastwords.serve._DEFAULTS, 'sitedistr', {'--cache': 'server'})
+    monkeypatch.setattr(beastwords.sitedistr, 'main', seen.append)
+    beastwords.serve.run_command('sitedistr', ['in.xml'] + args)
+    beastwords.serve.run_command('sitedistr', ['in.xml'])
+    assert seen == [['in.xml'] + args, ['in.xml', '--cache', 'server']]
+
+
+def test_forward_busy(monkeypatch, capsys):
+    import beastwords.serve
+    monkeypatch.setenv('BEASTWORDS_SERVER', 'unix:/nowhere.sock')
+    monkeypatch.setattr(beastwords.serve, 'request', lambda *args: {'status': 'busy'})
+    assert forward('sitedistr', ['in.xml']) is None  # so it runs locally
+    assert capsys.readouterr().err == ""
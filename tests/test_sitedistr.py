@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from beastwords.sitedistr import COMBINED, aggregate, histogram, main, summarise, write_csv
+
+HERE = Path(__file__).parent
+
+
+def test_summarise():
+    summary = summarise(HERE / 'overall-covarion.xml')
+    assert summary['partitions'] == 3
+    assert summary['sizes'] == {2: 1, 3: 1, 4: 1}
+    assert summary['sites'] == 9
+
+
+@pytest.mark.parametrize("partitions, sizes", [('2', {4: 1, 5: 1}), ('1-3,4-6', {4: 1, 5: 1})])
+def test_summarise_partitions(partitions, sizes):
+    assert summarise(HERE / 'overall-covarion.xml', partitions)['sizes'] == sizes
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_aggregate(tmp_path, jobs):
+    files = [HERE / 'overall-covarion.xml', HERE / 'words-ctmc.xml', tmp_path / 'missing.xml']
+    summary = aggregate(files, cache=tmp_path / 'cache', jobs=jobs)
+    assert [r['file'] for r in summary['files']] == [str(f) for f in files[:2]]
+    assert summary['combined'] == {'files': 2, 'partitions': 6, 'sites': 18, 'sizes': {2: 2, 3: 2, 4: 2}}
+    assert [r['file'] for r in summary['errors']] == [str(files[2])]
+
+
+def test_histogram():
+    out = io.StringIO()
+    histogram({2: 3, 4: 200}, width=20, stream=out)
+    assert out.getvalue().splitlines() == ["2\t3\t█", "3\t0\t", "4\t200\t" + "█" * 20]
+
+
+def test_write_csv():
+    out = io.StringIO()
+    write_csv(aggregate([HERE / 'overall-covarion.xml']), out)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [(r['file'], r['size'], r['count']) for r in rows][-3:] == [(COMBINED, '2', '1'), (COMBINED, '3', '1'), (COMBINED, '4', '1')]
+    assert len(rows) == 6
+
+
+def test_main_single(capsys):
+    main([str(HERE / 'overall-covarion.xml')])
+    assert capsys.readouterr().out.splitlines() == ["Counter({2: 1, 3: 1, 4: 1})", "2\t1\t█", "3\t1\t█", "4\t1\t█"]
+
+
+def test_main_many(tmp_path, capsys):
+    for name in ['a', 'b']:
+        shutil.copy(HERE / 'overall-covarion.xml', tmp_path / f"{name}.xml")
+    main([str(tmp_path / '*.xml'), '-p', '2', '--json', str(tmp_path / 'out.json'), '-j', '2'])
+    out = capsys.readouterr().out
+    assert "2 files\t4 partitions\t18 sites" in out
+    assert "4\t2\t██" in out
+    summary = json.loads((tmp_path / 'out.json').read_text())
+    assert [Path(r['file']).name for r in summary['files']] == ['a.xml', 'b.xml']
+    assert summary['combined']['sizes'] == {'4': 2, '5': 2}
+
+
+def test_main_stdout(capsys):
+    main([str(HERE / 'overall-covarion.xml'), '--json', '-'])
+    assert json.loads(capsys.readouterr().out)['combined']['partitions'] == 3
+
+
+def test_main_errors(tmp_path, capsys):
+    with pytest.raises(SystemExit) as e:
+        main([str(HERE / 'overall-covarion.xml'), str(tmp_path / 'missing.xml')])
+    assert e.value.code == 1
+    assert "missing.xml: FileNotFoundError" in capsys.readouterr().err
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter
+from beastwords.sweep import parse_range, sweep
+
+HERE = Path(__file__).parent
+
+
+def test_parse_range():
+    assert parse_range("2..5") == [2, 3, 4, 5]
+    assert parse_range("2,4,8") == [2, 4, 8]
+    assert parse_range("2..8:2") == [2, 4, 6, 8]
+    assert parse_range("1,4..5") == [1, 4, 5]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sweep(tmp_path, jobs):
+    conv = Converter.from_file(HERE / 'overall-covarion.xml')
+    with pytest.warns(UserWarning):  # only 3 words so can't do 4
+        rows = sweep(conv, [1, 2, 3, 4], tmp_path, jobs=jobs)
+    assert [r['partitions'] for r in rows] == [1, 2, 3]
+    assert (tmp_path / 'summary.tsv').exists()
+    
+    for scheme in [1, 2, 3]:
+        expected = Converter.from_file(HERE / 'overall-covarion.xml')
+        expected.set_partitions(scheme)
+        expected.convert()
+        assert (tmp_path / f"overall-covarion.p{scheme}.xml").read_bytes() == expected.to_bytes()
+    
+    # and the original is untouched
+    assert not conv.tree.xpath(".//distribution[@id='treeLikelihood.p1']")
+
+
+NEXUS_CHARSETS = """
+begin assumptions;
+	charset handfoot = 2-7;
+	charset eye = 8-10;
+end;
+"""
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sweep_nexus(tmp_path, jobs):
+    # the charsets aren't in the XML the workers are sent, so they need passing on
+    text = (HERE / 'words.nex').read_text()
+    (tmp_path / 'in.nex').write_text(text[:text.index('begin assumptions')] + NEXUS_CHARSETS)
+    conv = Converter.from_nexus(tmp_path / 'in.nex', HERE / 'overall-covarion.xml')
+    rows = sweep(conv, [1, 2], tmp_path / 'out', jobs=jobs, stem='in')
+    assert [(r['partitions'], r['max_words']) for r in rows] == [(1, 2), (2, 1)]
+    
+    for scheme in [1, 2]:
+        expected = Converter.from_nexus(tmp_path / 'in.nex', HERE / 'overall-covarion.xml')
+        expected.set_partitions(scheme)
+        expected.convert()
+        assert (tmp_path / 'out' / f"in.p{scheme}.xml").read_bytes() == expected.to_bytes()
+
+
+def test_sweep_ntaxa(tmp_path):
+    conv = Converter.from_file(HERE / 'overall-covarion.xml')
+    full = sweep(conv, [1], tmp_path / 'full')[0]
+    conv.set_taxa(keep=['Taxon1', 'Taxon2'])
+    kept = sweep(conv, [1], tmp_path / 'kept')[0]
+    assert kept['cost'] * 3 == full['cost'] * 2
+
+
+def test_sweep_drop_constant(tmp_path):
+    # only foot has variable sites left, so the summary should only count those
+    conv = Converter.from_file(HERE / 'overall-covarion.xml')
+    conv.set_taxa(drop_constant=True)
+    with pytest.warns(UserWarning, match="no variable sites left"):
+        rows = sweep(conv, [1, 3], tmp_path)
+    assert [(r['partitions'], r['total_sites'], r['empty']) for r in rows] == [(1, 4, 0), (1, 4, 0)]
+    for row in rows:
+        out = Converter.from_file(tmp_path / row['output'])
+        assert len(out.root.xpath(".//distribution[@spec='TreeLikelihood']")) == row['partitions']
+        assert len(out.words) == row['total_sites']
@@ -0,0 +1,92 @@
+import io
+import random
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter
+from beastwords.synth import synthesise, parse_sizes, get_labels, main
+
+HERE = Path(__file__).parent
+
+
+def synth(template='overall-covarion.xml', **kwargs):
+    handle = io.BytesIO()
+    synthesise(HERE / template, handle, **kwargs)
+    return handle.getvalue()
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ('fixed:3', 3, 3),
+    ('uniform:2-5', 2, 5),
+    ('geometric:3', 1, None),
+])
+def test_parse_sizes(spec, low, high):
+    size = parse_sizes(spec)
+    rng = random.Random(0)
+    sizes = [size(rng) for _ in range(1000)]
+    assert min(sizes) >= low
+    if high:
+        assert max(sizes) <= high
+    else:
+        assert 2.5 < sum(sizes) / len(sizes) < 3.5
+
+
+@pytest.mark.parametrize("spec", ['fixed:0', 'uniform:5-2', 'geometric:0.5', 'poisson:2', 'fixed'])
+def test_parse_sizes_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_sizes(spec)
+
+
+def test_get_labels():
+    assert get_labels([2, 1]) == ['_ascertainment_0', 'word1_1', 'word1_2', 'word2_1']
+    assert get_labels([2, 1], 'end') == ['word1_1', 'word1_2', 'word2_1', '_ascertainment_0']
+    assert get_labels([2, 1], 'none') == ['word1_1', 'word1_2', 'word2_1']
+
+
+@pytest.mark.parametrize("template", [
+    'overall-covarion.xml', 'overall-covarion-no_mutationrate.xml', 'overall-ctmc.xml'
+])
+def test_synthesise(template):
+    data = synth(template, ntaxa=20, nwords=30, sizes='uniform:1-4', missing=0.2)
+    xml = Converter.from_bytes(data)
+    assert len(xml.alignment) == 20
+    assert len(xml.partitions) == 30
+    assert xml.ascertainment == [0]
+    
+    # should be the same as putting the alignment in with set_alignment
+    expected = Converter.from_file(HERE / template)
+    expected.set_alignment(
+        [label for (label, _) in xml.words],
+        {s.get('taxon'): s.get('value') for s in xml.data.iter('sequence')}
+    )
+    assert expected.to_bytes() == data
+    
+    xml.set_partitions(5)
+    xml.convert()  # and it should convert
+
+
+def test_synthesise_coding():
+    xml = Converter.from_bytes(synth(ntaxa=50, nwords=40, missing=0.25))
+    missing = 0
+    for seq in xml.alignment.values():
+        assert seq[0] == '0'
+        for sites in xml.partitions.values():
+            word = "".join(seq[s] for s in sites)
+            if set(word) == {'?'}:
+                missing += 1
+            else:
+                assert word.count('1') == 1  # one cognate set per word
+    assert 0.15 < missing / (50 * 40) < 0.35
+
+
+def test_seed():
+    assert synth(seed=1) == synth(seed=1)
+    assert synth(seed=1) != synth(seed=2)
+
+
+def test_main(tmp_path):
+    main([str(HERE / 'overall-ctmc.xml'), str(tmp_path / 'out.xml'), '-n', '5', '-w', '8', '--ascertainment', 'none'])
+    xml = Converter.from_file(tmp_path / 'out.xml')
+    assert len(xml.alignment) == 5
+    assert xml.ascertainment == []
@@ -77,3 +77,10 @@ def test_repartition_by_groupsize(data):
     # check errors on overlap
     with pytest.raises(ValueError):
         repartition_by_groupsize("1-2,2-9", data)
+
+
+def test_repartition_by_groupsize_ignore(data):
+    del data['hand']  # sites 1 & 2 are now missing
+    with pytest.warns(UserWarning):
+        repartition_by_groupsize("1-9", data)
+    repartition_by_groupsize("1-9", data, ignore=[1, 2])  # no warning
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import pytest
+
+import beastwords.main
+from beastwords.batch import run_job, get_options
+from beastwords.main import convert_file
+from beastwords.verify import VerifyError, checksum, gather, get_runs
+
+HERE = Path(__file__).parent
+
+
+encode_sequence = beastwords.main.encode_sequence
+
+def shifted(sequence, partitions):
+    """encode_sequence with an off-by-one: every site is the one after it"""
+    return encode_sequence(sequence[1:] + sequence[0], partitions)
+
+
+def test_gather():
+    assert get_runs([1, 2, 3, 7, 9, 10]) == [(1, 4), (7, 8), (9, 11)]
+    assert gather([])("abc") == ""
+    assert gather([2])("abc") == "c"
+    assert gather([2, 0])("abc") == "ca"
+    assert gather(list(range(10, 20)) + list(range(30, 40)))("x" * 10 + "a" * 10 + "y" * 10 + "b" * 10) == "a" * 10 + "b" * 10
+
+
+def test_checksum():
+    sums = checksum({'a': "0110", 'b': "0100"}, {'p1': [3, 1], 'p2': [2]})
+    assert sums['a'] == checksum({'a': "x110"}, {'p1': [1, 2, 3]})['a']
+    assert sums['a'] != sums['b']
+
+
+@pytest.mark.parametrize("fixture", ['covarion', 'ctmc', 'covarionPartSize2', 'ctmcPartSize3'])
+def test_verify_ok(request, fixture):
+    m = request.getfixturevalue(fixture)
+    m.verifiable = True
+    m.convert()
+    assert m.verify() == []
+
+
+def test_verify_drop_constant(covarion):
+    covarion.verifiable = True
+    covarion.set_taxa(drop_constant=True)
+    covarion.convert()
+    assert covarion.verify() == []
+
+
+def test_verify_needs_verifiable(covarion):
+    covarion.convert()
+    with pytest.raises(ValueError):
+        covarion.verify()
+
+
+def test_verify_sequence(covarion):
+    covarion.verifiable = True
+    covarion.convert()
+    seq = covarion.data.find('sequence')
+    seq.set('value', seq.get('value').replace('0', '1', 1)[::-1])
+    problems = covarion.verify()
+    assert problems == [f"Sequence {seq.get('id')} doesn't match the input"]
+
+
+@pytest.mark.parametrize("seqid, old, new", [
+    ('seq_Taxon1', '0?11 ', '1?11 '),  # should be 0
+    ('seq_Taxon3', '???? ', '0??? '),  # should be ? as all of eye is missing
+    ('seq_Taxon3', '???? ', '-??? '),
+])
+@pytest.mark.parametrize("spaced", [True, False])  # i.e. as encode_sequence writes them, or not
+def test_verify_ascertainment(covarion, seqid, old, new, spaced):
+    covarion.verifiable = True
+    covarion.convert()
+    for seq in covarion.data.iter('sequence'):
+        if not spaced:
+            seq.set('value', seq.get('value').replace(' ', ''))
+    assert covarion.verify() == []
+    seq = [s for s in covarion.data.iter('sequence') if s.get('id') == seqid][0]
+    old, new = (old, new) if spaced else (old.strip(), new.strip())
+    assert seq.get('value').startswith(old)
+    seq.set('value', new + seq.get('value')[len(old):])
+    assert covarion.verify() == [f"Sequence {seqid} has the wrong ascertainment character in eye"]
+
+
+def test_verify_ascertainment_label(covarion):
+    covarion.verifiable = True
+    covarion.convert()
+    label = covarion.data.find('userDataType')[0]
+    assert label.get('characterName') == 'eye_0'
+    label.set('characterName', 'eye_9')
+    assert "Partition eye has no ascertainment column" in covarion.verify()
+
+
+def test_verify_labels(covarion):
+    covarion.verifiable = True
+    covarion.convert()
+    label = covarion.data.find('userDataType')[-1]
+    label.getparent().remove(label)
+    problems = covarion.verify()
+    assert len(problems) == 1
+    assert problems[0].endswith("missing from the output")
+
+
+def test_convert_file_verify(tmp_path, monkeypatch):
+    out = tmp_path / 'out.xml'
+    assert convert_file(HERE / 'words-covarion.xml', out, partitions='2', verify=True) is False
+
+    out.unlink()
+    monkeypatch.setattr(beastwords.main, 'encode_sequence', shifted)
+    with pytest.raises(VerifyError) as e:
+        convert_file(HERE / 'words-covarion.xml', out, partitions='2', verify=True)
+    assert "differs from the input at site(s)" in str(e.value)
+    assert not out.exists()
+
+
+def test_batch_verifies(tmp_path, monkeypatch):
+    monkeypatch.setattr(beastwords.main, 'encode_sequence', shifted)
+    job = {'input': str(HERE / 'words-covarion.xml'), 'output': str(tmp_path / 'out.xml')}
+    record = run_job(job, get_options(job, {'partitions': '2'}))
+    assert record['status'] == 'error'
+    assert record['error'].startswith('VerifyError')
+
+    record = run_job(job, get_options(job, {'partitions': '2'}), verify=False)
+    assert record['status'] == 'ok'
@@ -0,0 +1,122 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from beastwords.main import Converter, PreflightError
+from beastwords.watch import Watcher, get_signature, read_sequences
+
+HERE = Path(__file__).parent
+
+
+def expected(filename, partitions=None, **kwargs):
+    xml = Converter.from_file(filename)
+    if kwargs:
+        xml.set_taxa(**kwargs)
+    if partitions:
+        xml.set_partitions(partitions)
+    xml.convert()
+    return xml.to_bytes()
+
+
+def first(filename):
+    return next(iter(Converter.from_file(filename).alignment))
+
+
+def edit(filename, old, new):
+    text = filename.read_text()
+    assert old in text
+    filename.write_text(text.replace(old, new, 1))
+
+
+@pytest.fixture(params=['overall-covarion.xml', 'overall-ctmc.xml'])
+def watched(request, tmp_path):
+    shutil.copy(HERE / request.param, tmp_path / 'in.xml')
+    return tmp_path / 'in.xml'
+
+
+def test_signature_ignores_sequences(watched):
+    before = get_signature(watched.read_bytes())
+    edit(watched, 'value="0', 'value="1')
+    assert get_signature(watched.read_bytes()) == before
+    edit(watched, 'characterName="hand_1"', 'characterName="arm_1"')
+    assert get_signature(watched.read_bytes()) != before
+
+
+def test_read_sequences(watched):
+    assert read_sequences(watched.read_bytes()) == Converter.from_file(watched).alignment
+    assert read_sequences(b"""<data><sequence value='01 1' id="a&amp;b"/></data>""") == {'a&b': '011'}
+
+
+@pytest.mark.parametrize("partitions", [None, '2'])
+def test_patch_sequences(watched, tmp_path, partitions):
+    watcher = Watcher(watched, tmp_path / 'out.xml', partitions=partitions)
+    assert watcher.update() == 'full'
+    edit(watched, 'value="0', 'value="1')
+    assert watcher.update() == [first(watched)]
+    assert (tmp_path / 'out.xml').read_bytes() == expected(watched, partitions)
+
+
+def test_patch_without_parsing(watched, tmp_path, monkeypatch):
+    watcher = Watcher(watched, tmp_path / 'out.xml')
+    watcher.update()
+    monkeypatch.setattr(Converter, 'from_bytes', None)
+    edit(watched, 'value="0', 'value="1')
+    assert watcher.update() == [first(watched)]
+    assert (tmp_path / 'out.xml').read_bytes() == expected(watched)
+
+
+def test_full_on_length_change(watched, tmp_path):
+    # isn't patched, but goes through a full conversion (and so preflight)
+    watcher = Watcher(watched, tmp_path / 'out.xml')
+    watcher.update()
+    edit(watched, 'value="0', 'value="')
+    with pytest.raises(PreflightError, match="different number of sites"):
+        watcher.update()
+
+
+def test_full_on_structural_change(watched, tmp_path):
+    watcher = Watcher(watched, tmp_path / 'out.xml')
+    watcher.update()
+    edit(watched, 'characterName="hand_1"', 'characterName="arm_1"')
+    assert watcher.update() == 'full'
+    assert (tmp_path / 'out.xml').read_bytes() == expected(watched)
+
+
+def test_removed_taxa(watched, tmp_path):
+    watcher = Watcher(watched, tmp_path / 'out.xml', exclude_taxa=['Taxon1'])
+    watcher.update()
+    edit(watched, 'value="0', 'value="1')
+    assert watcher.update() == [first(watched)]  # nothing to do in the output
+    assert (tmp_path / 'out.xml').read_bytes() == expected(watched, exclude=['Taxon1'])
+
+
+def test_run(watched, tmp_path):
+    results = []
+    watcher = Watcher(watched, tmp_path / 'out.xml')
+    watcher.run(interval=0, callback=results.append, count=1)
+    assert results == ['full']
+    assert not watcher.changed()
+
+
+def test_run_survives_errors(watched, tmp_path):
+    results = []
+    watcher = Watcher(watched, tmp_path / 'out.xml')
+    text = watched.read_text()
+    start, end = text.index('<branchRateModel'), text.index('</branchRateModel>') + len('</branchRateModel>')
+    watched.write_text(text[:start] + text[end:])
+    watcher.run(interval=0, callback=results.append, count=1)
+    assert isinstance(results[0], PreflightError)
+    assert "Missing <branchRateModel>" in str(results[0])
+    
+    watched.write_text(text)
+    watcher.run(interval=0, callback=results.append, count=1)
+    assert results[1] == 'full'
+
+
+def test_run_reports_unexpected_errors(watched, tmp_path, monkeypatch):
+    results = []
+    watcher = Watcher(watched, tmp_path / 'out.xml')
+    monkeypatch.setattr(watcher, 'update', lambda: [][0])
+    watcher.run(interval=0, callback=results.append, count=1)
+    assert isinstance(results[0], IndexError)